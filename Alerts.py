@@ -0,0 +1,223 @@
+import ast
+import json
+import time
+from collections import namedtuple
+
+import numpy as np
+import requests
+
+
+# columns identifying the row an alert is about, an alert is sent at most once per rule, key and records.timestamp
+KEY = ['type', 'symbol', 'expiry']
+# functions rules may call, applied to whole columns
+FUNCTIONS = {'abs': np.abs, 'min': np.minimum, 'max': np.maximum}
+NODES = (ast.Expression, ast.Tuple, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not, ast.USub, ast.UAdd, ast.BinOp, ast.Add,
+    ast.Sub, ast.Mult, ast.Div, ast.Compare, ast.Gt, ast.GtE, ast.Lt, ast.LtE, ast.Eq, ast.NotEq, ast.Name, ast.Load, ast.Constant,
+    ast.Call)
+Alert = namedtuple('Alert', ['rule', 'type', 'symbol', 'expiry', 'timestamp', 'message', 'time'])
+
+
+class Rule:
+    def __init__(self, name, when, message=None, cooldown=None):
+        '''
+        __init__ of Rule class, a condition over the columns of a Scanner results table
+            name => unique name of the rule
+            when => python like expression over column names, like 'PCR_OI > 1.5 and abs(distance) > 2' or 'SellQ_c > BuyQ_c'
+                supports and, or, not, comparisons, + - * /, abs, min, max, numbers and strings
+            message => str.format template filled with the values of the matching row, like '{symbol} PCR_OI {PCR_OI}'
+            cooldown => seconds before the rule alerts again for the same row, the cooldown of the engine when not given
+        raises ValueError for an expression using anything else
+        '''
+        self.name = name
+        self.when = when
+        self.message = message or f'{{symbol}} {when}'
+        self.cooldown = cooldown
+        try:
+            self.tree = ast.parse(when, mode='eval').body
+        except SyntaxError as err:
+            raise ValueError(f'rule {name}: {err}') from None
+        for node in ast.walk(self.tree):
+            if not isinstance(node, NODES) or (isinstance(node, ast.Call) and (node.keywords or not isinstance(node.func, ast.Name)
+                    or node.func.id not in FUNCTIONS)):
+                raise ValueError(f'rule {name}: {ast.dump(node)[:60]} is not allowed in {when!r}')
+        self.names = {node.id for node in ast.walk(self.tree) if isinstance(node, ast.Name)} - set(FUNCTIONS)
+
+    def __repr__(self):
+        return f'Rule({self.name!r}, {self.when!r})'
+
+
+class Vectorize(ast.NodeTransformer):
+    '''
+    rewrites a rule expression into element wise numpy operations, and/or/not become &/|/~ and chained comparisons are split
+    '''
+    def visit_BoolOp(self, node):
+        self.generic_visit(node)
+        op = ast.BitAnd() if isinstance(node.op, ast.And) else ast.BitOr()
+        result = node.values[0]
+        for value in node.values[1:]:
+            result = ast.BinOp(left=result, op=op, right=value)
+        return result
+
+    def visit_UnaryOp(self, node):
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Not):
+            return ast.UnaryOp(op=ast.Invert(), operand=node.operand)
+        return node
+
+    def visit_Compare(self, node):
+        self.generic_visit(node)
+        left, result = node.left, None
+        for op, right in zip(node.ops, node.comparators):
+            compare = ast.Compare(left=left, ops=[op], comparators=[right])
+            result = compare if result is None else ast.BinOp(left=result, op=ast.BitAnd(), right=compare)
+            left = right
+        return result
+
+
+def load_rules(path):
+    '''
+    returns Rules from a json file holding a list of {"name", "when", "message", "cooldown"} objects
+    '''
+    with open(path) as f:
+        return [Rule(**rule) for rule in json.load(f)]
+
+
+class AlertEngine:
+    def __init__(self, rules, sinks=(), cooldown=300):
+        '''
+        __init__ of AlertEngine class, evaluates every rule over every row of a results table at once
+        all rules are compiled into one code object when the engine is made, a sweep only binds the used columns and runs it
+            rules => list of Rule
+            sinks => objects with a send(alerts) method, like StdoutSink, FileSink or WebhookSink
+            cooldown => default seconds before a rule alerts again for the same row
+        '''
+        self.rules = list(rules)
+        names = [rule.name for rule in self.rules]
+        if len(set(names)) != len(names):
+            raise ValueError(f'duplicate rule names in {names}')
+        self.sinks = list(sinks)
+        self.cooldown = cooldown
+        self.cooldowns = np.array([cooldown if rule.cooldown is None else rule.cooldown for rule in self.rules], dtype='float64')
+        self.names = sorted(set().union(*[rule.names for rule in self.rules]))
+        tree = ast.Expression(body=ast.Tuple(elts=[Vectorize().visit(rule.tree) for rule in self.rules], ctx=ast.Load()))
+        self.code = compile(ast.fix_missing_locations(tree), '<rules>', 'eval')
+        # (rule, key) => (time sent, records.timestamp) of the last alert, pruned by every sweep
+        self.sent = {}
+        self.fired = 0
+        self.suppressed = 0
+
+    def columns(self, table):
+        '''
+        returns dict of column name => numpy array of the columns the rules use, object columns are made numeric when they can be
+        raises ValueError when a rule uses a column the table does not have
+        '''
+        missing = [name for name in self.names if name not in table.columns]
+        if missing:
+            raise ValueError(f'rules use columns missing from the table: {missing}')
+        columns = {}
+        for name in self.names:
+            values = table[name].values
+            if values.dtype == object:
+                try:
+                    values = values.astype('float64')
+                except (TypeError, ValueError):
+                    pass
+            columns[name] = values
+        return columns
+
+    def evaluate(self, table):
+        '''
+        returns a boolean numpy array with one row per rule and one column per row of table, True where the rule matches
+        '''
+        namespace = dict(FUNCTIONS, **self.columns(table))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            results = eval(self.code, {'__builtins__': {}}, namespace)
+        masks = np.zeros((len(self.rules), len(table)), dtype=bool)
+        for i, result in enumerate(results):
+            masks[i] = result
+        return masks
+
+    def sweep(self, table, now=None):
+        '''
+        evaluates every rule over table, sends the new alerts to every sink and returns them as a list of Alert
+        a match is dropped when the same rule already alerted for its row at the same records.timestamp or within its cooldown
+        '''
+        now = time.time() if now is None else now
+        masks = self.evaluate(table)
+        rules, rows = np.nonzero(masks)
+        if not len(rules):
+            self.prune(now)
+            return []
+        keys = table.reindex(columns=KEY + ['timestamp']).astype(object)
+        keys = keys.where(keys.notna(), None).values
+        alerts, matched = [], set()
+        for i, row in zip(rules.tolist(), rows.tolist()):
+            rule = self.rules[i]
+            key = (rule.name,) + tuple(keys[row, :len(KEY)])
+            matched.add(key)
+            timestamp = keys[row, len(KEY)]
+            last = self.sent.get(key)
+            if last is not None and (last[1] == timestamp or now - last[0] < self.cooldowns[i]):
+                self.suppressed += 1
+                continue
+            self.sent[key] = (now, timestamp)
+            values = table.iloc[row].to_dict()
+            try:
+                message = rule.message.format(**values)
+            except (KeyError, ValueError, IndexError) as err:
+                message = f'{rule.message} ({err.__class__.__name__}: {err})'
+            alerts.append(Alert(rule.name, *key[1:], timestamp, message, now))
+        self.prune(now, matched)
+        self.fired += len(alerts)
+        if alerts:
+            for sink in self.sinks:
+                try:
+                    sink.send(alerts)
+                except Exception as err:
+                    print("AlertEngine: ", err)
+        return alerts
+
+    def prune(self, now, matched=()):
+        '''
+        forgets the alerts sent longer ago than the largest cooldown, unless their rule still matches the row in this sweep,
+        so self.sent only holds what can still suppress an alert
+        '''
+        horizon = self.cooldowns.max() if len(self.cooldowns) else 0
+        self.sent = {key: last for key, last in self.sent.items() if now - last[0] < horizon or key in matched}
+
+    def stats(self):
+        return {'rules': len(self.rules), 'fired': self.fired, 'suppressed': self.suppressed}
+
+
+class StdoutSink:
+    def send(self, alerts):
+        for alert in alerts:
+            print(f'{time.strftime("%H:%M:%S", time.localtime(alert.time))} [{alert.rule}] {alert.message}')
+
+
+class FileSink:
+    def __init__(self, path):
+        '''
+        __init__ of FileSink class, appends every alert as one json line to path
+        '''
+        self.path = path
+
+    def send(self, alerts):
+        with open(self.path, 'a') as f:
+            f.write(''.join(json.dumps(alert._asdict(), default=str) + '\n' for alert in alerts))
+
+
+class WebhookSink:
+    def __init__(self, url, timeout=5, session=None):
+        '''
+        __init__ of WebhookSink class, posts the alerts of a sweep as one json object {"alerts": [...]} to url
+            session => requests session to post with, a new one by default
+        '''
+        self.url = url
+        self.timeout = timeout
+        self.session = session or requests.Session()
+
+    def send(self, alerts):
+        response = self.session.post(self.url, data=json.dumps({'alerts': [alert._asdict() for alert in alerts]}, default=str),
+            headers={'content-type': 'application/json'}, timeout=self.timeout)
+        response.raise_for_status()
@@ -0,0 +1,247 @@
+import os
+import json
+import zlib
+import struct
+import threading
+
+import numpy as np
+
+from Cache import ResultCache
+from Decode import loads
+from SnapshotStore import parse_timestamp
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+INDEX_DTYPE = np.dtype([('symbol', 'int32'), ('timestamp', 'int64'), ('offset', 'int64'), ('length', 'int64'), ('size', 'int64'),
+    ('key', 'int64')])
+# zlib only looks 32 KB back, so payloads are compressed in chunks against the same region of the key frame
+CHUNK = 16384
+DRIFT = 8192
+WINDOW = 32768
+
+
+class ZlibCodec:
+    name = 'zlib'
+
+    def __init__(self, level=6):
+        self.level = level
+
+    def compress(self, content, key=None):
+        '''
+        returns content compressed in CHUNK sized pieces, each one with the key frame around its offset as preset dictionary
+        '''
+        chunks = []
+        for start in range(0, len(content), CHUNK):
+            if key is None:
+                compressor = zlib.compressobj(self.level)
+            else:
+                compressor = zlib.compressobj(self.level, zdict=key[max(0, start - DRIFT):start + CHUNK + DRIFT][-WINDOW:])
+            chunks.append(compressor.compress(content[start:start + CHUNK]) + compressor.flush())
+        return struct.pack(f'<I{len(chunks)}I', len(chunks), *map(len, chunks)) + b''.join(chunks)
+
+    def decompress(self, data, key=None):
+        count, = struct.unpack_from('<I', data)
+        lengths = struct.unpack_from(f'<{count}I', data, 4)
+        position = 4 + 4 * count
+        content = []
+        for i, length in enumerate(lengths):
+            start = i * CHUNK
+            if key is None:
+                decompressor = zlib.decompressobj()
+            else:
+                decompressor = zlib.decompressobj(zdict=key[max(0, start - DRIFT):start + CHUNK + DRIFT][-WINDOW:])
+            content.append(decompressor.decompress(data[position:position + length]) + decompressor.flush())
+            position += length
+        return b''.join(content)
+
+
+class ZstdCodec:
+    name = 'zstd'
+
+    def __init__(self, level=6):
+        self.level = level
+
+    def dictionary(self, key):
+        return zstandard.ZstdCompressionDict(key, dict_type=zstandard.DICT_TYPE_RAWCONTENT)
+
+    def compress(self, content, key=None):
+        '''
+        returns content compressed as one frame, with the whole key frame as raw content dictionary
+        '''
+        if key is None:
+            return zstandard.ZstdCompressor(level=self.level).compress(content)
+        return zstandard.ZstdCompressor(level=self.level, dict_data=self.dictionary(key)).compress(content)
+
+    def decompress(self, data, key=None):
+        if key is None:
+            return zstandard.ZstdDecompressor().decompress(data)
+        return zstandard.ZstdDecompressor(dict_data=self.dictionary(key)).decompress(data)
+
+
+CODECS = {'zlib': ZlibCodec, 'zstd': ZstdCodec}
+
+
+class PayloadArchive:
+    def __init__(self, root='archive', codec=None, level=6, keyframe_interval=100, cache_size=16):
+        '''
+        __init__ of PayloadArchive class, an append-only archive of the raw option chain responses of nse
+        every day gets a folder root/YYYY-MM-DD with the compressed payloads of all symbols, an index of
+        (symbol, timestamp, offset, length, size, key frame) per payload and the codec and symbol names of the day
+        the first payload of a symbol is a key frame compressed on its own, later ones are compressed against it,
+        so any payload is read back with at most two decompressions and no scan of the day
+            codec => 'zstd' (needs zstandard) or 'zlib', zstd when it is installed
+            level => compression level
+            keyframe_interval => payloads of a symbol compressed against the same key frame before a new one is taken
+            cache_size => decompressed key frames kept for reads, least recently used ones are evicted
+        '''
+        self.root = root
+        self.codec = CODECS[codec or ('zstd' if zstandard is not None else 'zlib')](level)
+        self.keyframe_interval = keyframe_interval
+        self.lock = threading.Lock()
+        # symbol => (day, position of the key frame in the index, key frame content, payloads compressed against it),
+        # only the latest day of a symbol is kept, a poll of another day starts a new key frame
+        self.keyframes = {}
+        self.cache = ResultCache(cache_size)
+
+    def folder(self, day):
+        return os.path.join(self.root, str(day))
+
+    def meta(self, day):
+        '''
+        returns {'codec': name, 'symbols': [...]} of a day, the codec of the archive and no symbols for a new day
+        '''
+        path = os.path.join(self.folder(day), 'meta.json')
+        if not os.path.exists(path):
+            return {'codec': self.codec.name, 'symbols': []}
+        with open(path) as f:
+            return json.load(f)
+
+    def index(self, day):
+        '''
+        returns the payload index of a day as a numpy structured array
+        '''
+        path = os.path.join(self.folder(day), 'index.bin')
+        if not os.path.exists(path):
+            return np.zeros(0, dtype=INDEX_DTYPE)
+        return np.fromfile(path, dtype=INDEX_DTYPE)
+
+    def days(self):
+        return sorted(os.listdir(self.root)) if os.path.isdir(self.root) else []
+
+    def append(self, symbol, content, request=None):
+        '''
+        archives the raw response body of one poll of symbol and returns True, False when nse returned no data
+        or the payload of that symbol and records.timestamp is already archived
+            request => json object decoded from content, decoded again when not given
+        '''
+        content = bytes(content)
+        request = loads(content) if request is None else request
+        if not request:
+            return False
+        timestamp = parse_timestamp(request['records']['timestamp'])
+        day = str(timestamp.astype('datetime64[D]'))
+        with self.lock:
+            meta = self.meta(day)
+            if meta['codec'] != self.codec.name:
+                raise ValueError(f'{day} is archived with {meta["codec"]}, not {self.codec.name}')
+            index = self.index(day)
+            code = meta['symbols'].index(symbol) if symbol in meta['symbols'] else len(meta['symbols'])
+            if ((index['symbol'] == code) & (index['timestamp'] == timestamp.astype('int64'))).any():
+                return False
+            position = len(index)
+            frame_day, key, frame, count = self.keyframes.get(symbol, (None, None, None, 0))
+            if frame_day != day or count >= self.keyframe_interval:
+                key, frame, count = position, content, 0
+                data = self.codec.compress(content)
+            else:
+                data = self.codec.compress(content, frame)
+            self.keyframes[symbol] = (day, key, frame, count + 1)
+            folder = self.folder(day)
+            os.makedirs(folder, exist_ok=True)
+            path = os.path.join(folder, 'payloads.bin')
+            offset = os.path.getsize(path) if os.path.exists(path) else 0
+            # payload first and the index last, so readers never see an index entry without its bytes
+            with open(path, 'ab') as f:
+                f.write(data)
+            if code == len(meta['symbols']):
+                meta['symbols'].append(symbol)
+                temp = os.path.join(folder, f'meta.json.{os.getpid()}.tmp')
+                with open(temp, 'w') as f:
+                    json.dump(meta, f)
+                os.replace(temp, os.path.join(folder, 'meta.json'))
+            entry = np.array([(code, timestamp.astype('int64'), offset, len(data), len(content), key)], dtype=INDEX_DTYPE)
+            with open(os.path.join(folder, 'index.bin'), 'ab') as f:
+                entry.tofile(f)
+        return True
+
+    def timestamps(self, symbol, day):
+        '''
+        returns the archived records.timestamp values of symbol on day as numpy datetime64[s] in archive order
+        '''
+        meta = self.meta(day)
+        if symbol not in meta['symbols']:
+            return np.zeros(0, dtype='datetime64[s]')
+        index = self.index(day)
+        return index['timestamp'][index['symbol'] == meta['symbols'].index(symbol)].astype('datetime64[s]')
+
+    def entry(self, day, position, index):
+        '''
+        returns the decompressed payload at position of the index of day, key frames come from self.cache when they were read before
+        '''
+        codec = CODECS[self.meta(day)['codec']]()
+        with open(os.path.join(self.folder(day), 'payloads.bin'), 'rb') as f:
+            def raw(position):
+                f.seek(int(index[position]['offset']))
+                return f.read(int(index[position]['length']))
+            key = int(index[position]['key'])
+            frame = self.cache.get((day, key))
+            if frame is None:
+                frame = codec.decompress(raw(key))
+                self.cache.put((day, key), frame)
+            if key == position:
+                return frame
+            return codec.decompress(raw(position), frame)
+
+    def read(self, symbol, timestamp):
+        '''
+        returns the raw response body of symbol archived at records.timestamp as bytes, KeyError when it is not archived
+            timestamp => nse timestamp ('31-Dec-2020 15:30:00'), datetime or datetime64
+        '''
+        timestamp = parse_timestamp(timestamp)
+        day = str(timestamp.astype('datetime64[D]'))
+        meta = self.meta(day)
+        if symbol in meta['symbols']:
+            index = self.index(day)
+            found = np.flatnonzero((index['symbol'] == meta['symbols'].index(symbol)) & (index['timestamp'] == timestamp.astype('int64')))
+            if len(found):
+                return self.entry(day, int(found[0]), index)
+        raise KeyError(f'{symbol} {timestamp} is not archived')
+
+    def load(self, symbol, timestamp):
+        '''
+        returns the json object of symbol archived at records.timestamp, ready for ReplayNSE or ExpiryIndex
+        '''
+        return loads(self.read(symbol, timestamp))
+
+    def replay(self, symbol, day):
+        '''
+        yields the json objects of every archived payload of symbol on day in archive order
+        '''
+        meta = self.meta(day)
+        if symbol not in meta['symbols']:
+            return
+        index = self.index(day)
+        for position in np.flatnonzero(index['symbol'] == meta['symbols'].index(symbol)):
+            yield loads(self.entry(day, int(position), index))
+
+    def stats(self, day):
+        '''
+        returns payloads, raw bytes, archived bytes and their ratio of a day as a dict
+        '''
+        index = self.index(day)
+        size, length = int(index['size'].sum()), int(index['length'].sum())
+        return {'payloads': len(index), 'size': size, 'archived': length, 'ratio': size / length if length else 0.0}
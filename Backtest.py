@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+
+from Chain import indicator_values
+from MaxPain import max_pain_groups
+
+
+# chain columns a backtest reads from the store
+COLUMNS = ['OI_c', 'OI_p', 'TotalVol_c', 'TotalVol_p']
+EXPIRY_FORMAT = '%d-%b-%Y'
+
+
+def snapshot_metrics(rows, snapshots):
+    '''
+    returns maxpain, pcr_oi, pcr_vol and indicator of every snapshot as columns added to a copy of snapshots, in one batched pass
+        rows => stored chain rows with strikePrice and COLUMNS, as returned by SnapshotStore.read
+        snapshots => one row per snapshot with underlyingValue and rows, as returned by SnapshotStore.snapshots for the same range
+    indicator is get_indicator as a signed number, see Chain.indicator_values
+    '''
+    result = snapshots.reset_index(drop=True).copy()
+    n = len(result)
+    codes = np.repeat(np.arange(n), result['rows'].values.astype('int64'))
+    result['maxpain'] = max_pain_groups(codes, rows['strikePrice'].values, rows['OI_c'].values, rows['OI_p'].values, n)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for name, call, put in (('pcr_oi', 'OI_c', 'OI_p'), ('pcr_vol', 'TotalVol_c', 'TotalVol_p')):
+            sums_c = np.bincount(codes, weights=rows[call].values.astype('float64'), minlength=n)
+            sums_p = np.bincount(codes, weights=rows[put].values.astype('float64'), minlength=n)
+            result[name] = np.round(sums_p / sums_c, 1)
+    result['indicator'] = indicator_values(result['underlyingValue'].values, result['maxpain'].values)
+    return result
+
+
+def settlement_prices(snapshots):
+    '''
+    returns the last stored underlying value on the expiry date of every expiry as a pandas series indexed by expiryDate,
+    the settlement of expiries whose expiry day was polled until the close
+    '''
+    expiry_days = pd.to_datetime(snapshots['expiryDate'], format=EXPIRY_FORMAT)
+    on_expiry = snapshots[(snapshots['timestamp'].dt.normalize() == expiry_days) & snapshots['underlyingValue'].notna()]
+    return on_expiry.sort_values('timestamp').groupby('expiryDate')['underlyingValue'].last().rename('settlement')
+
+
+def backtest(store, symbols, start=None, end=None, settlements=None):
+    '''
+    returns maxpain, pcr_oi, pcr_vol and indicator of every stored snapshot of symbols joined to the settlement of its expiry
+    as a pandas dataframe with symbol, timestamp, expiryDate, underlyingValue, days (calendar days to expiry), settlement
+    and move (settlement against underlyingValue in percent), snapshots of expiries without a settlement are dropped
+        store => SnapshotStore the snapshots are read from
+        start, end => range of snapshot timestamps, open ended when not given
+        settlements => dict of symbol => {expiryDate: settlement price}, taken from the store on each expiry day when not given
+    '''
+    frames = []
+    for symbol in symbols:
+        snapshots = store.snapshots(symbol, start, end)
+        if snapshots.empty:
+            continue
+        result = snapshot_metrics(store.read(symbol, start, end, columns=COLUMNS), snapshots)
+        if settlements is not None and symbol in settlements:
+            prices = pd.Series(settlements[symbol], dtype='float64', name='settlement')
+            prices.index = prices.index.str.lower()
+        else:
+            # the expiry day may lie after end, so settlements always come from the whole stored history
+            prices = settlement_prices(store.snapshots(symbol))
+            prices.index = prices.index.str.lower()
+        result['settlement'] = result['expiryDate'].str.lower().map(prices)
+        result.insert(0, 'symbol', symbol)
+        frames.append(result.dropna(subset=['settlement']))
+    if not frames:
+        return pd.DataFrame(columns=['symbol', 'timestamp', 'expiryDate', 'underlyingValue', 'rows', 'maxpain', 'pcr_oi', 'pcr_vol',
+            'indicator', 'settlement', 'days', 'move'])
+    result = pd.concat(frames, ignore_index=True)
+    expiry_days = pd.to_datetime(result['expiryDate'], format=EXPIRY_FORMAT)
+    result['days'] = (expiry_days - result['timestamp'].dt.normalize()).dt.days
+    result['move'] = (result['settlement'] - result['underlyingValue']) / result['underlyingValue'] * 100
+    return result
+
+
+def signal_stats(results, by='days'):
+    '''
+    returns statistics of the maxpain and pcr signals of a backtest grouped by a column of results as a pandas dataframe
+        count => snapshots in the group
+        maxpain_error => mean distance of the settlement from the maxpain strike in percent of the settlement
+        maxpain_hits => share of snapshots where the underlying moved towards the maxpain strike until expiry
+        pcr_hits => share of snapshots where pcr_oi above 1 (below 1) was followed by a settlement above (below) the underlying
+        correlation => correlation of indicator with move, negative when expiries settle towards the maxpain strike
+    '''
+    moved = np.sign(results['move'])
+    frame = pd.DataFrame({
+        by: results[by],
+        'maxpain_error': (results['settlement'] - results['maxpain']).abs() / results['settlement'] * 100,
+        'maxpain_hits': (moved == np.sign(results['maxpain'] - results['underlyingValue'])) & (moved != 0),
+        'pcr_hits': moved == np.where(results['pcr_oi'] > 1, 1, -1),
+        'indicator': results['indicator'],
+        'move': results['move'],
+    })
+    groups = frame.groupby(by)
+    stats = groups.agg(count=('move', 'size'), maxpain_error=('maxpain_error', 'mean'), maxpain_hits=('maxpain_hits', 'mean'),
+        pcr_hits=('pcr_hits', 'mean'))
+    stats['correlation'] = groups.apply(lambda group: group['indicator'].corr(group['move']))
+    return stats
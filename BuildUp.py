@@ -0,0 +1,167 @@
+import threading
+from collections import deque, namedtuple
+
+import numpy as np
+
+from SnapshotStore import parse_timestamp
+
+
+# rolling windows in minutes
+WINDOWS = (5, 15, 30)
+# (delta name, chain column) of the values tracked on each side, LTP only decides the build-up label
+TRACKED = [('OI', 'OI'), ('Vol', 'TotalVol')]
+VALUES = [column + suffix for _, column in TRACKED + [('LTP', 'LTP')] for suffix in ('_c', '_p')]
+# label of every (LTP direction, OI direction), indexed by (sign of LTP change + 1) * 3 + sign of OI change + 1
+LABELS = np.array(['long unwinding', '', 'short build-up', '', '', '', 'short covering', '', 'long build-up'], dtype=object)
+# one poll of one expiry, values holds one row per strike and one column per VALUES entry
+Snapshot = namedtuple('Snapshot', ['time', 'strikes', 'values'])
+
+
+def buildup_columns(windows=WINDOWS):
+    '''
+    returns the names of the columns added by BuildUp.add_columns, d<name>_c is the change since the previous poll,
+    d<name><minutes>_c the change over the last minutes and BuildUp_c the label of the classifying window
+    '''
+    columns = []
+    for suffix in ('_c', '_p'):
+        for window in ('',) + tuple(windows):
+            columns += [f'd{name}{window}{suffix}' for name, _ in TRACKED]
+        columns.append('BuildUp' + suffix)
+    return columns
+
+
+def align(snapshot, strikes):
+    '''
+    returns the values of snapshot on strikes, a strike missing from snapshot gets nan
+    '''
+    if not len(snapshot.strikes):
+        return np.full((len(strikes), len(VALUES)), np.nan)
+    rows = np.minimum(np.searchsorted(snapshot.strikes, strikes), len(snapshot.strikes) - 1)
+    values = snapshot.values[rows]
+    values[snapshot.strikes[rows] != strikes] = np.nan
+    return values
+
+
+def classify(ltp_change, oi_change):
+    '''
+    returns long build-up (price and oi up), short build-up (price down, oi up), short covering (price up, oi down),
+    long unwinding (price and oi down) or '' for every strike
+    '''
+    with np.errstate(invalid='ignore'):
+        code = (np.sign(np.nan_to_num(ltp_change)) + 1) * 3 + np.sign(np.nan_to_num(oi_change)) + 1
+    return LABELS[code.astype(int)]
+
+
+class BuildUp:
+    def __init__(self, windows=WINDOWS, classify_window=5, capacity=512):
+        '''
+        __init__ of BuildUp class, intraday oi and volume changes per strike maintained incrementally from consecutive polls
+        every (symbol, expiry) keeps a ring buffer of its polls over the longest window, a new records.timestamp adds one poll
+        and computes its changes against the previous poll and the start of every window, nothing is recomputed over the day
+            windows => rolling windows in minutes, a window longer than the history so far covers the whole history
+            classify_window => window the build-up label is computed over, 0 for the previous poll
+            capacity => most polls kept per (symbol, expiry)
+        '''
+        self.windows = tuple(windows)
+        self.classify_window = classify_window
+        self.capacity = capacity
+        self.columns = buildup_columns(self.windows)
+        self.lock = threading.Lock()
+        self.rings = {}
+        self.changes = {}
+
+    def update(self, symbol, index):
+        '''
+        adds the polls of every expiry of an ExpiryIndex of symbol, payloads with an already seen or older timestamp are ignored
+        returns True when a new poll was added
+        '''
+        time = parse_timestamp(index.timestamp).astype('int64')
+        added = False
+        for key in index.sides:
+            with self.lock:
+                ring = self.rings.get((symbol, key))
+                if ring and ring[-1].time >= time:
+                    # nse has not published anything new since the last poll
+                    continue
+            arrays, _ = index.arrays(key)
+            snapshot = Snapshot(time, arrays['strikePrice'], np.column_stack([arrays[name] for name in VALUES]).astype('float64'))
+            with self.lock:
+                ring = self.rings.setdefault((symbol, key), deque(maxlen=self.capacity))
+                if ring and ring[-1].time >= time:
+                    continue
+                if ring and ring[-1].time // 86400 != time // 86400:
+                    # volumes restart every session, so a new day starts a new history
+                    ring.clear()
+                self.changes[symbol, key] = (index.timestamp, snapshot.strikes, self.compute(ring, snapshot))
+                ring.append(snapshot)
+                # only the newest poll at or before the start of the longest window is still needed
+                start = time - 60 * max(self.windows, default=0)
+                while len(ring) > 1 and ring[1].time <= start:
+                    ring.popleft()
+                added = True
+        return added
+
+    def baseline(self, ring, time, minutes):
+        '''
+        returns the newest poll of ring at or before minutes before time, the oldest poll when the history is shorter
+        '''
+        start = time - 60 * minutes
+        for snapshot in reversed(ring):
+            if snapshot.time <= start:
+                return snapshot
+        return ring[0]
+
+    def compute(self, ring, snapshot):
+        '''
+        returns dict of column => change of snapshot against the previous poll and the start of every window of ring
+        '''
+        n = len(snapshot.strikes)
+        changes = {}
+        baselines = [('', ring[-1] if ring else None)]
+        baselines += [(window, self.baseline(ring, snapshot.time, window) if ring else None) for window in self.windows]
+        for window, base in baselines:
+            if base is None:
+                values = np.full((n, len(VALUES)), np.nan)
+            else:
+                values = align(base, snapshot.strikes)
+                # a strike listed during the day starts from no open interest and no volume
+                values[:, :2 * len(TRACKED)] = np.nan_to_num(values[:, :2 * len(TRACKED)])
+            delta = snapshot.values - values
+            for i, suffix in enumerate(('_c', '_p')):
+                for j, (name, _) in enumerate(TRACKED):
+                    changes[f'd{name}{window}{suffix}'] = delta[:, 2 * j + i]
+                if window == (self.classify_window or ''):
+                    ltp = delta[:, 2 * len(TRACKED) + i]
+                    # no trade on either poll says nothing about the direction of the price
+                    ltp[(snapshot.values[:, 2 * len(TRACKED) + i] == 0) | (values[:, 2 * len(TRACKED) + i] == 0)] = np.nan
+                    changes['BuildUp' + suffix] = classify(ltp, delta[:, i])
+        return changes
+
+    def add_columns(self, df, symbol, expiry, timestamp=None):
+        '''
+        adds the columns of buildup_columns to an option chain dataframe of symbol and expiry in place
+        every column is nan ('' for BuildUp) when the latest poll of that expiry is not the one at timestamp or was never seen
+        '''
+        with self.lock:
+            timestamp_seen, strikes, changes = self.changes.get((symbol, str(expiry).lower()), (None, None, None))
+        if changes is None or (timestamp is not None and timestamp != timestamp_seen):
+            for column in self.columns:
+                df[column] = '' if column.startswith('BuildUp') else np.nan
+            return df
+        wanted = df['strikePrice'].values
+        rows = np.minimum(np.searchsorted(strikes, wanted), len(strikes) - 1)
+        found = strikes[rows] == wanted
+        for column in self.columns:
+            values = changes[column][rows]
+            if column.startswith('BuildUp'):
+                df[column] = np.where(found, values, '')
+            else:
+                df[column] = np.where(found, values, np.nan)
+        return df
+
+    def history(self, symbol, expiry):
+        '''
+        returns the number of polls of symbol and expiry kept in the ring buffer
+        '''
+        with self.lock:
+            return len(self.rings.get((symbol, str(expiry).lower()), ()))
@@ -0,0 +1,61 @@
+import threading
+from collections import OrderedDict
+
+
+class ResultCache:
+    def __init__(self, maxsize=128):
+        '''
+        __init__ of ResultCache class, a thread-safe dict with least recently used eviction
+            maxsize => maximum number of entries kept
+        '''
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        '''
+        returns the value stored for key and marks it as recently used, default if key is not cached
+        '''
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        '''
+        stores value for key, evicting the least recently used entries beyond maxsize
+        '''
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        '''
+        removes all entries, statistics are kept
+        '''
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def stats(self):
+        '''
+        returns hits, misses, hit ratio, evictions and current size as a dict
+        '''
+        with self.lock:
+            total = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses, 'hit_ratio': self.hits / total if total else 0.0,
+                'evictions': self.evictions, 'size': len(self.entries), 'maxsize': self.maxsize}
@@ -0,0 +1,182 @@
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from MaxPain import add_max_pain
+
+
+# (column, nse field, dtype, rounded to 1) of each side of the chain
+FIELDS = [
+    ('BuyQ', 'totalBuyQuantity', 'uint64', False),
+    ('SellQ', 'totalSellQuantity', 'uint64', False),
+    ('TotalVol', 'totalTradedVolume', 'uint64', False),
+    ('pOI', 'pchangeinOpenInterest', 'float64', True),
+    ('OI', 'openInterest', 'uint64', False),
+    ('pLTP', 'pChange', 'float64', True),
+    ('LTP', 'lastPrice', 'float64', False),
+    ('IV', 'impliedVolatility', 'float64', True),
+]
+COLUMNS = ['BuyQ_c', 'SellQ_c', 'TotalVol_c', 'pOI_c', 'OI_c', 'pLTP_c', 'LTP_c', 'IV_c', 'strikePrice',
+    'IV_p', 'LTP_p', 'pLTP_p', 'OI_p', 'pOI_p', 'TotalVol_p', 'BuyQ_p', 'SellQ_p']
+DTYPES = dict([(name + suffix, dtype) for name, _, dtype, _ in FIELDS for suffix in ('_c', '_p')] + [('strikePrice', 'float64')])
+
+
+KEYS = [key for _, key, _, _ in FIELDS] + ['strikePrice']
+# result of analysing one expiry of a fetched chain, df is the chain frame with MaxPain columns made for that result
+Analysis = namedtuple('Analysis', ['type', 'symbol', 'expiry', 'timestamp', 'underlyingValue', 'maxpain', 'pcr_oi', 'pcr_vol', 'indicator', 'df'])
+
+
+def split_rows(rows):
+    '''
+    returns (strikes, values) from rows of KEYS values, values holds one row per record and one column per FIELDS entry
+    '''
+    values = np.array(rows, dtype='float64').reshape(len(rows), len(KEYS))
+    return values[:, -1], values[:, :-1]
+
+
+def side_values(data):
+    '''
+    returns (strikes, values) of a list of CE or PE records
+    '''
+    return split_rows([[record[key] for key in KEYS] for record in data])
+
+
+def align_sides(ce_strikes, ce_values, pe_strikes, pe_values):
+    '''
+    returns the option chain as a dict of column name => numpy array in COLUMNS order
+    both sides are aligned on the sorted union of their strikes, a missing side is filled with 0
+    '''
+    strikes = np.union1d(ce_strikes, pe_strikes)
+    columns = {'strikePrice': strikes}
+    for suffix, side_strikes, values in (('_c', ce_strikes, ce_values), ('_p', pe_strikes, pe_values)):
+        rows = np.searchsorted(strikes, side_strikes)
+        for i, (name, _, dtype, rounded) in enumerate(FIELDS):
+            column = np.zeros(len(strikes), dtype=dtype)
+            column[rows] = np.round(values[:, i], 1) if rounded else values[:, i]
+            columns[name + suffix] = column
+    return {name: columns[name] for name in COLUMNS}
+
+
+def build_oc_arrays(ce_data, pe_data):
+    '''
+    builds the option chain of one expiry date from lists of CE and PE records as a dict of column name => numpy array
+    '''
+    return align_sides(*side_values(ce_data), *side_values(pe_data))
+
+
+def build_oc_struct(ce_data, pe_data):
+    '''
+    builds the option chain of one expiry date as a numpy structured array with one record per strike
+    '''
+    columns = build_oc_arrays(ce_data, pe_data)
+    struct = np.empty(len(columns['strikePrice']), dtype=[(name, DTYPES[name]) for name in COLUMNS])
+    for name, column in columns.items():
+        struct[name] = column
+    return struct
+
+
+def build_oc_df(ce_data, pe_data):
+    '''
+    builds the option chain dataframe from lists of CE and PE records of one expiry date
+    '''
+    return pd.DataFrame(build_oc_arrays(ce_data, pe_data), columns=COLUMNS)
+
+
+def get_pcr(df):
+    '''
+    returns (pcr_oi, pcr_vol) of an option chain dataframe rounded to 1
+    '''
+    pcr_oi = round(df['OI_p'].sum()/df['OI_c'].sum(),1)
+    pcr_vol = round(df['TotalVol_p'].sum()/df['TotalVol_c'].sum(),1)
+    return pcr_oi, pcr_vol
+
+
+def indicator_values(underlyingValue, maxpain):
+    '''
+    returns get_indicator as signed numbers for scalars or numpy arrays, percent above (> 0) or below (< 0) the maxpain strike
+    '''
+    underlyingValue = np.asarray(underlyingValue, dtype='float64')
+    maxpain = np.asarray(maxpain, dtype='float64')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        above = (underlyingValue - maxpain) / maxpain * 100
+        below = -(maxpain - underlyingValue) / underlyingValue * 100
+    return np.round(np.where(underlyingValue > maxpain, above, below), 1)
+
+
+class ExpiryIndex:
+    def __init__(self, request, expiry=None):
+        '''
+        __init__ of ExpiryIndex class
+        splits records.data of a fetched nse json object by expiry date in a single pass, keeping only the fields the chain uses
+        as compact numpy arrays, frames are built lazily and kept
+            expiry => only keep this expiry date, others are skipped while reading
+        '''
+        self.timestamp = request['records']['timestamp']
+        self.underlyingValue = request['records']['underlyingValue']
+        self.names = {str(name).lower(): name for name in request['records'].get('expiryDates', [])}
+        wanted = str(expiry).lower() if expiry else None
+        rows = {}
+        for data in request['records']['data']:
+            key = str(data['expiryDate']).lower()
+            self.names.setdefault(key, data['expiryDate'])
+            if wanted and key != wanted:
+                continue
+            ce_rows, pe_rows = rows.setdefault(key, ([], []))
+            if "CE" in data:
+                ce_rows.append([data['CE'][field] for field in KEYS])
+            if "PE" in data:
+                pe_rows.append([data['PE'][field] for field in KEYS])
+        self.sides = {key: split_rows(ce_rows) + split_rows(pe_rows) for key, (ce_rows, pe_rows) in rows.items()}
+        if request.get('filtered', {}).get('data'):
+            self.nearest = request['filtered']['data'][0]['expiryDate']
+        else:
+            self.nearest = next(iter(self.names.values()), None)
+        self.frames = {}
+
+    def expiry_dates(self):
+        '''
+        returns expiry dates available in the payload as a list, nearest first
+        '''
+        return list(self.names.values())
+
+    def frame(self, expiry=None):
+        '''
+        returns (df, expiry) of provided expiry date with MaxPain columns, nearest expiry when expiry is not given
+        raises KeyError when the expiry is not in the payload
+        '''
+        key = str(expiry or self.nearest).lower()
+        if key not in self.frames:
+            df = pd.DataFrame(align_sides(*self.sides[key]), columns=COLUMNS)
+            add_max_pain(df)
+            self.frames[key] = df
+        return self.frames[key], self.names[key]
+
+    def arrays(self, expiry=None):
+        '''
+        returns (dict of column name => numpy array, expiry) of provided expiry date without building a dataframe
+        '''
+        key = str(expiry or self.nearest).lower()
+        return align_sides(*self.sides[key]), self.names[key]
+
+    def metrics(self, expiry=None):
+        '''
+        returns maxpain, pcr_oi and pcr_vol of provided expiry date as a dict
+        '''
+        df, expiry = self.frame(expiry)
+        pcr_oi, pcr_vol = get_pcr(df)
+        maxpain = df.loc[df['MaxPain'].idxmin()]['strikePrice']
+        return {'expiry': expiry, 'maxpain': maxpain, 'pcr_oi': pcr_oi, 'pcr_vol': pcr_vol}
+
+    def all_frames(self):
+        '''
+        returns dict of expiry date => df for every expiry date in the payload
+        '''
+        return {expiry: self.frame(expiry)[0] for expiry in self.expiry_dates()}
+
+    def all_metrics(self):
+        '''
+        returns metrics of every expiry date in the payload as a pandas dataframe indexed by expiry
+        '''
+        return pd.DataFrame([self.metrics(expiry) for expiry in self.expiry_dates()]).set_index('expiry')
+
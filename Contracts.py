@@ -0,0 +1,87 @@
+import os
+import re
+import json
+import time
+import threading
+from html import unescape
+
+
+SELECT = re.compile(r'<select\b[^>]*\bid\s*=\s*["\']equity_optionchain_select["\'][^>]*>(.*?)</select>', re.S | re.I)
+OPTION = re.compile(r'<option\b[^>]*>(.*?)</option>', re.S | re.I)
+TAG = re.compile(r'<[^>]+>')
+
+
+def extract_indices(html):
+    '''
+    returns the index contract names listed in the equity_optionchain_select dropdown of the nse option chain page
+    the dropdown is cut out with a regular expression, BeautifulSoup is only imported when the page no longer matches it
+    '''
+    match = SELECT.search(html)
+    if match:
+        names = [unescape(TAG.sub('', option)).strip() for option in OPTION.findall(match.group(1))]
+        return [name for name in names if name]
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, "html.parser")
+    indices = soup.find("select", id="equity_optionchain_select")
+    return indices.text.strip().split("\n")
+
+
+class ContractCache:
+    def __init__(self, path=None, ttl=24 * 3600):
+        '''
+        __init__ of ContractCache class, keeps the lists of contract names nse offers options on
+            path => json file the lists are persisted to so new processes start warm, memory only when None
+            ttl => seconds a list stays valid, nse changes them at most daily
+        '''
+        self.path = path
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = None
+
+    def load(self):
+        if self.entries is None:
+            self.entries = {}
+            if self.path and os.path.exists(self.path):
+                try:
+                    with open(self.path) as f:
+                        self.entries = json.load(f)
+                except ValueError:
+                    pass
+        return self.entries
+
+    def get(self, kind):
+        '''
+        returns the cached list of kind (indices/equities), None when it is missing or older than ttl
+        '''
+        with self.lock:
+            entry = self.load().get(kind)
+        if entry and time.time() - entry['time'] < self.ttl:
+            return list(entry['names'])
+        return None
+
+    def put(self, kind, names):
+        '''
+        stores the list of kind, the file is replaced atomically so concurrent processes never read a partial one
+        '''
+        with self.lock:
+            self.load()[kind] = {'time': time.time(), 'names': list(names)}
+            self.save()
+
+    def invalidate(self, kind=None):
+        '''
+        forgets the list of kind, every list when kind is None
+        '''
+        with self.lock:
+            entries = self.load()
+            for key in ([kind] if kind else list(entries)):
+                entries.pop(key, None)
+            self.save()
+
+    def save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        temp = f'{self.path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(temp, 'w') as f:
+            json.dump(self.entries, f)
+        os.replace(temp, self.path)
@@ -0,0 +1,24 @@
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def loads(content):
+    '''
+    parses a json document from bytes or str, using orjson when it is installed and the json module otherwise
+    '''
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def decode_chain(content, expiry=None):
+    '''
+    parses a raw nse option chain response and returns an ExpiryIndex holding only the fields the chain uses
+        expiry => only keep this expiry date
+    '''
+    from Chain import ExpiryIndex
+    return ExpiryIndex(loads(content), expiry)
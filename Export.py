@@ -0,0 +1,313 @@
+import os
+import gzip
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from OptionChain import NSE
+from Scanner import TokenBucket
+from SnapshotStore import parse_timestamp
+
+
+# columns put in front of the chain frame so the rows of every symbol and expiry can share one file
+KEY_COLUMNS = ['type', 'symbol', 'expiry', 'timestamp', 'underlyingValue']
+
+
+class AtomicWriter(ABC):
+    '''
+    base of the export writers, everything is written to a temp file next to path that replaces path only on commit,
+    so readers see the previous file or the complete new one and never a partial one
+    '''
+    def __init__(self, path):
+        self.path = path
+        folder = os.path.dirname(os.path.abspath(path))
+        os.makedirs(folder, exist_ok=True)
+        self.temp = os.path.join(folder, f'.{os.path.basename(path)}.{os.getpid()}.tmp')
+
+    @abstractmethod
+    def write(self, df):
+        '''
+        writes the rows of df to self.temp
+        '''
+
+    def close(self):
+        pass
+
+    def commit(self):
+        self.close()
+        os.replace(self.temp, self.path)
+
+    def abort(self):
+        try:
+            self.close()
+        finally:
+            if os.path.exists(self.temp):
+                os.remove(self.temp)
+
+
+class CsvWriter(AtomicWriter):
+    def __init__(self, path):
+        '''
+        __init__ of CsvWriter class, appends every chunk to one csv file with a single header, gzip compressed for a .gz path
+        '''
+        super().__init__(path)
+        self.file = gzip.open(self.temp, 'wt', newline='') if path.endswith('.gz') else open(self.temp, 'w', newline='')
+        self.header = True
+
+    def write(self, df):
+        df.to_csv(self.file, header=self.header, index=False)
+        self.header = False
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetWriter(AtomicWriter):
+    def __init__(self, path, compression='snappy'):
+        '''
+        __init__ of ParquetWriter class, writes every chunk as one row group of a parquet file, needs pyarrow
+        '''
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError('parquet export needs pyarrow, pip install pyarrow') from None
+        super().__init__(path)
+        self.pa, self.pq = pyarrow, pyarrow.parquet
+        self.compression = compression
+        self.writer = None
+
+    def write(self, df):
+        table = self.pa.Table.from_pandas(df, preserve_index=False)
+        if self.writer is None:
+            self.writer = self.pq.ParquetWriter(self.temp, table.schema, compression=self.compression)
+        else:
+            table = table.cast(self.writer.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+
+class ExcelWriter(AtomicWriter):
+    def __init__(self, path):
+        '''
+        __init__ of ExcelWriter class, writes the rows of every symbol to its own sheet as they come
+        uses xlsxwriter in constant memory mode or openpyxl in write only mode, whichever is installed
+        '''
+        super().__init__(path)
+        try:
+            import xlsxwriter
+            self.workbook = xlsxwriter.Workbook(self.temp, {'constant_memory': True})
+            self.xlsxwriter = True
+        except ImportError:
+            try:
+                import openpyxl
+            except ImportError:
+                raise ImportError('excel export needs xlsxwriter or openpyxl, pip install xlsxwriter') from None
+            self.workbook = openpyxl.Workbook(write_only=True)
+            self.xlsxwriter = False
+        self.sheets = set()
+        self.symbol = None
+        self.sheet = None
+        self.row = 0
+
+    def new_sheet(self, symbol, columns):
+        name, count = str(symbol)[:31], 1
+        while name in self.sheets:
+            count += 1
+            name = f'{str(symbol)[:27]} ({count})'
+        self.sheets.add(name)
+        self.symbol = symbol
+        self.sheet = self.workbook.add_worksheet(name) if self.xlsxwriter else self.workbook.create_sheet(name)
+        self.row = 0
+        self.append(columns)
+
+    def append(self, values):
+        if self.xlsxwriter:
+            self.sheet.write_row(self.row, 0, values)
+        else:
+            self.sheet.append(values)
+        self.row += 1
+
+    def write(self, df):
+        columns = list(df.columns)
+        # excel has no nan and no timezone free datetime64, blanks and python datetimes are written instead
+        values = df.astype(object).where(df.notna(), None)
+        for symbol, rows in values.groupby('symbol', sort=False):
+            if symbol != self.symbol:
+                self.new_sheet(symbol, columns)
+            for row in rows.itertuples(index=False, name=None):
+                self.append([value.to_pydatetime() if isinstance(value, pd.Timestamp) else value for value in row])
+
+    def close(self):
+        if self.workbook is None:
+            return
+        if self.xlsxwriter:
+            self.workbook.close()
+        else:
+            if not self.sheets:
+                self.workbook.create_sheet('empty')
+            self.workbook.save(self.temp)
+        self.workbook = None
+
+
+WRITERS = {'csv': CsvWriter, 'parquet': ParquetWriter, 'xlsx': ExcelWriter}
+SUFFIXES = {'.csv': 'csv', '.gz': 'csv', '.parquet': 'parquet', '.pq': 'parquet', '.xlsx': 'xlsx'}
+EXTENSIONS = {'csv': '.csv', 'parquet': '.parquet', 'xlsx': '.xlsx'}
+
+
+def export_format(filename):
+    '''
+    returns csv, parquet or xlsx from the extension of filename (.csv, .csv.gz, .parquet, .pq, .xlsx), raises ValueError otherwise
+    '''
+    suffix = os.path.splitext(filename)[1].lower()
+    if suffix not in SUFFIXES or (suffix == '.gz' and not filename.lower().endswith('.csv.gz')):
+        raise ValueError(f'unknown export format of {filename}, use .csv, .csv.gz, .parquet or .xlsx')
+    return SUFFIXES[suffix]
+
+
+class Exporter:
+    def __init__(self, nse=None, max_workers=4, rate=3, burst=None, chunk_rows=10000):
+        '''
+        __init__ of Exporter class, streams the full chain frame of every expiry of every symbol of a sweep to csv, parquet or excel
+        symbols are fetched at most max_workers ahead of the writer and their frames are written in chunks of about chunk_rows,
+        so memory stays flat whatever the number of symbols
+            nse => NSE instance whose pooled session and cookies are shared by all workers
+            max_workers => maximum number of symbols fetched at the same time
+            rate, burst => token bucket limiting requests per second sent to nse
+            chunk_rows => rows gathered before a chunk is written, one parquet row group per chunk
+        '''
+        self.nse = nse or NSE(pool_size=max_workers)
+        self.max_workers = max_workers
+        self.bucket = TokenBucket(rate, burst)
+        self.chunk_rows = chunk_rows
+        self.errors = {}
+
+    def load(self, type, symbol):
+        self.bucket.acquire()
+        return self.nse.load(type=type, symbol=symbol)[1]
+
+    def frames(self, targets):
+        '''
+        yields the chain frame of every expiry of every target in target order with KEY_COLUMNS in front, a target with an
+        expiry only yields that one, targets whose fetch fails are left out and recorded in self.errors
+            targets => iterable of (type, symbol) or (type, symbol, expiry) tuples
+        '''
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for target in targets:
+                type, symbol, expiry = tuple(target) + (None,) * (3 - len(target))
+                pending.append((type, symbol, expiry, executor.submit(self.load, type, symbol)))
+                if len(pending) >= self.max_workers:
+                    yield from self.expiry_frames(*pending.popleft())
+            while pending:
+                yield from self.expiry_frames(*pending.popleft())
+
+    def expiry_frames(self, type, symbol, expiry, future):
+        try:
+            index = future.result()
+            if index is None:
+                raise ValueError(f'no option chain data for {type} {symbol}')
+            expiries = [expiry] if expiry else index.expiry_dates()
+            timestamp = parse_timestamp(index.timestamp)
+        except Exception as err:
+            self.errors[type, symbol, expiry] = f'{err.__class__.__name__}: {err}'
+            self.nse.metrics.error('export')
+            print("Exporter: ", err)
+            return
+        for name in expiries:
+            try:
+                frame, name = index.frame(name)
+            except KeyError as err:
+                self.errors[type, symbol, name] = f'unknown expiry {err}'
+                continue
+            df = frame.copy()
+            for i, (column, value) in enumerate(zip(KEY_COLUMNS, (type, symbol, name, timestamp, index.underlyingValue))):
+                df.insert(i, column, value)
+            yield df
+
+    def write(self, writer, frames):
+        '''
+        writes frames to writer in chunks of about self.chunk_rows rows and returns the number of rows written
+        '''
+        chunk, size, rows = [], 0, 0
+        for df in frames:
+            chunk.append(df)
+            size += len(df)
+            if size >= self.chunk_rows:
+                with self.nse.metrics.timer('export'):
+                    writer.write(pd.concat(chunk, ignore_index=True))
+                rows += size
+                chunk, size = [], 0
+        if chunk:
+            with self.nse.metrics.timer('export'):
+                writer.write(pd.concat(chunk, ignore_index=True))
+            rows += size
+        self.nse.metrics.count('rows', rows, 'export')
+        return rows
+
+    def export(self, targets, filename='chains.csv', folder=None, format=None):
+        '''
+        exports the chain frames of all targets and returns dict of written path => rows
+        errors of failed targets, and paths left unwritten because no target had rows, are in self.errors
+            targets => iterable of (type, symbol) or (type, symbol, expiry) tuples
+            filename => file holding the rows of all targets, its extension picks the format (.csv, .csv.gz, .parquet, .xlsx),
+                excel files get one sheet per symbol
+            folder => when given, every symbol is written to its own folder/SYMBOL.ext instead, ext taken from the format
+            format => csv, parquet or xlsx, overrides the extension
+        a file only replaces an existing one once it is complete, an error while writing leaves the previous file in place
+        '''
+        format = format or export_format(filename)
+        self.errors = {}
+        if not folder:
+            rows = self.write_file(WRITERS[format], filename, self.frames(targets))
+            return {filename: rows} if rows else {}
+        extension = '.csv.gz' if format == 'csv' and filename.lower().endswith('.csv.gz') else EXTENSIONS[format]
+        # targets of one symbol are made adjacent so each symbol file is written once with all of them
+        targets = [tuple(target) for target in targets]
+        first = {}
+        for target in targets:
+            first.setdefault(target[1], len(first))
+        targets.sort(key=lambda target: first[target[1]])
+        written = {}
+        for group in self.symbol_frames(self.frames(targets)):
+            path = os.path.join(folder, f'{group[0]["symbol"].iloc[0]}{extension}')
+            rows = self.write_file(WRITERS[format], path, group)
+            if rows:
+                written[path] = rows
+        return written
+
+    def symbol_frames(self, frames):
+        '''
+        yields lists of the consecutive frames of one symbol
+        '''
+        group = []
+        for df in frames:
+            if group and df['symbol'].iloc[0] != group[0]['symbol'].iloc[0]:
+                yield group
+                group = []
+            group.append(df)
+        if group:
+            yield group
+
+    def write_file(self, writer_class, path, frames):
+        '''
+        writes frames to path and returns the number of rows, a file without rows is not committed and the previous one is kept
+        '''
+        writer = writer_class(path)
+        try:
+            rows = self.write(writer, frames)
+        except BaseException:
+            writer.abort()
+            raise
+        if not rows:
+            writer.abort()
+            self.errors[path] = 'no rows to write, the previous file is kept'
+            return 0
+        writer.commit()
+        return rows
@@ -0,0 +1,205 @@
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from Chain import FIELDS
+
+try:
+    from scipy.special import ndtr
+except ImportError:
+    ndtr = None
+
+
+# nse option calculator defaults, expiries settle at 15:30 ist and time is counted in calendar years
+RATE = 0.1
+EXPIRY_TIME = '15:30:00'
+TIMESTAMP_FORMAT = '%d-%b-%Y %H:%M:%S'
+YEAR = 365 * 24 * 3600
+MIN_TIME = 60 / YEAR
+SIDES = (('_c', True), ('_p', False))
+GREEKS = ['IVs', 'Delta', 'Gamma', 'Theta', 'Vega']
+LTP = [name for name, _, _, _ in FIELDS].index('LTP')
+
+
+def norm_cdf(x):
+    '''
+    returns the standard normal cdf of every value of x, scipy when it is installed and Hart's double precision
+    approximation otherwise
+    '''
+    x = np.asarray(x, dtype='float64')
+    if ndtr is not None:
+        return ndtr(x)
+    a = np.abs(x)
+    exponential = np.exp(-a * a / 2)
+    with np.errstate(over='ignore', invalid='ignore', divide='ignore'):
+        numerator = ((((((0.0352624965998911 * a + 0.700383064443688) * a + 6.37396220353165) * a + 33.912866078383) * a
+            + 112.079291497871) * a + 221.213596169931) * a + 220.206867912376)
+        denominator = (((((((0.0883883476483184 * a + 1.75566716318264) * a + 16.064177579207) * a + 86.7807322029461) * a
+            + 296.564248779674) * a + 637.333633378831) * a + 793.826512519948) * a + 440.413735824752)
+        tail = a + 1 / (a + 2 / (a + 3 / (a + 4 / (a + 0.65))))
+        lower = np.where(a < 7.07106781186547, exponential * numerator / denominator, exponential / tail / 2.506628274631)
+    lower = np.where(a > 37, 0.0, lower)
+    return np.where(x > 0, 1 - lower, lower)
+
+
+def norm_pdf(x):
+    return np.exp(-np.square(x) / 2) / np.sqrt(2 * np.pi)
+
+
+@lru_cache(maxsize=1024)
+def time_to_expiry(expiry, timestamp):
+    '''
+    returns years from records.timestamp of nse ('31-Dec-2020 15:30:00') until 15:30 on the expiry date ('28-Jan-2021'),
+    at least one minute so expiring contracts keep finite greeks
+    '''
+    now = datetime.strptime(timestamp, TIMESTAMP_FORMAT)
+    settle = datetime.strptime(f'{expiry} {EXPIRY_TIME}', TIMESTAMP_FORMAT)
+    return max((settle - now).total_seconds() / YEAR, MIN_TIME)
+
+
+def d1_d2(spot, strikes, t, vol, rate):
+    sqrt_t = np.sqrt(t)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d1 = (np.log(spot / strikes) + (rate + vol * vol / 2) * t) / (vol * sqrt_t)
+    return d1, d1 - vol * sqrt_t
+
+
+def bs_price(spot, strikes, t, vol, rate=RATE, call=True):
+    '''
+    returns black scholes prices of european options, every argument may be a scalar or a numpy array
+        call => True for calls, False for puts, or a boolean array
+    '''
+    d1, d2 = d1_d2(spot, strikes, t, vol, rate)
+    discount = strikes * np.exp(-rate * t)
+    calls = spot * norm_cdf(d1) - discount * norm_cdf(d2)
+    return np.where(call, calls, calls - spot + discount)
+
+
+def bs_greeks(spot, strikes, t, vol, rate=RATE, call=True):
+    '''
+    returns dict of delta, gamma, theta (per calendar day) and vega (per 1% of volatility) of european options
+    '''
+    d1, d2 = d1_d2(spot, strikes, t, vol, rate)
+    sqrt_t = np.sqrt(t)
+    pdf = norm_pdf(d1)
+    discount = strikes * np.exp(-rate * t)
+    delta = norm_cdf(d1)
+    decay = -spot * pdf * vol / (2 * sqrt_t)
+    theta_c = decay - rate * discount * norm_cdf(d2)
+    theta_p = decay + rate * discount * norm_cdf(-d2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        gamma = pdf / (spot * vol * sqrt_t)
+    return {
+        'Delta': np.where(call, delta, delta - 1),
+        'Gamma': gamma,
+        'Theta': np.where(call, theta_c, theta_p) / 365,
+        'Vega': spot * pdf * sqrt_t / 100,
+    }
+
+
+def implied_volatility(prices, spot, strikes, t, rate=RATE, call=True, tol=1e-8, max_iter=100, low=1e-4, high=5.0):
+    '''
+    solves black scholes implied volatility of every option at once and returns it as a numpy array (annualised, 0.2 => 20%)
+    every iteration takes a newton step where it stays inside the bracket of the root and bisects otherwise,
+    options priced outside the no arbitrage bounds or without a price get nan
+    '''
+    prices, spot, strikes, t = np.broadcast_arrays(*(np.asarray(value, dtype='float64') for value in (prices, spot, strikes, t)))
+    call = np.broadcast_to(call, prices.shape)
+    discount = strikes * np.exp(-rate * t)
+    lower = np.where(call, np.maximum(spot - discount, 0), np.maximum(discount - spot, 0))
+    upper = np.where(call, spot, discount)
+    valid = (prices > lower) & (prices < upper) & (strikes > 0) & (t > 0)
+
+    lo = np.full(prices.shape, low)
+    hi = np.full(prices.shape, high)
+    # Brenner-Subrahmanyam at the money approximation as the starting point
+    vol = np.clip(np.sqrt(2 * np.pi / t) * prices / spot, 0.05, 2.0)
+    active = valid.copy()
+    for _ in range(max_iter):
+        if not active.any():
+            break
+        index = np.flatnonzero(active)
+        s, k, tt, v, c, discount_k = spot[index], strikes[index], t[index], vol[index], call[index], discount[index]
+        d1, d2 = d1_d2(s, k, tt, v, rate)
+        value = s * norm_cdf(d1) - discount_k * norm_cdf(d2)
+        diff = np.where(c, value, value - s + discount_k) - prices[index]
+        vega = s * norm_pdf(d1) * np.sqrt(tt)
+        above = diff > 0
+        hi[index] = np.where(above, v, hi[index])
+        lo[index] = np.where(above, lo[index], v)
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            step = v - diff / vega
+        inside = (step > lo[index]) & (step < hi[index]) & np.isfinite(step)
+        done = (np.abs(diff) < tol * np.maximum(prices[index], 1)) | (hi[index] - lo[index] < tol)
+        vol[index] = np.where(done, v, np.where(inside, step, (lo[index] + hi[index]) / 2))
+        active[index[done]] = False
+    return np.where(valid, vol, np.nan)
+
+
+def chain_greeks(strikes, ltp_c, ltp_p, spot, t, rate=RATE):
+    '''
+    returns dict of column name => numpy array with the solved implied volatility (IVs, in percent like nse's IV) and greeks
+    of both sides of a chain, strikes without a traded price get nan
+        spot, t => scalars or one value per strike when strikes of several chains are solved together
+    '''
+    strikes = np.asarray(strikes, dtype='float64')
+    n = len(strikes)
+    spot = np.broadcast_to(np.asarray(spot, dtype='float64'), (n,))
+    t = np.broadcast_to(np.asarray(t, dtype='float64'), (n,))
+    prices = np.concatenate([ltp_c, ltp_p]).astype('float64')
+    both, spot, t = np.tile(strikes, 2), np.tile(spot, 2), np.tile(t, 2)
+    call = np.repeat([True, False], n)
+    vol = implied_volatility(prices, spot, both, t, rate, call)
+    values = bs_greeks(spot, both, t, vol, rate, call)
+    values['IVs'] = vol * 100
+    columns = {}
+    for suffix, is_call in SIDES:
+        for name in GREEKS:
+            columns[name + suffix] = values[name][:n] if is_call else values[name][n:]
+    return columns
+
+
+def add_greeks(df, underlyingValue, expiry, timestamp, rate=RATE):
+    '''
+    adds IVs, Delta, Gamma, Theta and Vega columns of both sides to an option chain dataframe of one expiry date in place
+    '''
+    t = time_to_expiry(expiry, timestamp)
+    for name, column in chain_greeks(df['strikePrice'].values, df['LTP_c'].values, df['LTP_p'].values, underlyingValue, t, rate).items():
+        df[name] = column
+    return df
+
+
+def greeks_surface(indexes, rate=RATE):
+    '''
+    returns IVs and greeks of every strike and expiry of several symbols, solved as one batch, as a pandas dataframe
+    with symbol, expiryDate, strikePrice and the columns of chain_greeks
+        indexes => dict of symbol => ExpiryIndex
+    '''
+    symbols, expiries, strikes, ltp_c, ltp_p, spots, times = [], [], [], [], [], [], []
+    for symbol, index in indexes.items():
+        for expiry in index.expiry_dates():
+            if str(expiry).lower() not in index.sides:
+                continue
+            ce_strikes, ce_values, pe_strikes, pe_values = index.sides[str(expiry).lower()]
+            # only LTP is needed, so both sides are aligned on their strikes without building the whole chain
+            strike = np.union1d(ce_strikes, pe_strikes)
+            n = len(strike)
+            for prices, side_strikes, values in ((ltp_c, ce_strikes, ce_values), (ltp_p, pe_strikes, pe_values)):
+                column = np.zeros(n)
+                column[np.searchsorted(strike, side_strikes)] = values[:, LTP]
+                prices.append(column)
+            symbols.append(np.full(n, symbol, dtype=object))
+            expiries.append(np.full(n, expiry, dtype=object))
+            strikes.append(strike)
+            spots.append(np.full(n, index.underlyingValue, dtype='float64'))
+            times.append(np.full(n, time_to_expiry(expiry, index.timestamp)))
+    columns = ['symbol', 'expiryDate', 'strikePrice'] + [name + suffix for suffix, _ in SIDES for name in GREEKS]
+    if not strikes:
+        return pd.DataFrame(columns=columns)
+    strikes = np.concatenate(strikes)
+    values = chain_greeks(strikes, np.concatenate(ltp_c), np.concatenate(ltp_p), np.concatenate(spots), np.concatenate(times), rate)
+    data = {'symbol': np.concatenate(symbols), 'expiryDate': np.concatenate(expiries), 'strikePrice': strikes}
+    data.update(values)
+    return pd.DataFrame(data, columns=columns)
@@ -0,0 +1,21 @@
+def round1(value):
+    '''
+    rounds to 1 decimal like numpy does (half to even of value * 10), so both metrics paths give the pandas results
+    '''
+    return round(value * 10) / 10
+
+
+def ratio(numerator, denominator):
+    '''
+    returns numerator / denominator rounded to 1, inf or nan for a zero denominator like a pandas sum would
+    '''
+    if not denominator:
+        return float('nan') if not numerator else float('inf')
+    return round1(numerator / denominator)
+
+
+def get_indicator(underlyingValue, maxpain):
+    '''
+    returns how far in percent the underlying is above (>maxpain) or below (<maxpain) the maxpain strike
+    '''
+    return '>maxpain ' + str(round((underlyingValue-maxpain)/maxpain*100, 1)) if underlyingValue>maxpain else '<maxpain ' + str(round((maxpain-underlyingValue)/underlyingValue*100, 1))
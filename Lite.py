@@ -0,0 +1,196 @@
+import sys
+import json
+import zlib
+import argparse
+from http.cookiejar import CookieJar
+from urllib.error import HTTPError
+from urllib.request import build_opener, HTTPCookieProcessor
+
+from Decode import loads
+from Indicator import ratio, get_indicator
+
+
+# nothing here imports pandas, numpy is only imported by use_numpy=True, or use_numpy=None when it is installed
+HEADERS = {
+    'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/87.0.4280.88 Safari/537.36',
+    'accept-encoding': 'gzip, deflate',
+    'accept-language': 'en-IN,en-GB;q=0.9,en-US;q=0.8,en;q=0.7',
+}
+
+
+def expiry_rows(request, expiry=None):
+    '''
+    returns dict of expiry date => {strike: [OI_c, OI_p, TotalVol_c, TotalVol_p]} from records.data of a fetched json object
+    in payload order, a missing side counts as 0 and strikes without any side are skipped like ExpiryIndex does
+        expiry => only keep this expiry date
+    '''
+    wanted = str(expiry).lower() if expiry else None
+    rows = {}
+    for data in request['records']['data']:
+        if (wanted and str(data['expiryDate']).lower() != wanted) or ('CE' not in data and 'PE' not in data):
+            continue
+        values = rows.setdefault(data['expiryDate'], {}).setdefault(data['strikePrice'], [0, 0, 0, 0])
+        for i, side in ((0, 'CE'), (1, 'PE')):
+            if side in data:
+                values[i] += data[side]['openInterest']
+                values[i + 2] += data[side]['totalTradedVolume']
+    return rows
+
+
+def max_pain_python(strikes, oi_c, oi_p):
+    '''
+    returns the max pain strike of sorted distinct strikes in pure python, the first strike of the lowest total writer payout
+    prefix sums keep it O(n) and follow the float operations of MaxPain.max_pain, so both give the same strike
+    '''
+    n = len(strikes)
+    cum_c, cum_cs, cum_p, cum_ps = [0.0] * (n + 1), [0.0] * (n + 1), [0.0] * (n + 1), [0.0] * (n + 1)
+    for i in range(n):
+        strike, c, p = float(strikes[i]), float(oi_c[i]), float(oi_p[i])
+        cum_c[i + 1] = cum_c[i] + c
+        cum_cs[i + 1] = cum_cs[i] + c * strike
+        cum_p[i + 1] = cum_p[i] + p
+        cum_ps[i + 1] = cum_ps[i] + p * strike
+    best, maxpain = None, None
+    for i in range(n):
+        strike = float(strikes[i])
+        pain = (strike * cum_c[i + 1] - cum_cs[i + 1]) + ((cum_ps[n] - cum_ps[i]) - strike * (cum_p[n] - cum_p[i]))
+        if best is None or pain < best:
+            best, maxpain = pain, strike
+    return maxpain
+
+
+def chain_metrics(request, expiry=None, use_numpy=None):
+    '''
+    returns maxpain, pcr_oi, pcr_vol and indicator of every expiry date of a fetched json object as a list of dicts, nearest first,
+    the numbers get_oc_data and ExpiryIndex.metrics give without building any dataframe
+        expiry => only this expiry date
+        use_numpy => True computes max pain of all expiries in one MaxPain.max_pain_groups call, False in pure python,
+            None uses numpy when it is installed
+    '''
+    rows = expiry_rows(request, expiry)
+    names = {str(name).lower(): name for name in request['records'].get('expiryDates', [])}
+    order = {key: i for i, key in enumerate(names)}
+    expiries = sorted(rows, key=lambda name: order.get(str(name).lower(), len(order)))
+    chains = [sorted(rows[name].items()) for name in expiries]
+    if use_numpy is None:
+        try:
+            import numpy
+            use_numpy = True
+        except ImportError:
+            use_numpy = False
+    if use_numpy and chains:
+        from MaxPain import max_pain_groups
+        codes = [code for code, chain in enumerate(chains) for _ in chain]
+        strikes, values = zip(*[row for chain in chains for row in chain])
+        maxpains = max_pain_groups(codes, strikes, [v[0] for v in values], [v[1] for v in values], len(chains)).tolist()
+    else:
+        maxpains = [max_pain_python([strike for strike, _ in chain], [v[0] for _, v in chain], [v[1] for _, v in chain]) for chain in chains]
+    underlyingValue = request['records']['underlyingValue']
+    result = []
+    for name, chain, maxpain in zip(expiries, chains, maxpains):
+        totals = [sum(values[i] for _, values in chain) for i in range(4)]
+        result.append({'expiry': name, 'maxpain': maxpain, 'pcr_oi': ratio(totals[1], totals[0]),
+            'pcr_vol': ratio(totals[3], totals[2]), 'indicator': get_indicator(underlyingValue, maxpain)})
+    return result
+
+
+def nearest_expiry(request):
+    '''
+    returns the nearest expiry date of a fetched json object, the first one of filtered.data or records.expiryDates
+    '''
+    if request.get('filtered', {}).get('data'):
+        return request['filtered']['data'][0]['expiryDate']
+    return next(iter(request['records'].get('expiryDates', [])), None)
+
+
+class LiteNSE:
+    def __init__(self, base_url='https://www.nseindia.com', timeout=27, use_numpy=None):
+        '''
+        __init__ of LiteNSE class, fetches option chains with urllib and computes their metrics without requests, pandas or bs4
+        for cron jobs and short lived workers that only need maxpain, pcr_oi, pcr_vol and underlyingValue
+            base_url => nse website, can point to a Transport.StubServer
+            timeout => seconds a request may take
+            use_numpy => see chain_metrics
+        '''
+        self.base_url = base_url
+        self.timeout = timeout
+        self.use_numpy = use_numpy
+        self.cookies = CookieJar()
+        self.opener = build_opener(HTTPCookieProcessor(self.cookies))
+        self.opener.addheaders = list(HEADERS.items())
+
+    def get(self, url):
+        '''
+        returns the response body of url as bytes, decompressed when nse sent it gzip or deflate encoded
+        '''
+        with self.opener.open(url, timeout=self.timeout) as response:
+            content = response.read()
+            encoding = response.headers.get('Content-Encoding', '')
+        if encoding in ('gzip', 'deflate'):
+            content = zlib.decompress(content, 47)
+        return content
+
+    def fetch_nse_data(self, type='indices', symbol='NIFTY'):
+        '''
+        fetches data for provided indices/equities and symbol and returns the json object
+        cookies are taken from the option chain page first and renewed once when nse rejects them with 401/403
+        '''
+        url = f'{self.base_url}/api/option-chain-{type}?symbol={symbol}'
+        if not len(self.cookies):
+            self.get(f'{self.base_url}/option-chain')
+        try:
+            return loads(self.get(url))
+        except HTTPError as err:
+            if err.code not in (401, 403):
+                raise
+        self.cookies.clear()
+        self.get(f'{self.base_url}/option-chain')
+        return loads(self.get(url))
+
+    def get_metrics(self, type='indices', symbol='NIFTY', expiry=None):
+        '''
+        fetches data for provided indices/equities and symbol and returns symbol, timestamp, underlyingValue, expiry, maxpain,
+        pcr_oi, pcr_vol and indicator of provided expiry date as a dict, the nearest expiry when not given, None without data
+        '''
+        try:
+            request = self.fetch_nse_data(type=type, symbol=symbol)
+            if bool(request):
+                metrics = chain_metrics(request, expiry or nearest_expiry(request), self.use_numpy)
+                if metrics:
+                    return dict(symbol=symbol, timestamp=request['records']['timestamp'],
+                        underlyingValue=request['records']['underlyingValue'], **metrics[0])
+        except Exception as err:
+            print("get_metrics: ", err)
+
+    def get_all_metrics(self, type='indices', symbol='NIFTY'):
+        '''
+        fetches data for provided indices/equities and symbol once and returns the metrics of every expiry as a list of dicts
+        '''
+        try:
+            request = self.fetch_nse_data(type=type, symbol=symbol)
+            if bool(request):
+                return [dict(symbol=symbol, timestamp=request['records']['timestamp'], underlyingValue=request['records']['underlyingValue'],
+                    **metrics) for metrics in chain_metrics(request, use_numpy=self.use_numpy)]
+        except Exception as err:
+            print("get_all_metrics: ", err)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='prints maxpain, pcr and underlying value of nse option chains as json lines')
+    parser.add_argument('symbols', nargs='+')
+    parser.add_argument('--type', default='indices', help='indices or equities')
+    parser.add_argument('--expiry', default=None, help='expiry date like 07-Jan-2021, the nearest one by default')
+    parser.add_argument('--all', action='store_true', help='every expiry date instead of one')
+    parser.add_argument('--base-url', default='https://www.nseindia.com', help='nse website or a Transport.StubServer url')
+    parser.add_argument('--no-numpy', action='store_true', help='pure python even when numpy is installed')
+    args = parser.parse_args()
+    nse = LiteNSE(base_url=args.base_url, use_numpy=False if args.no_numpy else None)
+    failed = False
+    for symbol in args.symbols:
+        results = nse.get_all_metrics(args.type, symbol) if args.all else [nse.get_metrics(args.type, symbol, args.expiry)]
+        if not results or results[0] is None:
+            failed = True
+            continue
+        for result in results:
+            print(json.dumps(result))
+    sys.exit(1 if failed else 0)
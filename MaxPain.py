@@ -0,0 +1,112 @@
+import numpy as np
+
+
+def max_pain(strikes, oi_c, oi_p, prices=None):
+    '''
+    returns (pain_c, pain_p) arrays, the total payout of call and put writers if expiry settles at each price
+        strikes => strike prices of the chain (need not be sorted)
+        oi_c, oi_p => call and put open interest of each strike
+        prices => expiry prices to evaluate, defaults to the strikes themselves
+    uses cumulative sums of OI and OI x strike over sorted strikes so the whole curve costs O(n log n)
+    '''
+    strikes = np.asarray(strikes, dtype='float64')
+    prices = strikes if prices is None else np.asarray(prices, dtype='float64')
+    order = np.argsort(strikes, kind='mergesort')
+    s = strikes[order]
+    c = np.asarray(oi_c, dtype='float64')[order]
+    p = np.asarray(oi_p, dtype='float64')[order]
+
+    # leading zero so that cum[k] is the sum over the first k sorted strikes
+    cum_c = np.concatenate(([0.0], np.cumsum(c)))
+    cum_cs = np.concatenate(([0.0], np.cumsum(c * s)))
+    cum_p = np.concatenate(([0.0], np.cumsum(p)))
+    cum_ps = np.concatenate(([0.0], np.cumsum(p * s)))
+
+    below = np.searchsorted(s, prices, side='right')  # strikes <= price
+    above = np.searchsorted(s, prices, side='left')   # strikes < price
+
+    pain_c = prices * cum_c[below] - cum_cs[below]
+    pain_p = (cum_ps[-1] - cum_ps[above]) - prices * (cum_p[-1] - cum_p[above])
+    return pain_c, pain_p
+
+
+def add_max_pain(df):
+    '''
+    adds MaxPain_c, MaxPain_p and MaxPain columns to an option chain dataframe and returns the max pain strike
+    df must have strikePrice, OI_c and OI_p columns
+    '''
+    pain_c, pain_p = max_pain(df['strikePrice'].values, df['OI_c'].values, df['OI_p'].values)
+    df['MaxPain_c'] = pain_c
+    df['MaxPain_p'] = pain_p
+    df['MaxPain'] = df['MaxPain_c'] + df['MaxPain_p']
+    return df.loc[df['MaxPain'].idxmin()]['strikePrice']
+
+
+def max_pain_by_expiry(data):
+    '''
+    computes max pain for every expiry of a symbol in one batched call and returns it as a pandas series indexed by expiryDate
+        data => list of records as found in request['records']['data'], rows without a CE or PE side are skipped like ExpiryIndex does
+    '''
+    import pandas as pd
+    expiries = {}
+    codes, strikes, oi_c, oi_p = [], [], [], []
+    for row in data:
+        if 'CE' not in row and 'PE' not in row:
+            continue
+        codes.append(expiries.setdefault(row['expiryDate'], len(expiries)))
+        strikes.append(row['strikePrice'])
+        oi_c.append(row['CE']['openInterest'] if 'CE' in row else 0)
+        oi_p.append(row['PE']['openInterest'] if 'PE' in row else 0)
+    if not codes:
+        return pd.Series([], index=pd.Index([], name='expiryDate'), dtype='float64', name='maxpain')
+
+    names = sorted(expiries, key=expiries.get)
+    maxpain = max_pain_groups(codes, strikes, oi_c, oi_p, len(expiries))
+    return pd.Series(maxpain, index=pd.Index(names, name='expiryDate'), name='maxpain')
+
+
+def max_pain_groups(codes, strikes, oi_c, oi_p, n=None):
+    '''
+    returns the max pain strike of every group of rows as a numpy array in one batched pass, nan for a group without rows
+        codes => group of every row, 0 to n - 1, like the expiry of a chain or the snapshot of a backtest
+        strikes, oi_c, oi_p => strike, call and put open interest of every row
+    '''
+    codes = np.asarray(codes, dtype='int64')
+    strikes = np.asarray(strikes, dtype='float64')
+    oi_c = np.asarray(oi_c, dtype='float64')
+    oi_p = np.asarray(oi_p, dtype='float64')
+    if n is None:
+        n = int(codes.max()) + 1 if len(codes) else 0
+    result = np.full(n, np.nan)
+    if not len(codes):
+        return result
+
+    # every group gets its own band of a single sorted key so one searchsorted serves all of them,
+    # the band width is a power of two so the offsets stay exact in float64
+    low = strikes.min()
+    span = 2.0 ** np.ceil(np.log2(strikes.max() - low + 1))
+    key = codes * span + (strikes - low)
+    order = np.argsort(key, kind='mergesort')
+    key, codes, strikes, oi_c, oi_p = key[order], codes[order], strikes[order], oi_c[order], oi_p[order]
+
+    cum_c = np.concatenate(([0.0], np.cumsum(oi_c)))
+    cum_cs = np.concatenate(([0.0], np.cumsum(oi_c * strikes)))
+    cum_p = np.concatenate(([0.0], np.cumsum(oi_p)))
+    cum_ps = np.concatenate(([0.0], np.cumsum(oi_p * strikes)))
+
+    start = np.searchsorted(codes, np.arange(n), side='left')[codes]
+    end = np.searchsorted(codes, np.arange(n), side='right')[codes]
+    below = np.searchsorted(key, key, side='right')
+    above = np.searchsorted(key, key, side='left')
+
+    pain_c = strikes * (cum_c[below] - cum_c[start]) - (cum_cs[below] - cum_cs[start])
+    pain_p = (cum_ps[end] - cum_ps[above]) - strikes * (cum_p[end] - cum_p[above])
+    pain = pain_c + pain_p
+
+    # first minimum of each group, matching idxmin on the strike sorted frame
+    minimum = np.full(n, np.inf)
+    np.minimum.at(minimum, codes, pain)
+    first = np.flatnonzero(pain == minimum[codes])
+    first = first[np.unique(codes[first], return_index=True)[1]]
+    result[codes[first]] = strikes[first]
+    return result
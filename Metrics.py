@@ -0,0 +1,173 @@
+import os
+import json
+import time
+import threading
+from collections import deque, defaultdict
+
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Timer:
+    __slots__ = ('metrics', 'stage', 'start')
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.metrics.observe(self.stage, time.perf_counter() - self.start)
+        if exc_type is not None:
+            self.metrics.error(self.stage)
+        return False
+
+
+class NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        return False
+
+
+NULL_TIMER = NullTimer()
+
+
+class Metrics:
+    def __init__(self, window=1024):
+        '''
+        __init__ of Metrics class, thread-safe durations, counters and gauges of the stages of the nse pipeline
+            window => number of most recent durations per stage the quantiles are computed from
+        '''
+        self.window = window
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        '''
+        forgets every duration and counter
+        '''
+        with self.lock:
+            self.samples = defaultdict(lambda: deque(maxlen=self.window))
+            self.totals = defaultdict(float)
+            self.counts = defaultdict(int)
+            self.counters = defaultdict(float)
+            self.gauges = {}
+
+    def timer(self, stage):
+        '''
+        returns a context manager recording how long its block takes as a duration of stage, an error of stage when it raises
+        '''
+        return Timer(self, stage)
+
+    def observe(self, stage, seconds):
+        '''
+        records one duration of stage in seconds
+        '''
+        with self.lock:
+            self.samples[stage].append(seconds)
+            self.totals[stage] += seconds
+            self.counts[stage] += 1
+
+    def count(self, name, value=1, stage=''):
+        '''
+        adds value to the counter name of stage, like bytes, rows, cache_hits, cache_misses or errors
+        '''
+        with self.lock:
+            self.counters[name, stage] += value
+
+    def error(self, stage):
+        self.count('errors', 1, stage)
+
+    def gauge(self, name, value, stage=''):
+        '''
+        sets the current value of gauge name of stage, like the state of a circuit breaker or the coalescing ratio
+        '''
+        with self.lock:
+            self.gauges[name, stage] = value
+
+    def summary(self):
+        '''
+        returns a dict with count, sum, p50, p95, p99 and max seconds of every stage and the value of every counter and gauge
+            {'stages': {stage: {...}}, 'counters': {name: {stage: value}}, 'gauges': {name: {stage: value}}}
+        '''
+        import numpy as np
+        with self.lock:
+            samples = {stage: np.array(values) for stage, values in self.samples.items()}
+            totals, counts, counters, gauges = dict(self.totals), dict(self.counts), dict(self.counters), dict(self.gauges)
+        stages = {}
+        for stage, values in samples.items():
+            quantiles = np.quantile(values, QUANTILES) if len(values) else [0.0] * len(QUANTILES)
+            stages[stage] = {'count': counts[stage], 'sum': totals[stage], 'max': float(values.max()) if len(values) else 0.0}
+            stages[stage].update({f'p{round(q * 100)}': float(value) for q, value in zip(QUANTILES, quantiles)})
+        result = {'stages': stages, 'counters': {}, 'gauges': {}}
+        for (name, stage), value in counters.items():
+            result['counters'].setdefault(name, {})[stage] = value
+        for (name, stage), value in gauges.items():
+            result['gauges'].setdefault(name, {})[stage] = value
+        return result
+
+    def to_prometheus(self, prefix='nse'):
+        '''
+        returns the summary in the prometheus text exposition format
+        '''
+        summary = self.summary()
+        lines = [f'# HELP {prefix}_stage_seconds time spent in each stage of the pipeline',
+            f'# TYPE {prefix}_stage_seconds summary']
+        for stage, values in sorted(summary['stages'].items()):
+            for q in QUANTILES:
+                lines.append(f'{prefix}_stage_seconds{{stage="{stage}",quantile="{q}"}} {values[f"p{round(q * 100)}"]!r}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {values["sum"]!r}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {values["count"]}')
+        for name, stages in sorted(summary['counters'].items()):
+            lines.append(f'# TYPE {prefix}_{name}_total counter')
+            for stage, value in sorted(stages.items()):
+                lines.append(f'{prefix}_{name}_total{{stage="{stage}"}} {float(value)!r}')
+        for name, stages in sorted(summary['gauges'].items()):
+            lines.append(f'# TYPE {prefix}_{name} gauge')
+            for stage, value in sorted(stages.items()):
+                lines.append(f'{prefix}_{name}{{stage="{stage}"}} {float(value)!r}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path, prefix='nse'):
+        '''
+        writes to_prometheus to path through a temporary file, so a node exporter textfile collector never reads a partial file
+        '''
+        temp = f'{path}.{os.getpid()}.tmp'
+        with open(temp, 'w') as f:
+            f.write(self.to_prometheus(prefix))
+        os.replace(temp, path)
+
+    def log_json(self, path, **fields):
+        '''
+        appends the summary with a unix timestamp and fields as one json line to path
+        '''
+        line = json.dumps(dict(fields, time=time.time(), **self.summary()))
+        with open(path, 'a') as f:
+            f.write(line + '\n')
+
+
+class NullMetrics(Metrics):
+    '''
+    Metrics that records nothing, the default of NSE so an uninstrumented pipeline only pays for a method call per stage
+    '''
+    def __init__(self):
+        super().__init__(window=0)
+
+    def timer(self, stage):
+        return NULL_TIMER
+
+    def observe(self, stage, seconds):
+        pass
+
+    def count(self, name, value=1, stage=''):
+        pass
+
+    def gauge(self, name, value, stage=''):
+        pass
@@ -1,8 +1,20 @@
 import requests
 import json
-import pandas as pd
-import numpy as np
-from bs4 import BeautifulSoup
+import os
+import time
+import hashlib
+import threading
+from requests.adapters import HTTPAdapter
+from Cache import ResultCache
+from Decode import loads
+from Lite import chain_metrics, nearest_expiry
+from Indicator import get_indicator
+from Metrics import NullMetrics
+from Contracts import ContractCache, extract_indices
+from Resilience import Coalescer, CircuitBreaker, CircuitOpenError, backoff_delay
+
+# pandas, numpy and the modules built on them are imported by the methods that need a frame or html,
+# so fetching and get_metrics start without their import cost
 
 # pd.options.display.float_format = "{:,.2f}".format
 # from matplotlib import pyplot as plt
@@ -10,110 +22,357 @@ from bs4 import BeautifulSoup
 # from datetime import date
 # from pathlib import Path
 # import getpass
-# import time
 
 class NSE:
-    def __init__(self):
+    def __init__(self, pool_size=10, cookie_margin=60, base_url='https://www.nseindia.com', cache_size=128, store=None, metrics=None, transport=None, contracts=None,
+            retries=3, backoff=0.5, breaker_threshold=5, breaker_timeout=30, buildup=None, archive=None):
         '''
         __init__ of NSE class
+            pool_size => number of keep-alive connections kept open to nse
+            cookie_margin => seconds before the real cookie expiry at which cookies are renewed, at most half the cookie lifetime
+            base_url => nse website, can point to a local stand-in server for offline runs
+            cache_size => number of rendered results kept by get_output
+            store => SnapshotStore every fetched chain is appended to
+            metrics => Metrics recording durations, bytes, rows, cache hits and errors of every stage, nothing is recorded by default
+            transport => requests adapter mounted instead of the pooled HTTPAdapter, like Transport.RecordingAdapter or ReplayAdapter
+            contracts => ContractCache of the contract name lists, ContractCache('contracts.json') keeps them across processes
+            retries, backoff => retries of a rejected (401/403) or timed out option chain request, first backoff in seconds
+            breaker_threshold, breaker_timeout => consecutive failures that open the circuit breaker of an endpoint, seconds it stays open
+            buildup => BuildUp updated with every fetched chain, needed by analyse(buildup=True)
+            archive => PayloadArchive the raw response body of every fetched chain is appended to
         '''
         self.cookies = None
+        self.cookies_expiry = None
+        self.cookie_margin = cookie_margin
+        # seconds before self.cookies_expiry at which they are renewed, cookie_margin capped at half their lifetime
+        self.renew_margin = cookie_margin
+        self.cookie_lock = threading.Lock()
+        self.base_url = base_url
         self.request = None
+        self.index = None
+        # (type, symbol) self.index was built for
+        self.loaded = None
         self.df = None
         self.maxpain = None
         self.pcr_oi = None
         self.pcr_vol = None
         self.timestamp = None
         self.underlyingValue = None
+        self.cache = ResultCache(cache_size)
+        self.store = store
+        self.buildup = buildup
+        self.archive = archive
+        self.metrics = metrics if metrics is not None else NullMetrics()
+        self.contracts = contracts if contracts is not None else ContractCache()
+        self.retries = retries
+        self.backoff = backoff
+        self.breaker_threshold = breaker_threshold
+        self.breaker_timeout = breaker_timeout
+        self.breakers = {}
+        self.breaker_lock = threading.Lock()
+        self.coalescer = Coalescer()
+        self.written = {}
+        self.writes_skipped = 0
         self.headers = {
             'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/87.0.4280.88 Safari/537.36',
             'accept-encoding': 'gzip, deflate, br',
-            'accept-language': 'en-IN,en-GB;q=0.9,en-US;q=0.8,en;q=0.7'
+            'accept-language': 'en-IN,en-GB;q=0.9,en-US;q=0.8,en;q=0.7',
+            'connection': 'keep-alive'
             }
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = transport if transport is not None else HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
         
 
         
-        # self.url_indices = "https://www.nseindia.com/api/option-chain-indices?symbol=NIFTY"
-        # self.url_stocks = "https://www.nseindia.com/api/option-chain-equities?symbol=ACC"
-        # self.url_market_status = "https://www.nseindia.com/api/marketStatus"
-        # self.url_oc = "https://www.nseindia.com/option-chain"
-        # self.dump_folder = 'dump'
+        # self.url_indices = f"{self.base_url}/api/option-chain-indices?symbol=NIFTY"
+        # self.url_stocks = f"{self.base_url}/api/option-chain-equities?symbol=ACC"
+        # self.url_market_status = f"{self.base_url}/api/marketStatus"
+        # self.url_oc = f"{self.base_url}/option-chain"
         # self.market_status = None
-                        
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        '''
+        closes the pooled connections of self.session
+        '''
+        self.session.close()
+
+    def connection_stats(self):
+        '''
+        returns a dict with the number of requests sent over self.session and how many of them opened a new connection or reused a kept-alive one
+        '''
+        requests_count = 0
+        new_connections = 0
+        for adapter in set(self.session.adapters.values()):
+            if not hasattr(adapter, 'poolmanager'):
+                continue
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools[key]
+                requests_count += pool.num_requests
+                new_connections += pool.num_connections
+        return {'requests': requests_count, 'new_connections': new_connections, 'reused_connections': requests_count - new_connections}
+
     def set_cookies(self): 
         '''
-        get new cookies from nse website and set it to self.cookies
+        get new cookies from nse website and set it to self.cookies and the earliest cookie expiry time to self.cookies_expiry
         '''
         try:
-            with requests.Session() as s:
-                request = s.get("https://www.nseindia.com/option-chain", headers=self.headers, timeout=(5, 27))                
-                if request.cookies:
-                    self.cookies = request.cookies
-                    # for cookie in request.cookies:
-                    #     if cookie.expires: # checking the expires flag
-                    #         print(datetime.fromtimestamp(cookie.expires)) 
-                
-                    # print(min([datetime.fromtimestamp(cookie.expires) for cookie in request.cookies if cookie.expires]))                    
+            with self.metrics.timer('cookies'):
+                request = self.session.get(f"{self.base_url}/option-chain", timeout=(5, 27))
+            if request.cookies:
+                self.cookies = request.cookies
+                expires = [cookie.expires for cookie in request.cookies if cookie.expires]
+                self.cookies_expiry = min(expires) if expires else None
+                # cookies living less than twice cookie_margin are renewed half way through their life, not on every call
+                lifetime = self.cookies_expiry - time.time() if self.cookies_expiry else None
+                self.renew_margin = min(self.cookie_margin, lifetime / 2) if lifetime else self.cookie_margin
         except Exception as err:
             print("set_cookies: ", err)
 
     def has_cookie_expired(self): 
         '''
-        returns true if self.cookies has expired and false if not
+        returns true if self.cookies has expired or will expire within self.renew_margin seconds and false if not
         '''
         try:
+            if self.cookies_expiry and time.time() + self.renew_margin >= self.cookies_expiry:
+                return True
             count = len([cookie.is_expired() for cookie in self.cookies if cookie.is_expired()]) #returns total number of expired cookies
             return True if count > 0 else False            
         except Exception as err:
+            self.metrics.error('has_cookie_expired')
             print("has_cookie_expired: ", err)
 
+    def renew_cookies(self, stale=None):
+        '''
+        sets new cookies only when there are none or they are about to expire
+            stale => cookies nse rejected, renewed unless another thread already replaced them
+        '''
+        with self.cookie_lock:
+            if not self.cookies or self.has_cookie_expired() or (stale is not None and self.cookies is stale):
+                self.set_cookies()
+
     def is_market_open(self): 
         '''
         returns true if market is open and false if market is closed
         '''
         try:
-            if not self.cookies or self.has_cookie_expired():
-                self.set_cookies()
-            with requests.Session() as s:
-                request = s.get("https://www.nseindia.com/api/marketStatus", headers=self.headers, timeout=(5,27), cookies=self.cookies).json()
-                for item in request["marketState"]:
-                    if item["index"] == "NIFTY 50":
-                        if item["marketStatus"] == "Open":
-                            return True
-                        else:
-                            return False
+            self.renew_cookies()
+            request = self.session.get(f"{self.base_url}/api/marketStatus", timeout=(5,27), cookies=self.cookies).json()
+            for item in request["marketState"]:
+                if item["index"] == "NIFTY 50":
+                    if item["marketStatus"] == "Open":
+                        return True
+                    else:
+                        return False
         except Exception as err:
+            self.metrics.error('is_market_open')
             print("is_market_open: ", err)
 
-    def get_indices_contracts_names(self): 
+    def get_indices_contracts_names(self, refresh=False): 
         '''
         get contract names of all indices available in nse option chain and returns it as a list
+        the list is kept in self.contracts, refresh=True downloads it again
         '''
         try:
-            if not self.cookies or self.has_cookie_expired():
-                self.set_cookies()
-            with requests.Session() as s:                
-                request = s.get("https://www.nseindia.com/option-chain", headers=self.headers, timeout=(5,27), cookies=self.cookies)
-                soup = BeautifulSoup(request.text, "html.parser")
-                indices = soup.find("select", id="equity_optionchain_select")
-                indices =  indices.text.strip().split("\n")
-                return indices
+            indices = None if refresh else self.contracts.get('indices')
+            if indices is None:
+                self.renew_cookies()
+                request = self.session.get(f"{self.base_url}/option-chain", timeout=(5,27), cookies=self.cookies)
+                indices = extract_indices(request.text)
+                self.contracts.put('indices', indices)
+            return indices
         except Exception as err:
+            self.metrics.error('get_indices_contracts_names')
             print("get_indices_contracts_names: ", err)
 
-    def get_stocks_contracts_names(self): 
+    def get_stocks_contracts_names(self, refresh=False): 
         '''
         get contract names of all equities available in nse option chain and returns it as a list
+        the list is kept in self.contracts, refresh=True downloads it again
         '''
         try:
-            if not self.cookies or self.has_cookie_expired():
-                self.set_cookies()
-            with requests.Session() as s:                
-                request = s.get("https://www.nseindia.com/api/master-quote", headers=self.headers, timeout=(5,27), cookies=self.cookies).json()
-                return list(request)                                
+            stocks = None if refresh else self.contracts.get('equities')
+            if stocks is None:
+                self.renew_cookies()
+                request = self.session.get(f"{self.base_url}/api/master-quote", timeout=(5,27), cookies=self.cookies).json()
+                stocks = list(request)
+                self.contracts.put('equities', stocks)
+            return stocks
         except Exception as err:
+            self.metrics.error('get_stocks_contracts_names')
             print("get_stocks_contracts_names: ", err)
 
+    def fetch_nse_content(self, type='indices', symbol='NIFTY'):
+        '''
+        fetches data for provided indices/equities and symbol and returns the raw response body as bytes
+        concurrent calls for the same type and symbol share one request, failed requests are retried as described in request_content
+        raises on network or http errors, safe to call from several threads
+        '''
+        url = f'{self.base_url}/api/option-chain-{type}?symbol={symbol}'
+        content = self.coalescer.call((type, symbol), lambda: self.request_content(url, f'option-chain-{type}'))
+        self.metrics.gauge('coalescing_ratio', self.coalescer.stats()['ratio'], 'network')
+        return content
+
+    def request_content(self, url, endpoint):
+        '''
+        sends a get request to url with the nse cookies and returns the response body as bytes
+        401/403 (cookies rejected) renew the cookies and are retried like timeouts and connection errors, up to self.retries times
+        with jittered exponential backoff. these, 429 and 5xx responses count as failures of the circuit breaker of endpoint,
+        which raises CircuitOpenError without sending anything while it is open
+        '''
+        breaker = self.breaker(endpoint)
+        for attempt in range(self.retries + 1):
+            try:
+                breaker.before()
+            except CircuitOpenError:
+                self.metrics.count('breaker_rejections', 1, endpoint)
+                raise
+            self.renew_cookies()
+            cookies = self.cookies
+            try:
+                with self.metrics.timer('network'):
+                    request = self.session.get(url, timeout=(5, 27), cookies=cookies)
+                    request.raise_for_status()
+            except (requests.Timeout, requests.ConnectionError) as err:
+                error, retry = err, True
+            except requests.HTTPError as err:
+                status = err.response.status_code
+                if status not in (401, 403, 429) and status < 500:
+                    breaker.success()
+                    self.metrics.gauge('circuit_state', CircuitBreaker.LEVELS[breaker.state], endpoint)
+                    raise
+                error, retry = err, status in (401, 403)
+                if retry:
+                    self.renew_cookies(stale=cookies)
+            else:
+                breaker.success()
+                self.metrics.gauge('circuit_state', CircuitBreaker.LEVELS[breaker.state], endpoint)
+                self.metrics.count('bytes', len(request.content), 'network')
+                return request.content
+            breaker.failure()
+            self.metrics.gauge('circuit_state', CircuitBreaker.LEVELS[breaker.state], endpoint)
+            if not retry or attempt == self.retries or breaker.state == CircuitBreaker.OPEN:
+                raise error
+            self.metrics.count('retries', 1, endpoint)
+            time.sleep(backoff_delay(attempt, self.backoff))
+
+    def breaker(self, endpoint):
+        '''
+        returns the circuit breaker of endpoint, created on first use
+        '''
+        with self.breaker_lock:
+            if endpoint not in self.breakers:
+                self.breakers[endpoint] = CircuitBreaker(self.breaker_threshold, self.breaker_timeout)
+            return self.breakers[endpoint]
+
+    def fetch_stats(self):
+        '''
+        returns the coalescing statistics of option chain requests and the state of every circuit breaker as a dict
+        '''
+        with self.breaker_lock:
+            breakers = {endpoint: breaker.state for endpoint, breaker in self.breakers.items()}
+        return {'coalescing': self.coalescer.stats(), 'breakers': breakers}
+
+    def fetch_nse_data(self, type='indices', symbol='NIFTY'):
+        '''
+        fetches data for provided indices/equities and symbol and returns the json object without touching instance state
+        raises on network or http errors, safe to call from several threads
+        '''
+        content = self.fetch_nse_content(type=type, symbol=symbol)
+        with self.metrics.timer('decode'):
+            request = loads(content)
+        if self.archive is not None:
+            # a failed compliance copy must not fail the live fetch, the timer counts it as an error of archive
+            try:
+                with self.metrics.timer('archive'):
+                    self.archive.append(symbol, content, request)
+            except Exception as err:
+                print("archive: ", err)
+        return request
+
+    def load(self, type='indices', symbol='NIFTY'):
+        '''
+        fetches data for provided indices/equities and symbol and returns (json object, ExpiryIndex) without touching instance state
+        the index is None when nse returned no data, raises on network or http errors, safe to call from several threads
+        '''
+        from Chain import ExpiryIndex
+        request = self.fetch_nse_data(type=type, symbol=symbol)
+        if not bool(request):
+            return request, None
+        with self.metrics.timer('index'):
+            index = ExpiryIndex(request)
+        if self.store is not None:
+            with self.metrics.timer('store'):
+                self.store.append(symbol, request)
+        if self.buildup is not None:
+            with self.metrics.timer('buildup'):
+                self.buildup.update(symbol, index)
+        return request, index
+
+    def analyse(self, type='indices', symbol='NIFTY', expiry=None, greeks=False, index=None, buildup=False):
+        '''
+        fetches data for provided indices/equities and symbol and returns an immutable Analysis of provided expiry date, the nearest when not given
+        nothing is stored on the instance, so one NSE can serve several threads sharing its session, cookies and caches
+            greeks => add implied volatility and greeks columns to the frame of the result
+            buildup => add the intraday oi and volume changes and build-up labels of self.buildup to the frame of the result
+            index => ExpiryIndex of an already fetched payload to analyse instead of fetching
+        raises on network or http errors, ValueError when nse returned no data and KeyError for an unknown expiry
+        '''
+        from Chain import Analysis
+        if index is None:
+            _, index = self.load(type=type, symbol=symbol)
+            if index is None:
+                raise ValueError(f'no option chain data for {type} {symbol}')
+        with self.metrics.timer('frame'):
+            df, name = index.frame(expiry)
+        with self.metrics.timer('metrics'):
+            metrics = index.metrics(expiry)
+        df = df.copy()
+        self.metrics.count('rows', len(df), 'frame')
+        if greeks:
+            from Greeks import add_greeks
+            with self.metrics.timer('greeks'):
+                add_greeks(df, index.underlyingValue, name, index.timestamp)
+        if buildup:
+            if self.buildup is None:
+                raise ValueError('buildup=True needs NSE(buildup=BuildUp())')
+            self.buildup.add_columns(df, symbol, name, index.timestamp)
+        return Analysis(type, symbol, name, index.timestamp, index.underlyingValue, metrics['maxpain'], metrics['pcr_oi'], metrics['pcr_vol'],
+            get_indicator(index.underlyingValue, metrics['maxpain']), df)
+
+    def render(self, type='indices', symbol='NIFTY', expiry=None, index=None):
+        '''
+        fetches data for provided indices/equities and symbol and returns (analysis, window, html) with the styled option chain page
+        around the atm strike, window is the rendered part of analysis.df
+        results are cached per (type, symbol, expiry, records.timestamp) in self.cache and shared between callers, so they must not be modified
+        safe to call from several threads, raises like analyse
+        '''
+        from Render import render_chain, render_page
+        if index is None:
+            _, index = self.load(type=type, symbol=symbol)
+            if index is None:
+                raise ValueError(f'no option chain data for {type} {symbol}')
+        key = (type, symbol, str(expiry).lower() if expiry else None, index.timestamp)
+        cached = self.cache.get(key)
+        self.metrics.count('cache_misses' if cached is None else 'cache_hits', 1, 'get_output')
+        if cached is None:
+            result = self.analyse(type=type, symbol=symbol, expiry=expiry, index=index)
+            with self.metrics.timer('render'):
+                table, window = render_chain(result.df, symbol, result.expiry, result.underlyingValue, result.maxpain, result.pcr_oi,
+                    result.pcr_vol, result.timestamp, result.indicator)
+            cached = (result, window, render_page([table]))
+            self.cache.put(key, cached)
+        return cached
+
     def get_nse_data(self, type='indices', symbol='NIFTY'): 
         '''
         fetches data for provided indices/equities and symbol and sets json object to self.request
@@ -122,206 +381,374 @@ class NSE:
             symbol=> valid symbol name in the type provided 
         '''
         try:
-            if not self.cookies or self.has_cookie_expired():
-                self.set_cookies()
-            with requests.Session() as s:
-                url = f'https://www.nseindia.com/api/option-chain-{type}?symbol={symbol}'
-                request = s.get(url, headers=self.headers, timeout=(5, 27), cookies=self.cookies).json()                
-                self.request = request
-                if bool(self.request):  #checking if dictionary is not empty
-                    self.timestamp = request["records"]["timestamp"]
-                    self.underlyingValue = request["records"]["underlyingValue"]
+            request, index = self.load(type=type, symbol=symbol)
+            self.request = request
+            if bool(self.request):  #checking if dictionary is not empty
+                self.timestamp = request["records"]["timestamp"]
+                self.underlyingValue = request["records"]["underlyingValue"]
+                self.index = index
+                self.loaded = (type, symbol)
         except Exception as err:
+            # the previous symbol's payload must not be mistaken for this one
+            self.request = None
+            self.index = None
+            self.loaded = None
+            self.metrics.error('get_nse_data')
             print("get_nse_data: ", err)
 
-    def get_oc_data(self, type='indices', symbol='NIFTY', expiry=None):
+    def get_oc_data(self, type='indices', symbol='NIFTY', expiry=None, refresh=True, greeks=False, buildup=False):
         '''
         fetches data for provided expiry date from nse website using get_nse_data function and sets following variables
             self.df => sets oc data in pandas dataframe
             self.pcr_oi => sets pcr based on oi in float rounded to 2
             self.pcr_vol => sets pcr based on volume in float rounded to 2
             self.maxpain => sets maxpain value in float
+        refresh=False reuses the last fetched payload through self.index instead of fetching it again, when it is of the same type and symbol
+        greeks=True adds implied volatility solved from LTP (IVs) and delta, gamma, theta, vega columns of both sides to self.df
+        buildup=True adds the intraday oi and volume changes and build-up labels of NSE(buildup=BuildUp()) to self.df
+        analyse returns the same results without setting instance state
         '''
         try:
-            self.get_nse_data(type=type, symbol=symbol)
+            if refresh or not self.index or self.loaded != (type, symbol):
+                self.get_nse_data(type=type, symbol=symbol)
             if bool(self.request): 
-                if expiry:
-                    ce_data = [data['CE'] for data in self.request['records']['data'] if "CE" in data and str(data['expiryDate']).lower() == str(expiry).lower()]
-                    pe_data = [data['PE'] for data in self.request['records']['data'] if "PE" in data and str(data['expiryDate']).lower() == str(expiry).lower()]
-                else:
-                    expiry = self.request['filtered']['data'][0]['expiryDate']
-                    ce_data = [data['CE'] for data in self.request['filtered']['data'] if "CE" in data]
-                    pe_data = [data['PE'] for data in self.request['filtered']['data'] if "PE" in data]
-
-                ce_df = pd.DataFrame(ce_data)
-                ce_df = ce_df.drop(['expiryDate', 'underlying', 'identifier', 'bidQty', 'bidprice', 'askQty', 'askPrice', 'changeinOpenInterest', 'change', 'underlyingValue'], axis = 1) 
-                ce_df = ce_df[['totalBuyQuantity', 'totalSellQuantity', 'totalTradedVolume', 'pchangeinOpenInterest', 'openInterest', 'pChange', 'lastPrice', 'impliedVolatility', 'strikePrice']]
-                ce_df = ce_df.rename(columns={'totalBuyQuantity':'BuyQ', 'totalSellQuantity':'SellQ', 'totalTradedVolume':'TotalVol', 'pchangeinOpenInterest':'pOI', 'openInterest':'OI', 'lastPrice':'LTP', 'pChange':'pLTP', 'impliedVolatility':'IV'})
-
-                pe_df = pd.DataFrame(pe_data)
-                pe_df= pe_df.drop(['expiryDate', 'underlying', 'identifier', 'bidQty', 'bidprice', 'askQty', 'askPrice', 'underlyingValue', 'changeinOpenInterest', 'change'], axis = 1)
-                pe_df = pe_df[['strikePrice', 'impliedVolatility', 'lastPrice', 'pChange', 'openInterest', 'pchangeinOpenInterest', 'totalTradedVolume', 'totalBuyQuantity', 'totalSellQuantity']]            
-                pe_df = pe_df.rename(columns={'totalBuyQuantity':'BuyQ', 'totalSellQuantity':'SellQ', 'totalTradedVolume':'TotalVol', 'pchangeinOpenInterest':'pOI', 'openInterest':'OI', 'lastPrice':'LTP', 'pChange':'pLTP', 'impliedVolatility':'IV'})
-
-                df = pd.merge(ce_df, pe_df, on='strikePrice', suffixes=('_c', '_p'), how='outer', sort=True).fillna(0)
-                df = df.astype({'BuyQ_c':'uint64', 'SellQ_c':'uint64', 'TotalVol_c':'uint64', 'OI_c':'uint64', 'BuyQ_p':'uint64', 'SellQ_p':'uint64', 'TotalVol_p':'uint64', 'OI_p':'uint64'})
-                df = df.astype({'pOI_c':'float', 'pLTP_c':'float', 'IV_c':'float', 'pOI_p':'float', 'pLTP_p':'float', 'IV_p':'float'}).round({'pOI_c':1, 'pLTP_c':1, 'IV_c':1, 'pOI_p':1, 'pLTP_p':1, 'IV_p':1})
-                df = df.astype({'LTP_c':'float', 'LTP_p':'float', 'strikePrice':'float'})
-                
-                def MaxPain_c(expiryPrice):
-                    sum = 0
-                    for index in df.index:
-                        if (expiryPrice - df['strikePrice'][index]) >= 0:
-                            sum = sum + (expiryPrice - df['strikePrice'][index]) * df['OI_c'][index]  
-                    return sum
-
-                def MaxPain_p(expiryPrice):
-                    sum = 0
-                    for index in df.index:
-                        if (df['strikePrice'][index] - expiryPrice) >= 0:
-                            sum = sum + (df['strikePrice'][index] - expiryPrice) * df['OI_p'][index]  
-                    return sum
-                                        
-                df['MaxPain_c'] = df['strikePrice'].apply(lambda row: MaxPain_c(row))
-                df['MaxPain_p'] = df['strikePrice'].apply(lambda row: MaxPain_p(row))
-                df['MaxPain'] = df['MaxPain_c'] + df['MaxPain_p']  # df['MaxPain'] = df.apply(lambda row: row['MaxPain_c'] + row['MaxPain_p'], axis = 1)
-                # df = df.drop(['MaxPain_c', 'MaxPain_p'], axis=1)
-                self.maxpain = df.loc[df['MaxPain'].idxmin()]['strikePrice']                        
-                self.pcr_oi = round(df['OI_p'].sum()/df['OI_c'].sum(),1)
-                self.pcr_vol = round(df['TotalVol_p'].sum()/df['TotalVol_c'].sum(),1)
-                self.df = df.copy()          
+                result = self.analyse(type=type, symbol=symbol, expiry=expiry, greeks=greeks, index=self.index, buildup=buildup)
+                self.maxpain = result.maxpain
+                self.pcr_oi = result.pcr_oi
+                self.pcr_vol = result.pcr_vol
+                self.df = result.df
             
         except Exception as err:
+            self.metrics.error('get_oc_data')
             print( "get_oc_data: ", err)
 
-    def get_output(self, type='indices', symbol='NIFTY', expiry=None):
+    def get_all_oc_data(self, type='indices', symbol='NIFTY'):
         '''
-        pass
+        fetches data for provided indices/equities and symbol once and returns dict of expiry date => oc dataframe for every expiry
         '''
-        self.get_oc_data(type=type, symbol=symbol, expiry=expiry) 
-        if not expiry:
-            expiry = self.request['filtered']['data'][0]['expiryDate']
+        try:
+            self.get_nse_data(type=type, symbol=symbol)
+            if bool(self.request):
+                return self.index.all_frames()
+        except Exception as err:
+            self.metrics.error('get_all_oc_data')
+            print("get_all_oc_data: ", err)
 
+    def get_all_metrics(self, type='indices', symbol='NIFTY'):
+        '''
+        fetches data for provided indices/equities and symbol once and returns maxpain, pcr_oi and pcr_vol of every expiry as a pandas dataframe
+        '''
+        try:
+            self.get_nse_data(type=type, symbol=symbol)
+            if bool(self.request):
+                return self.index.all_metrics()
+        except Exception as err:
+            self.metrics.error('get_all_metrics')
+            print("get_all_metrics: ", err)
+
+    def get_metrics(self, type='indices', symbol='NIFTY', expiry=None):
+        '''
+        fetches data for provided indices/equities and symbol and sets self.maxpain, self.pcr_oi, self.pcr_vol, self.timestamp
+        and self.underlyingValue of provided expiry date like get_oc_data, without building a dataframe or importing pandas
+        returns them as a dict with expiry and indicator, the nearest expiry when not given
+        with a store or buildup the chain is still indexed for them, which needs numpy and pandas
+        '''
+        try:
+            if self.store is not None or self.buildup is not None:
+                request, _ = self.load(type=type, symbol=symbol)
+            else:
+                request = self.fetch_nse_data(type=type, symbol=symbol)
+            if bool(request):
+                with self.metrics.timer('metrics'):
+                    metrics = chain_metrics(request, expiry or nearest_expiry(request))
+                if not metrics:
+                    raise KeyError(f'no expiry {expiry} in the option chain of {symbol}')
+                metrics = metrics[0]
+                self.timestamp = request['records']['timestamp']
+                self.underlyingValue = request['records']['underlyingValue']
+                self.maxpain = metrics['maxpain']
+                self.pcr_oi = metrics['pcr_oi']
+                self.pcr_vol = metrics['pcr_vol']
+                return dict(metrics, timestamp=self.timestamp, underlyingValue=self.underlyingValue)
+        except Exception as err:
+            self.metrics.error('get_metrics')
+            print("get_metrics: ", err)
+
+    def get_greeks(self, type='indices', symbol='NIFTY'):
+        '''
+        fetches data for provided indices/equities and symbol once and returns implied volatility and greeks of every strike
+        and expiry as a pandas dataframe, solved in one batch
+        '''
+        try:
+            self.get_nse_data(type=type, symbol=symbol)
+            if bool(self.request):
+                from Greeks import greeks_surface
+                return greeks_surface({symbol: self.index})
+        except Exception as err:
+            self.metrics.error('get_greeks')
+            print("get_greeks: ", err)
+
+    def get_strategies(self, type='indices', symbol='NIFTY', expiry=None, strategies=None, by='reward_risk', top=10, width=10):
+        '''
+        fetches data for provided expiry date and returns the top strike combinations of multi-leg strategies priced at LTP
+        as a pandas dataframe with their strikes, premium, max profit and loss, reward/risk, breakevens and margin
+            strategies => dict of name => legs as in Payoff.STRATEGIES, straddles, strangles, spreads, butterflies and condors by default
+            by => reward_risk, max_loss or breakeven, see Payoff.rank
+            width => strikes on each side of the atm strike the combinations are made of
+        '''
+        from Payoff import evaluate, rank
+        try:
+            result = self.analyse(type=type, symbol=symbol, expiry=expiry)
+            return rank(evaluate(result.df, result.underlyingValue, strategies, width), by=by, top=top)
+        except Exception as err:
+            self.metrics.error('get_strategies')
+            print("get_strategies: ", err)
+
+    def get_expiry_dates(self, type='indices', symbol='NIFTY'):
+        '''
+        fetches data for provided indices/equities and symbol and returns its expiry dates as a list
+        '''
+        try:
+            self.get_nse_data(type=type, symbol=symbol)
+            if bool(self.request):
+                return self.index.expiry_dates()
+        except Exception as err:
+            self.metrics.error('get_expiry_dates')
+            print("get_expiry_dates: ", err)
+
+    def get_all_maxpain(self, type='indices', symbol='NIFTY'):
+        '''
+        fetches data for provided indices/equities and symbol and returns maxpain of every expiry as a pandas series indexed by expiryDate
+        '''
+        try:
+            self.get_nse_data(type=type, symbol=symbol)
+            if bool(self.request):
+                from MaxPain import max_pain_by_expiry
+                return max_pain_by_expiry(self.request['records']['data'])
+        except Exception as err:
+            self.metrics.error('get_all_maxpain')
+            print("get_all_maxpain: ", err)
+
+    def get_output(self, type='indices', symbol='NIFTY', expiry=None, filename='index.html', skip_unchanged=False):
+        '''
+        fetches data for provided expiry date, writes the styled option chain around the atm strike to filename and returns the maxpain indicator
+        frame, metrics and html are cached per (type, symbol, expiry, records.timestamp) so polls without new nse data skip the analysis and rendering
+        skip_unchanged=True does not rewrite filename when its content would be identical
+        nothing is written when the fetch failed
+        '''
+        self.get_nse_data(type=type, symbol=symbol)
+        if self.request is None:
+            return
         if bool(self.request): 
-            def color_pcolumn(val):            
-                """
-                Takes a scalar and returns a string with
-                the css property `'color: red'` for negative
-                strings, black otherwise.
-                """
-                color = 'red' if val < 0 else 'green'
-                return 'color: %s' % color
-            
-            def highlight_min(data, color='rgba(58, 59, 53, 0.7)'):
-                '''
-                highlight the minimum in a Series or DataFrame
-                '''
-                attr = 'background-color: {}'.format(color)
-                if data.ndim == 1:  # Series from .apply(axis=0) or axis=1
-                    is_min = data == data.min()
-                    return [attr if v else '' for v in is_min]
-                else:  # from .apply(axis=None)
-                    is_min = data == data.min().min()
-                    return pd.DataFrame(np.where(is_min, attr, ''),
-                                        index=data.index, columns=data.columns)
-
-            atm_index = self.df['strikePrice'].sub(self.underlyingValue).abs().idxmin() 
-            if self.df['strikePrice'].sub(self.underlyingValue).abs().min() == 0:
-                itm_c = atm_index
-                itm_p = atm_index
-            elif self.df['strikePrice'][atm_index] > self.underlyingValue:
-                itm_c = atm_index-1
-                itm_p = atm_index
+            result, window, html = self.render(type=type, symbol=symbol, expiry=expiry, index=self.index)
+            self.maxpain = result.maxpain
+            self.pcr_oi = result.pcr_oi
+            self.pcr_vol = result.pcr_vol
+            self.df = window.copy()
+            self.write_output(html, filename, skip_unchanged)
+            return result.indicator
+        else:
+            self.write_output('hello', filename, skip_unchanged)
+
+    def get_outputs(self, targets, filename='index.html', folder=None):
+        '''
+        renders several option chains and returns dict of (type, symbol, expiry) => indicator
+            targets => iterable of (type, symbol) or (type, symbol, expiry) tuples
+            filename => page holding the tables of all targets
+            folder => when given, every target is written to its own folder/symbol_expiry.html instead
+        '''
+        from Render import render_chain, render_page
+        tables = []
+        indicators = {}
+        for target in targets:
+            type, symbol, expiry = tuple(target) + (None,) * (3 - len(target))
+            self.get_nse_data(type=type, symbol=symbol)
+            if not bool(self.request):
+                continue
+            # every target is analysed on its own, a failed one is skipped instead of rendering what the previous one left in self.df
+            try:
+                result = self.analyse(type=type, symbol=symbol, expiry=expiry, index=self.index)
+            except Exception as err:
+                self.metrics.error('get_outputs')
+                print("get_outputs: ", err)
+                continue
+            expiry = expiry or result.expiry
+            with self.metrics.timer('render'):
+                table, window = render_chain(result.df, symbol, expiry, result.underlyingValue, result.maxpain, result.pcr_oi,
+                    result.pcr_vol, result.timestamp, result.indicator)
+            self.maxpain = result.maxpain
+            self.pcr_oi = result.pcr_oi
+            self.pcr_vol = result.pcr_vol
+            self.df = window
+            indicators[(type, symbol, expiry)] = result.indicator
+            if folder:
+                self.write_output(render_page([table]), os.path.join(folder, f'{symbol}_{expiry}.html'))
             else:
-                itm_c = atm_index
-                itm_p = atm_index+1
-            # print(self.df['strikePrice'][atm_index])
-            
-            no_rows = 15
-            no_toprows = no_rows
-            no_bottomrows = no_rows
-            no_toprows = atm_index < no_toprows and atm_index or no_toprows  #works like if statement (conditional operator)
-            no_bottomrows = (len(self.df.index)-atm_index) < no_bottomrows and (len(self.df.index)-atm_index) or no_bottomrows
-            self.df = self.df.iloc[atm_index-no_toprows:atm_index+no_bottomrows,:]
-
-            self.df = self.df.drop(['MaxPain_c', 'MaxPain_p', 'IV_c', 'IV_p'], axis=1)
-
-            oi_max = self.df[['OI_c', 'OI_p']].max().max()
-            vol_max = self.df[['TotalVol_c', 'TotalVol_p']].max().max()
-
-            def linear_gradient_OI(row):
-                r = 'rgba(255,20,20,0.5)'
-                g = 'rgba(41, 171, 54, 0.7)'
-                df1 = pd.DataFrame('', index=row.index, columns=row.columns)
-                df1['OI_c'] = 'background : linear-gradient(90deg,'+r+' '+round(row['OI_c']/oi_max*100,1).astype(str)+'%, transparent '+round(row['OI_c']/oi_max*100,1).astype(str)+'%)'
-                # df1['OI_c'] = 'background : #f3c0c0; left:-5px; right:initial; border-top-right-radius : 20px; width : '+ round(row['OI_c']/oi_max*100,1).astype(str)+'%'
-                df1['OI_p'] = 'background : linear-gradient(270deg,'+g+' '+round(row['OI_p']/oi_max*100,1).astype(str)+'%, transparent '+round(row['OI_p']/oi_max*100,1).astype(str)+'%)'
-                return df1
-
-            def linear_gradient_vol(row):
-                r = 'rgba(255,20,20, 0.5)'
-                g = 'rgba(41, 171, 54, 0.7)'
-                df1 = pd.DataFrame('', index=row.index, columns=row.columns)
-                df1['TotalVol_c'] = 'background : linear-gradient(90deg,'+r+' '+round(row['TotalVol_c']/vol_max*100,1).astype(str)+'%, transparent '+round(row['TotalVol_c']/vol_max*100,1).astype(str)+'%)'
-                df1['TotalVol_p'] = 'background : linear-gradient(270deg,'+g+' '+round(row['TotalVol_p']/vol_max*100,1).astype(str)+'%, transparent '+round(row['TotalVol_p']/vol_max*100,1).astype(str)+'%)'
-                return df1
-            
-            df_style = self.df.style    
-            
-            indicator = '>maxpain ' + str(round((self.underlyingValue-self.maxpain)/self.maxpain*100, 1)) if self.underlyingValue>self.maxpain else '<maxpain ' + str(round((self.maxpain-self.underlyingValue)/self.underlyingValue*100, 1))
-            superscript = '<sup>' + indicator +'</sup>'
-
-            styles = [
-                # hover(),
-                dict(selector="th", props=[("font-size", "100%"), ("text-align", "center"), ('background-color', 'rgba(4, 121, 204, 0.6)'), ("border-radius", "10px")]),
-                dict(selector="caption", props=[("caption-side", "top"), ("font-size", "95%"), ("font-family", "helvetica"), ("text-align", "center"), ('font-weight', '700')])
-            ]
-            temp = str(symbol) + "<br />Expiry - " + str(expiry) + "<br /><br />" + "UnderlyingValue - " + \
-                str(self.underlyingValue)+ superscript + "&nbsp;&nbsp;&nbsp;&nbsp;PCR_OI - " + str(self.pcr_oi) + \
-                    "&nbsp;&nbsp;&nbsp;&nbsp;PCR_Vol - " + str(self.pcr_vol) + "<br /><br />Last updated - " + str(self.timestamp)
-            df_style = (df_style.set_table_styles(styles).set_caption(temp))
-
-            df_style = df_style.apply(linear_gradient_OI, axis=None)
-            df_style = df_style.apply(linear_gradient_vol, axis=None)
-            # df_style = df_style.bar(subset=['OI_c'], color='#eb6e6e')
-            # df_style = df_style.bar(subset=['OI_p'], color='#4fc95b')         
-            df_style = df_style.bar(subset=['MaxPain'], color='rgba(58, 59, 53, 0.5)')
-            # df_style = df_style.bar(subset=['TotalVol_c', 'TotalVol_p'], color='#26abad')
-            # df_style = df_style.bar(subset=['pOI_c', 'pOI_p'], align='mid', color=['#eb6e6e', '#4fc95b'])
-            df_style = df_style.set_properties(**{'width':'80px', 'font-family':'roboto', 'text-align':'center', 'font-weight':'400'})
-            df_style = df_style.set_properties(**{'background-color':'#f7f7f7'})
-            # df_style = df_style.set_properties(**{'background-color':'#ddd5de'}, subset=['strikePrice'])
-            df_style = df_style.applymap(lambda x: 'background-color:#f5f4cb' if x==self.df['strikePrice'][atm_index] else None, subset=['strikePrice'])
-            df_style = df_style.applymap(lambda x: 'background-color:#f5f4cb', subset=pd.IndexSlice[:itm_c,['BuyQ_c', 'SellQ_c', 'TotalVol_c', 'OI_c', 'pOI_c', 'LTP_c', 'pLTP_c']])
-            df_style = df_style.applymap(lambda x: 'background-color:#f5f4cb', subset=pd.IndexSlice[itm_p:,['BuyQ_p', 'SellQ_p', 'TotalVol_p', 'OI_p', 'pOI_p', 'LTP_p', 'pLTP_p']])
-            df_style = df_style.apply(highlight_min, subset=['MaxPain'])
-            df_style = df_style.set_properties(**{'width':'300px'}, subset=['OI_c', 'OI_p'])
-            df_style = df_style.set_properties(**{'width':'200px'}, subset=['TotalVol_c', 'TotalVol_p'])
-            df_style = df_style.applymap(color_pcolumn, subset=pd.IndexSlice[:,['pOI_c', 'pOI_p', 'pLTP_c', 'pLTP_p']])
-
-            def highlight_greater(x):
-                color = 'rgba(255,20,20, 0.5)'
-
-                m1 = x['SellQ_c'] > x['BuyQ_c']
-                m2 = x['SellQ_p'] > x['BuyQ_p']
-
-                df1 = pd.DataFrame('background-color: ', index=x.index, columns=x.columns)
-                #rewrite values by boolean masks
-                df1['SellQ_c'] = np.where(m1, 'background-color: {}'.format(color), df1['SellQ_c'])
-                df1['SellQ_p'] = np.where(m2, 'background-color: {}'.format(color), df1['SellQ_p'])
-                return df1
-            
-            df_style = df_style.apply(highlight_greater, axis=None)
+                tables.append(table)
+        if not folder:
+            self.write_output(render_page(tables), filename)
+        return indicators
 
-            df_style = df_style.hide_index()
-            # df_style = df_style.set_precision(2)
-            df_style = df_style.format({'pOI_c':'{:.1f}', 'pLTP_c':'{:.1f}',  \
-                'pOI_p':'{:.1f}', 'pLTP_p':'{:.1f}', 'LTP_c':'{:.2f}', 'LTP_p':'{:.2f}', \
-                    'strikePrice':'{:.2f}', 'MaxPain':'{:.0f}'})   
-            df_style = df_style.applymap(lambda x: "border-radius:5px")
-            html = df_style.render()  
+    def write_output(self, result, filename='index.html', skip_unchanged=False):
+        '''
+        writes result to filename, with skip_unchanged=True the write is skipped when filename already holds the same content
+        '''
+        digest = hashlib.sha1(result.encode()).hexdigest()
+        if skip_unchanged and self.written.get(filename) == digest and os.path.exists(filename):
+            self.writes_skipped += 1
+            self.metrics.count('writes_skipped', 1, 'write')
+            return
+        with self.metrics.timer('write'):
+            with open(filename,"w") as f:
+                f.write(result)
+        self.metrics.count('bytes', len(result), 'write')
+        self.written[filename] = digest
 
-            result = '''<html>
+    def render_output(self, symbol, expiry):
+        '''
+        renders self.df around the atm strike as a styled html page and returns (html, indicator)
+        self.df is cut down to the rendered window
+        '''
+        from Render import render_page
+        table, indicator = self.render_table(symbol, expiry)
+        return render_page([table]), indicator
+
+    def render_table(self, symbol, expiry):
+        '''
+        renders self.df around the atm strike as a styled html table without the page around it and returns (table, indicator)
+        self.df is cut down to the rendered window
+        '''
+        from Render import render_chain
+        indicator = get_indicator(self.underlyingValue, self.maxpain)
+        table, self.df = render_chain(self.df, symbol, expiry, self.underlyingValue, self.maxpain, self.pcr_oi, self.pcr_vol, self.timestamp, indicator)
+        return table, indicator
+
+    def render_styler(self, symbol, expiry):
+        '''
+        renders self.df like render_output but through the pandas Styler, kept as the reference for Render.py
+        self.df is cut down to the rendered window
+        '''
+        import numpy as np
+        import pandas as pd
+        def color_pcolumn(val):            
+            """
+            Takes a scalar and returns a string with
+            the css property `'color: red'` for negative
+            strings, black otherwise.
+            """
+            color = 'red' if val < 0 else 'green'
+            return 'color: %s' % color
+        
+        def highlight_min(data, color='rgba(58, 59, 53, 0.7)'):
+            '''
+            highlight the minimum in a Series or DataFrame
+            '''
+            attr = 'background-color: {}'.format(color)
+            if data.ndim == 1:  # Series from .apply(axis=0) or axis=1
+                is_min = data == data.min()
+                return [attr if v else '' for v in is_min]
+            else:  # from .apply(axis=None)
+                is_min = data == data.min().min()
+                return pd.DataFrame(np.where(is_min, attr, ''),
+                                    index=data.index, columns=data.columns)
+
+        atm_index = self.df['strikePrice'].sub(self.underlyingValue).abs().idxmin() 
+        if self.df['strikePrice'].sub(self.underlyingValue).abs().min() == 0:
+            itm_c = atm_index
+            itm_p = atm_index
+        elif self.df['strikePrice'][atm_index] > self.underlyingValue:
+            itm_c = atm_index-1
+            itm_p = atm_index
+        else:
+            itm_c = atm_index
+            itm_p = atm_index+1
+        # print(self.df['strikePrice'][atm_index])
+        
+        no_rows = 15
+        no_toprows = no_rows
+        no_bottomrows = no_rows
+        no_toprows = atm_index < no_toprows and atm_index or no_toprows  #works like if statement (conditional operator)
+        no_bottomrows = (len(self.df.index)-atm_index) < no_bottomrows and (len(self.df.index)-atm_index) or no_bottomrows
+        self.df = self.df.iloc[atm_index-no_toprows:atm_index+no_bottomrows,:]
+
+        self.df = self.df.drop(['MaxPain_c', 'MaxPain_p', 'IV_c', 'IV_p'], axis=1)
+
+        oi_max = self.df[['OI_c', 'OI_p']].max().max()
+        vol_max = self.df[['TotalVol_c', 'TotalVol_p']].max().max()
+
+        def linear_gradient_OI(row):
+            r = 'rgba(255,20,20,0.5)'
+            g = 'rgba(41, 171, 54, 0.7)'
+            df1 = pd.DataFrame('', index=row.index, columns=row.columns)
+            df1['OI_c'] = 'background : linear-gradient(90deg,'+r+' '+round(row['OI_c']/oi_max*100,1).astype(str)+'%, transparent '+round(row['OI_c']/oi_max*100,1).astype(str)+'%)'
+            # df1['OI_c'] = 'background : #f3c0c0; left:-5px; right:initial; border-top-right-radius : 20px; width : '+ round(row['OI_c']/oi_max*100,1).astype(str)+'%'
+            df1['OI_p'] = 'background : linear-gradient(270deg,'+g+' '+round(row['OI_p']/oi_max*100,1).astype(str)+'%, transparent '+round(row['OI_p']/oi_max*100,1).astype(str)+'%)'
+            return df1
+
+        def linear_gradient_vol(row):
+            r = 'rgba(255,20,20, 0.5)'
+            g = 'rgba(41, 171, 54, 0.7)'
+            df1 = pd.DataFrame('', index=row.index, columns=row.columns)
+            df1['TotalVol_c'] = 'background : linear-gradient(90deg,'+r+' '+round(row['TotalVol_c']/vol_max*100,1).astype(str)+'%, transparent '+round(row['TotalVol_c']/vol_max*100,1).astype(str)+'%)'
+            df1['TotalVol_p'] = 'background : linear-gradient(270deg,'+g+' '+round(row['TotalVol_p']/vol_max*100,1).astype(str)+'%, transparent '+round(row['TotalVol_p']/vol_max*100,1).astype(str)+'%)'
+            return df1
+        
+        df_style = self.df.style    
+        
+        indicator = get_indicator(self.underlyingValue, self.maxpain)
+        superscript = '<sup>' + indicator +'</sup>'
+
+        styles = [
+            # hover(),
+            dict(selector="th", props=[("font-size", "100%"), ("text-align", "center"), ('background-color', 'rgba(4, 121, 204, 0.6)'), ("border-radius", "10px")]),
+            dict(selector="caption", props=[("caption-side", "top"), ("font-size", "95%"), ("font-family", "helvetica"), ("text-align", "center"), ('font-weight', '700')])
+        ]
+        temp = str(symbol) + "<br />Expiry - " + str(expiry) + "<br /><br />" + "UnderlyingValue - " + \
+            str(self.underlyingValue)+ superscript + "&nbsp;&nbsp;&nbsp;&nbsp;PCR_OI - " + str(self.pcr_oi) + \
+                "&nbsp;&nbsp;&nbsp;&nbsp;PCR_Vol - " + str(self.pcr_vol) + "<br /><br />Last updated - " + str(self.timestamp)
+        df_style = (df_style.set_table_styles(styles).set_caption(temp))
+
+        df_style = df_style.apply(linear_gradient_OI, axis=None)
+        df_style = df_style.apply(linear_gradient_vol, axis=None)
+        # df_style = df_style.bar(subset=['OI_c'], color='#eb6e6e')
+        # df_style = df_style.bar(subset=['OI_p'], color='#4fc95b')         
+        df_style = df_style.bar(subset=['MaxPain'], color='rgba(58, 59, 53, 0.5)')
+        # df_style = df_style.bar(subset=['TotalVol_c', 'TotalVol_p'], color='#26abad')
+        # df_style = df_style.bar(subset=['pOI_c', 'pOI_p'], align='mid', color=['#eb6e6e', '#4fc95b'])
+        df_style = df_style.set_properties(**{'width':'80px', 'font-family':'roboto', 'text-align':'center', 'font-weight':'400'})
+        df_style = df_style.set_properties(**{'background-color':'#f7f7f7'})
+        # df_style = df_style.set_properties(**{'background-color':'#ddd5de'}, subset=['strikePrice'])
+        df_style = df_style.applymap(lambda x: 'background-color:#f5f4cb' if x==self.df['strikePrice'][atm_index] else None, subset=['strikePrice'])
+        df_style = df_style.applymap(lambda x: 'background-color:#f5f4cb', subset=pd.IndexSlice[:itm_c,['BuyQ_c', 'SellQ_c', 'TotalVol_c', 'OI_c', 'pOI_c', 'LTP_c', 'pLTP_c']])
+        df_style = df_style.applymap(lambda x: 'background-color:#f5f4cb', subset=pd.IndexSlice[itm_p:,['BuyQ_p', 'SellQ_p', 'TotalVol_p', 'OI_p', 'pOI_p', 'LTP_p', 'pLTP_p']])
+        df_style = df_style.apply(highlight_min, subset=['MaxPain'])
+        df_style = df_style.set_properties(**{'width':'300px'}, subset=['OI_c', 'OI_p'])
+        df_style = df_style.set_properties(**{'width':'200px'}, subset=['TotalVol_c', 'TotalVol_p'])
+        df_style = df_style.applymap(color_pcolumn, subset=pd.IndexSlice[:,['pOI_c', 'pOI_p', 'pLTP_c', 'pLTP_p']])
+
+        def highlight_greater(x):
+            color = 'rgba(255,20,20, 0.5)'
+
+            m1 = x['SellQ_c'] > x['BuyQ_c']
+            m2 = x['SellQ_p'] > x['BuyQ_p']
+
+            df1 = pd.DataFrame('background-color: ', index=x.index, columns=x.columns)
+            #rewrite values by boolean masks
+            df1['SellQ_c'] = np.where(m1, 'background-color: {}'.format(color), df1['SellQ_c'])
+            df1['SellQ_p'] = np.where(m2, 'background-color: {}'.format(color), df1['SellQ_p'])
+            return df1
+        
+        df_style = df_style.apply(highlight_greater, axis=None)
+
+        df_style = df_style.hide_index()
+        # df_style = df_style.set_precision(2)
+        df_style = df_style.format({'pOI_c':'{:.1f}', 'pLTP_c':'{:.1f}',  \
+            'pOI_p':'{:.1f}', 'pLTP_p':'{:.1f}', 'LTP_c':'{:.2f}', 'LTP_p':'{:.2f}', \
+                'strikePrice':'{:.2f}', 'MaxPain':'{:.0f}'})   
+        df_style = df_style.applymap(lambda x: "border-radius:5px")
+        html = df_style.render()  
+
+        result = '''<html>
             <head>
             <style>
 
@@ -337,24 +764,19 @@ class NSE:
             </head>
             <body>
             '''          
-            result += html
-            result += '''
+        result += html
+        result += '''
             </body>
             </html>
             '''
-
-            with open("index.html","w") as f:
-                f.write(result)
-            return indicator
-        else:
-            with open("index.html","w") as f:
-                f.write('hello')
+        return result, indicator
 
     def print_expiryDates(self, type, symbol):
         '''
         prints expiry dates of given symbol
         '''
-        pass
+        for expiry in self.get_expiry_dates(type=type, symbol=symbol) or []:
+            print(expiry)
 
     def write_to_html_file(self, df, title='', filename='out.html'):
         '''
@@ -450,6 +872,10 @@ if __name__ == "__main__":
 
     # for x in nse.get_stocks_contracts_names():
     #     print(x, nse.get_output(symbol=x, type=type1, expiry=expiry), sep=' - ')
+
+    # from Scanner import Scanner
+    # scanner = Scanner(nse, max_workers=8, rate=3)
+    # print(scanner.scan(scanner.get_targets()))
     
 
 
@@ -0,0 +1,171 @@
+from functools import lru_cache
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+
+# legs of every strategy as (side, quantity, slot), slots are the strikes of the strategy in increasing order,
+# a positive quantity buys the option at its LTP and a negative one writes it
+STRATEGIES = {
+    'long_straddle': [('c', 1, 0), ('p', 1, 0)],
+    'short_straddle': [('c', -1, 0), ('p', -1, 0)],
+    'long_strangle': [('p', 1, 0), ('c', 1, 1)],
+    'short_strangle': [('p', -1, 0), ('c', -1, 1)],
+    'bull_call_spread': [('c', 1, 0), ('c', -1, 1)],
+    'bear_call_spread': [('c', -1, 0), ('c', 1, 1)],
+    'bull_put_spread': [('p', 1, 0), ('p', -1, 1)],
+    'bear_put_spread': [('p', -1, 0), ('p', 1, 1)],
+    'call_butterfly': [('c', 1, 0), ('c', -2, 1), ('c', 1, 2)],
+    'iron_butterfly': [('p', 1, 0), ('p', -1, 1), ('c', -1, 1), ('c', 1, 2)],
+    'iron_condor': [('p', 1, 0), ('p', -1, 1), ('c', -1, 2), ('c', 1, 3)],
+}
+SLOTS = 4
+RESULT_COLUMNS = ['strategy'] + [f'K{i + 1}' for i in range(SLOTS)] + ['premium', 'max_profit', 'max_loss', 'reward_risk',
+    'lower_breakeven', 'upper_breakeven', 'margin']
+
+
+@lru_cache(maxsize=64)
+def strike_combinations(n, slots):
+    '''
+    returns every increasing choice of slots positions out of n strikes as an int array with one row per combination
+    '''
+    return np.array(list(combinations(range(n), slots)), dtype='int64').reshape(-1, slots)
+
+
+def leg_values(strikes, ltp_c, ltp_p, prices):
+    '''
+    returns {'c': array, 'p': array} with the expiry P&L of buying one call and one put of every strike (rows) at every price (columns)
+    '''
+    strikes, prices = np.asarray(strikes, dtype='float64')[:, None], np.asarray(prices, dtype='float64')[None, :]
+    return {'c': np.maximum(prices - strikes, 0) - np.asarray(ltp_c, dtype='float64')[:, None],
+        'p': np.maximum(strikes - prices, 0) - np.asarray(ltp_p, dtype='float64')[:, None]}
+
+
+def strategy_values(legs, chosen, values):
+    '''
+    returns the expiry P&L of every combination (rows) at every price (columns) of a strategy in one broadcast
+        legs => (side, quantity, slot) of the strategy
+        chosen => strike positions of every combination, one column per slot
+        values => leg_values over the strikes the positions refer to
+    '''
+    result = None
+    for side, quantity, slot in legs:
+        leg = values[side].take(chosen[:, slot], axis=0)
+        if quantity != 1:
+            leg *= quantity
+        if result is None:
+            result = leg
+        else:
+            result += leg
+    return result
+
+
+def breakevens(values, prices):
+    '''
+    returns (lower, upper) prices where the P&L of every row crosses zero, interpolated between prices, nan without a crossing
+    '''
+    # LTPs have two decimals, the tolerance keeps float noise on a flat zero P&L from looking like a breakeven
+    positive = values >= -1e-9
+    crossing = positive[:, 1:] != positive[:, :-1]
+    found = crossing.any(axis=1)
+    rows = np.arange(len(values))
+    result = []
+    for i in (crossing.argmax(axis=1), crossing.shape[1] - 1 - crossing[:, ::-1].argmax(axis=1)):
+        left, right = values[rows, i], values[rows, i + 1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result.append(np.where(found, prices[i] - left * (prices[i + 1] - prices[i]) / (right - left), np.nan))
+    return tuple(result)
+
+
+def evaluate(df, spot, strategies=None, width=10, scan=0.1):
+    '''
+    returns premium, max profit, max loss, reward/risk, breakevens and margin of every strike combination of every strategy
+    for the chain frame of one expiry as a pandas dataframe with one row per combination, K1.. are its strikes
+        spot => underlying value
+        strategies => dict of name => legs, STRATEGIES by default
+        width => strikes on each side of the atm strike combinations are made of, only strikes traded on both sides are used
+        scan => margin is the worst loss for the underlying within spot +- scan, a span like scenario estimate, not the exchange margin
+    the P&L of a strategy is linear between strikes, so evaluating it at the strikes, 0, the scan range and beyond the last strike
+    gives exact extremes and breakevens, an unbounded profit or loss is inf and max_loss is the lowest P&L, positive when
+    stale LTPs make every price a gain
+    '''
+    strategies = STRATEGIES if strategies is None else strategies
+    traded = df[(df['LTP_c'] > 0) & (df['LTP_p'] > 0)]
+    strikes = traded['strikePrice'].values.astype('float64')
+    atm = np.abs(strikes - spot).argmin() if len(strikes) else 0
+    keep = slice(max(atm - width, 0), atm + width + 1)
+    strikes, ltp_c, ltp_p = strikes[keep], traded['LTP_c'].values[keep], traded['LTP_p'].values[keep]
+    if not len(strikes):
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+    low, high = spot * (1 - scan), spot * (1 + scan)
+    far = 2 * max(strikes.max(), high)
+    prices = np.unique(np.concatenate(([0.0, low, high, far], strikes)))
+    in_scan = slice(np.searchsorted(prices, low), np.searchsorted(prices, high, side='right'))
+    values = leg_values(strikes, ltp_c, ltp_p, prices)
+    frames = []
+    for name, legs in strategies.items():
+        slots = max(slot for _, _, slot in legs) + 1
+        chosen = strike_combinations(len(strikes), slots)
+        if not len(chosen):
+            continue
+        pnl = strategy_values(legs, chosen, values)
+        # beyond the last price the P&L keeps the slope of the last segment
+        slope = pnl[:, -1] - pnl[:, -2]
+        slope[np.abs(slope) < 1e-9] = 0
+        max_profit = np.where(slope > 0, np.inf, pnl.max(axis=1).round(6))
+        max_loss = np.where(slope < 0, -np.inf, pnl.min(axis=1).round(6))
+        lower, upper = breakevens(pnl, prices)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            extra = np.where(pnl[:, -1] * slope < 0, prices[-1] - pnl[:, -1] * (prices[-1] - prices[-2]) / slope, np.nan)
+            reward_risk = np.where(max_loss < 0, max_profit / -max_loss, np.inf)
+        upper = np.where(np.isnan(extra), upper, extra)
+        lower = np.where(np.isnan(lower), extra, lower)
+        frame = {'strategy': np.full(len(chosen), name, dtype=object)}
+        for slot in range(SLOTS):
+            frame[f'K{slot + 1}'] = strikes[chosen[:, slot]] if slot < slots else np.full(len(chosen), np.nan)
+        frame.update(premium=-sum(quantity * (ltp_c if side == 'c' else ltp_p)[chosen[:, slot]] for side, quantity, slot in legs),
+            max_profit=max_profit, max_loss=max_loss, reward_risk=reward_risk, lower_breakeven=lower, upper_breakeven=upper,
+            margin=np.maximum(-pnl[:, in_scan].min(axis=1), 0))
+        frames.append(pd.DataFrame(frame, columns=RESULT_COLUMNS))
+    if not frames:
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+
+def rank(results, by='reward_risk', top=10, bounded=True):
+    '''
+    returns the top combinations of evaluate by reward_risk (highest first), max_loss (smallest loss first) or breakeven
+    (widest profit zone between the breakevens of credit strategies, narrowest loss zone of debit ones first)
+        bounded => only strategies whose loss is limited
+    '''
+    if bounded:
+        results = results[np.isfinite(results['max_loss'].values.astype('float64'))]
+    if by == 'reward_risk':
+        return results.sort_values(['reward_risk', 'max_loss'], ascending=False).head(top)
+    if by == 'max_loss':
+        return results.sort_values(['max_loss', 'reward_risk'], ascending=False).head(top)
+    if by == 'breakeven':
+        width = results['upper_breakeven'] - results['lower_breakeven']
+        score = width.where(results['premium'] > 0, -width)
+        return results.loc[score.sort_values(ascending=False).index].head(top)
+    raise ValueError(f'unknown ranking {by!r}, use reward_risk, max_loss or breakeven')
+
+
+def payoff_curves(results, df, prices, strategies=None):
+    '''
+    returns the expiry P&L of every row of results (rows) at every price of a dense grid (columns) as a numpy array, for plots
+        df => chain frame the results were evaluated on
+    '''
+    strategies = STRATEGIES if strategies is None else strategies
+    prices = np.asarray(prices, dtype='float64')
+    chain = df.set_index('strikePrice')
+    curves = np.zeros((len(results), len(prices)))
+    for name, rows in results.groupby('strategy').indices.items():
+        legs = strategies[name]
+        for side, quantity, slot in legs:
+            strikes = results[f'K{slot + 1}'].values[rows].astype('float64')
+            ltp = chain.loc[strikes, 'LTP_c' if side == 'c' else 'LTP_p'].values
+            intrinsic = np.maximum(prices[None, :] - strikes[:, None], 0) if side == 'c' else np.maximum(strikes[:, None] - prices[None, :], 0)
+            curves[rows] += quantity * (intrinsic - ltp[:, None])
+    return curves
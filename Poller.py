@@ -0,0 +1,188 @@
+import os
+import json
+import time
+import signal
+import statistics
+import threading
+from datetime import datetime, timedelta, timezone
+
+from OptionChain import NSE
+
+
+IST = timezone(timedelta(hours=5, minutes=30))
+
+
+def seconds_until_open(now=None, open_time=(9, 15), close_time=(15, 30)):
+    '''
+    returns seconds from now (unix time) until the next nse session opens, 0 during a session
+    weekends are skipped, exchange holidays are left to is_market_open
+    '''
+    now = datetime.fromtimestamp(time.time() if now is None else now, IST)
+    start = now.replace(hour=open_time[0], minute=open_time[1], second=0, microsecond=0)
+    end = now.replace(hour=close_time[0], minute=close_time[1], second=0, microsecond=0)
+    if now.weekday() < 5 and start <= now < end:
+        return 0
+    if now >= start:
+        start += timedelta(days=1)
+    while start.weekday() >= 5:
+        start += timedelta(days=1)
+    return (start - now).total_seconds()
+
+
+class ReplayNSE(NSE):
+    def __init__(self, payloads, **kwargs):
+        '''
+        __init__ of ReplayNSE class, an NSE that serves recorded payloads instead of calling nse
+            payloads => dict of symbol => list of json objects, or a folder of SYMBOL_*.json files
+        every fetch of a symbol returns its next payload, the market reports closed once every symbol is replayed
+        '''
+        super().__init__(**kwargs)
+        if isinstance(payloads, str):
+            folder, payloads = payloads, {}
+            for name in sorted(os.listdir(folder)):
+                if name.endswith('.json'):
+                    with open(os.path.join(folder, name)) as f:
+                        payloads.setdefault(name.split('_')[0], []).append(json.load(f))
+        self.payloads = {symbol: list(items) for symbol, items in payloads.items()}
+        self.position = dict.fromkeys(self.payloads, 0)
+
+    def fetch_nse_data(self, type='indices', symbol='NIFTY'):
+        position = self.position[symbol]
+        self.position[symbol] = min(position + 1, len(self.payloads[symbol]))
+        return self.payloads[symbol][min(position, len(self.payloads[symbol]) - 1)]
+
+    def is_market_open(self):
+        return any(self.position[symbol] < len(items) for symbol, items in self.payloads.items())
+
+
+class Poller:
+    def __init__(self, nse=None, targets=(('indices', 'NIFTY'),), folder='.', min_interval=15, max_interval=300, period=180, lag=5,
+            status_interval=300, closed_interval=600, dry_run=False):
+        '''
+        __init__ of Poller class, keeps rendered option chains of targets up to date while the market is open
+            nse => NSE instance kept warm across polls, a ReplayNSE for offline runs
+            targets => (type, symbol) or (type, symbol, expiry) tuples, each is written to folder/symbol_expiry.html
+            min_interval, max_interval => back-off range in seconds when a poll finds no new records.timestamp
+            period => initial guess of seconds between records.timestamp updates, learnt from observed updates
+            lag => seconds after the expected update at which a target is polled
+            status_interval => seconds between market status checks while open
+            closed_interval => seconds between market status checks while closed inside session hours (holidays)
+            dry_run => use a simulated clock, waits return immediately so a replay runs at full speed
+        '''
+        self.nse = nse or NSE()
+        self.targets = [tuple(target) + (None,) * (3 - len(target)) for target in targets]
+        self.folder = folder
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.period = period
+        self.lag = lag
+        self.status_interval = status_interval
+        self.closed_interval = closed_interval
+        self.dry_run = dry_run
+        self.now = time.time()
+        self.stop_event = threading.Event()
+        self.state = {target: {'due': 0, 'timestamp': None, 'changed_at': None, 'backoff': min_interval, 'periods': []} for target in self.targets}
+        self.polls = 0
+        self.refreshes = 0
+        self.failures = 0
+
+    def clock(self):
+        return self.now if self.dry_run else time.time()
+
+    def wait(self, seconds):
+        '''
+        sleeps for seconds or until stop is called, returns true when stopped
+        '''
+        if self.dry_run:
+            self.now += max(seconds, 0)
+            return self.stop_event.is_set()
+        return self.stop_event.wait(max(seconds, 0))
+
+    def stop(self, *args):
+        '''
+        asks the polling loop to finish after the current poll
+        '''
+        self.stop_event.set()
+
+    def poll(self, target):
+        '''
+        fetches one target, rewrites its html only when records.timestamp changed and schedules its next poll
+        the target is fetched and rendered without touching the state of self.nse, a failed fetch writes nothing
+        and backs off like a poll without new data
+        '''
+        type, symbol, expiry = target
+        state = self.state[target]
+        now = self.clock()
+        self.polls += 1
+        filename = os.path.join(self.folder, f'{symbol}_{expiry or "nearest"}.html')
+        try:
+            _, index = self.nse.load(type=type, symbol=symbol)
+            if index is None:
+                raise ValueError(f'no option chain data for {type} {symbol}')
+            _, _, html = self.nse.render(type=type, symbol=symbol, expiry=expiry, index=index)
+            self.nse.write_output(html, filename, skip_unchanged=True)
+        except Exception as err:
+            self.failures += 1
+            print("poll: ", target, err)
+            state['due'] = now + state['backoff']
+            state['backoff'] = min(state['backoff'] * 2, self.max_interval)
+            return
+        if index.timestamp != state['timestamp']:
+            if state['changed_at'] is not None:
+                state['periods'] = (state['periods'] + [now - state['changed_at']])[-10:]
+            state['timestamp'] = index.timestamp
+            state['changed_at'] = now
+            state['backoff'] = self.min_interval
+            self.refreshes += 1
+            period = statistics.median(state['periods']) if state['periods'] else self.period
+            state['due'] = now + max(period + self.lag, self.min_interval)
+        else:
+            state['due'] = now + state['backoff']
+            state['backoff'] = min(state['backoff'] * 2, self.max_interval)
+
+    def run(self, max_polls=None):
+        '''
+        polls targets as they become due until stop is called, sleeping through closed market hours
+            max_polls => stop after this many polls
+        '''
+        checked = None
+        while not self.stop_event.is_set():
+            now = self.clock()
+            if checked is None or now - checked >= self.status_interval:
+                if not self.nse.is_market_open():
+                    if self.dry_run:
+                        break
+                    checked = None
+                    if self.wait(seconds_until_open(now) or self.closed_interval):
+                        break
+                    continue
+                checked = now
+            for target in self.targets:
+                if self.state[target]['due'] <= now and not self.stop_event.is_set():
+                    try:
+                        self.poll(target)
+                    except Exception as err:
+                        print("poll: ", target, err)
+                        self.state[target]['due'] = now + self.max_interval
+                if max_polls is not None and self.polls >= max_polls:
+                    return
+            due = min(state['due'] for state in self.state.values())
+            if self.dry_run and isinstance(self.nse, ReplayNSE) and not self.nse.is_market_open():
+                break
+            if self.wait(due - self.clock()):
+                break
+
+    def run_forever(self):
+        '''
+        runs the polling loop until SIGINT or SIGTERM, closing the session on exit
+        '''
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+        try:
+            self.run()
+        finally:
+            self.nse.close()
+
+
+if __name__ == "__main__":
+    Poller(targets=[('indices', 'NIFTY'), ('indices', 'BANKNIFTY')]).run_forever()
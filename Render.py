@@ -0,0 +1,188 @@
+import re
+
+import numpy as np
+
+
+PAGE_HEAD = '''<html>
+            <head>
+            <style>
+
+            table tbody tr:hover {
+                color:rgb(32, 21, 235);
+                background-color: rgb(0, 0, 200, 1);
+                font-size: 102%;
+                border: 50px green;
+                font-weight:800;
+
+            }
+            </style>
+            </head>
+            <body>
+            '''
+PAGE_TAIL = '''
+            </body>
+            </html>
+            '''
+TABLE_STYLE = '''<style type="text/css">
+#{id} th {{font-size: 100%; text-align: center; background-color: rgba(4, 121, 204, 0.6); border-radius: 10px;}}
+#{id} caption {{caption-side: top; font-size: 95%; font-family: helvetica; text-align: center; font-weight: 700;}}
+{classes}
+</style>
+'''
+TABLE = '''<table id="{id}"><caption>{caption}</caption><thead><tr>{head}</tr></thead><tbody>
+{body}
+</tbody></table>
+'''
+
+CALL_COLUMNS = ['BuyQ_c', 'SellQ_c', 'TotalVol_c', 'OI_c', 'pOI_c', 'LTP_c', 'pLTP_c']
+PUT_COLUMNS = ['BuyQ_p', 'SellQ_p', 'TotalVol_p', 'OI_p', 'pOI_p', 'LTP_p', 'pLTP_p']
+FORMATS = {'pOI_c': '%.1f', 'pLTP_c': '%.1f', 'pOI_p': '%.1f', 'pLTP_p': '%.1f', 'LTP_c': '%.2f', 'LTP_p': '%.2f', 'strikePrice': '%.2f', 'MaxPain': '%.0f'}
+RED = 'rgba(255,20,20,0.5)'
+RED_VOL = 'rgba(255,20,20, 0.5)'
+GREEN = 'rgba(41, 171, 54, 0.7)'
+ITM = '#f5f4cb'
+
+
+def atm_window(df, underlyingValue, no_rows=15):
+    '''
+    returns (window, atm_index, itm_c, itm_p), the no_rows strikes on each side of the atm strike and the index labels
+    of the atm strike and of the last itm call and first itm put
+    '''
+    atm_index = df['strikePrice'].sub(underlyingValue).abs().idxmin()
+    if df['strikePrice'].sub(underlyingValue).abs().min() == 0:
+        itm_c = atm_index
+        itm_p = atm_index
+    elif df['strikePrice'][atm_index] > underlyingValue:
+        itm_c = atm_index-1
+        itm_p = atm_index
+    else:
+        itm_c = atm_index
+        itm_p = atm_index+1
+    no_toprows = atm_index < no_rows and atm_index or no_rows  #works like if statement (conditional operator)
+    no_bottomrows = (len(df.index)-atm_index) < no_rows and (len(df.index)-atm_index) or no_rows
+    window = df.iloc[atm_index-no_toprows:atm_index+no_bottomrows,:]
+    return window, atm_index, itm_c, itm_p
+
+
+def get_caption(symbol, expiry, underlyingValue, indicator, pcr_oi, pcr_vol, timestamp):
+    '''
+    returns the table caption with the metrics of a chain
+    '''
+    superscript = '<sup>' + indicator +'</sup>'
+    return str(symbol) + "<br />Expiry - " + str(expiry) + "<br /><br />" + "UnderlyingValue - " + \
+        str(underlyingValue)+ superscript + "&nbsp;&nbsp;&nbsp;&nbsp;PCR_OI - " + str(pcr_oi) + \
+            "&nbsp;&nbsp;&nbsp;&nbsp;PCR_Vol - " + str(pcr_vol) + "<br /><br />Last updated - " + str(timestamp)
+
+
+def gradient(values, maximum, angle, color):
+    '''
+    returns the css background of a horizontal bar filled to values/maximum percent for every value
+    '''
+    with np.errstate(divide='ignore', invalid='ignore'):
+        percent = np.round(values / maximum * 100, 1).tolist()
+    return [f'background: linear-gradient({angle}deg,{color} {p}%, transparent {p}%);' for p in percent]
+
+
+def cell_styles(window, atm_index, itm_c, itm_p):
+    '''
+    returns a dict of column => list with the css of every cell of the rendered window
+    the styles are the ones the Styler chain of get_output ends up applying after the css cascade,
+    every condition is evaluated as one numpy mask per column
+    '''
+    n = len(window)
+    labels = window.index.values
+    values = {column: window[column].values for column in window.columns}
+    styles = {}
+
+    oi_max = max(values['OI_c'].max(), values['OI_p'].max())
+    vol_max = max(values['TotalVol_c'].max(), values['TotalVol_p'].max())
+    pain = values['MaxPain'].astype('float64')
+    normed = 100 * (pain - np.nanmin(pain)) / (np.nanmax(pain) - np.nanmin(pain) + 1e-12)
+    bar = [f'background: linear-gradient(90deg,rgba(58, 59, 53, 0.5) {e:.1f}%, transparent {e:.1f}%);' if x > 0 else ''
+        for x, e in zip(normed.tolist(), np.minimum(normed, 100).tolist())]
+
+    for column in window.columns:
+        background = [''] * n
+        color = np.full(n, '#f7f7f7', dtype=object)
+        width = '80px'
+        extra = [''] * n
+        if column in ('OI_c', 'OI_p'):
+            background = gradient(values[column], oi_max, 90 if column == 'OI_c' else 270, RED if column == 'OI_c' else GREEN)
+            width = '300px'
+        elif column in ('TotalVol_c', 'TotalVol_p'):
+            background = gradient(values[column], vol_max, 90 if column == 'TotalVol_c' else 270, RED_VOL if column == 'TotalVol_c' else GREEN)
+            width = '200px'
+        elif column == 'MaxPain':
+            background = bar
+            extra = ['height: 80%;'] * n
+            color[pain == np.nanmin(pain)] = 'rgba(58, 59, 53, 0.7)'
+        elif column == 'strikePrice':
+            color[values['strikePrice'] == window['strikePrice'][atm_index]] = ITM
+        if column in CALL_COLUMNS:
+            color[labels <= itm_c] = ITM
+        elif column in PUT_COLUMNS:
+            color[labels >= itm_p] = ITM
+        if column == 'SellQ_c':
+            color[values['SellQ_c'] > values['BuyQ_c']] = RED_VOL
+        elif column == 'SellQ_p':
+            color[values['SellQ_p'] > values['BuyQ_p']] = RED_VOL
+        if column in ('pOI_c', 'pOI_p', 'pLTP_c', 'pLTP_p'):
+            extra = np.where(values[column] < 0, 'color: red;', 'color: green;').tolist()
+        fixed = f'width: {width}; font-family: roboto; text-align: center; font-weight: 400; border-radius: 5px;'
+        styles[column] = [f'{b}background-color: {c};{e}{fixed}' for b, c, e in zip(background, color.tolist(), extra)]
+    return styles
+
+
+def cell_texts(window):
+    '''
+    returns a dict of column => list with the formatted text of every cell of the rendered window
+    '''
+    texts = {}
+    for column in window.columns:
+        values = window[column].values.tolist()
+        texts[column] = [FORMATS[column] % value for value in values] if column in FORMATS else [str(value) for value in values]
+    return texts
+
+
+def render_table(window, caption, atm_index, itm_c, itm_p, table_id='T_chain'):
+    '''
+    renders a window of the option chain as a styled html table
+    every distinct cell style becomes one css class, cells are written with one pass over the rows
+    '''
+    styles = cell_styles(window, atm_index, itm_c, itm_p)
+    texts = cell_texts(window)
+    columns = list(window.columns)
+
+    classes = {}
+    cells = []
+    for column in columns:
+        cells.append([f'<td class="s{classes.setdefault(style, len(classes))}">{text}</td>' for style, text in zip(styles[column], texts[column])])
+    rules = '\n'.join(f'#{table_id} .s{i} {{{style}}}' for style, i in classes.items())
+    body = '\n'.join('<tr>' + ''.join(row) + '</tr>' for row in zip(*cells))
+    head = ''.join(f'<th>{column}</th>' for column in columns)
+    return TABLE_STYLE.format(id=table_id, classes=rules) + TABLE.format(id=table_id, caption=caption, head=head, body=body)
+
+
+def table_id(symbol, expiry):
+    '''
+    returns a stable html id for the table of a symbol and expiry
+    '''
+    return 'T_' + re.sub(r'\W', '_', f'{symbol}_{expiry}')
+
+
+def render_page(tables):
+    '''
+    wraps rendered tables into one html page
+    '''
+    return PAGE_HEAD + '\n'.join(tables) + PAGE_TAIL
+
+
+def render_chain(df, symbol, expiry, underlyingValue, maxpain, pcr_oi, pcr_vol, timestamp, indicator, no_rows=15):
+    '''
+    renders the no_rows strikes around the atm strike of an option chain dataframe as a styled html table
+    returns (table, window), window is the rendered part of df without the MaxPain_c, MaxPain_p, IV_c and IV_p columns
+    '''
+    window, atm_index, itm_c, itm_p = atm_window(df, underlyingValue, no_rows)
+    window = window.drop(['MaxPain_c', 'MaxPain_p', 'IV_c', 'IV_p'], axis=1)
+    caption = get_caption(symbol, expiry, underlyingValue, indicator, pcr_oi, pcr_vol, timestamp)
+    return render_table(window, caption, atm_index, itm_c, itm_p, table_id(symbol, expiry)), window
@@ -0,0 +1,103 @@
+import time
+import random
+import threading
+from concurrent.futures import Future
+
+
+class CircuitOpenError(Exception):
+    '''
+    raised instead of sending a request while the circuit breaker of its endpoint is open
+    '''
+
+
+class Coalescer:
+    def __init__(self):
+        '''
+        __init__ of Coalescer class, lets concurrent callers asking for the same key share one call
+        '''
+        self.lock = threading.Lock()
+        self.inflight = {}
+        self.calls = 0
+        self.shared = 0
+
+    def call(self, key, func):
+        '''
+        returns func(), or the result of the call of func already running for key, exceptions are raised to every caller
+        '''
+        with self.lock:
+            self.calls += 1
+            future = self.inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self.inflight[key] = Future()
+            else:
+                self.shared += 1
+        if not leader:
+            return future.result()
+        try:
+            future.set_result(func())
+        except BaseException as err:
+            future.set_exception(err)
+        finally:
+            with self.lock:
+                del self.inflight[key]
+        return future.result()
+
+    def stats(self):
+        '''
+        returns calls, calls served by another caller's request and their ratio as a dict
+        '''
+        with self.lock:
+            return {'calls': self.calls, 'shared': self.shared, 'ratio': self.shared / self.calls if self.calls else 0.0}
+
+
+class CircuitBreaker:
+    CLOSED, HALF_OPEN, OPEN = 'closed', 'half_open', 'open'
+    # gauge value of every state
+    LEVELS = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(self, threshold=5, timeout=30):
+        '''
+        __init__ of CircuitBreaker class
+            threshold => consecutive failures that open the circuit
+            timeout => seconds the circuit stays open before one trial request is let through
+        '''
+        self.threshold = threshold
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened = 0.0
+        self.rejected = 0
+
+    def before(self):
+        '''
+        raises CircuitOpenError while the circuit is open, lets a single trial request through once timeout has passed
+        '''
+        with self.lock:
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.OPEN and time.monotonic() - self.opened >= self.timeout:
+                self.state = self.HALF_OPEN
+                return
+            self.rejected += 1
+            raise CircuitOpenError(f'circuit open for {max(self.timeout - (time.monotonic() - self.opened), 0):.0f} more seconds')
+
+    def success(self):
+        with self.lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.threshold:
+                self.state = self.OPEN
+                self.opened = time.monotonic()
+
+
+def backoff_delay(attempt, base=0.5, cap=8.0):
+    '''
+    returns a random delay in seconds before retry number attempt (0 based), exponential backoff with full jitter
+    '''
+    return random.uniform(0, min(cap, base * 2 ** attempt))
@@ -0,0 +1,109 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from OptionChain import NSE
+from Chain import indicator_values
+from Indicator import get_indicator
+from Decode import decode_chain
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity=None):
+        '''
+        __init__ of TokenBucket class
+            rate => tokens added per second
+            capacity => maximum burst size, defaults to rate
+        '''
+        self.rate = float(rate)
+        self.capacity = float(capacity or rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        '''
+        blocks until a token is available and takes it
+        '''
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class Scanner:
+    columns = ['type', 'symbol', 'expiry', 'timestamp', 'underlyingValue', 'maxpain', 'PCR_OI', 'PCR_Vol', 'indicator', 'distance',
+        'BuyQ_c', 'SellQ_c', 'BuyQ_p', 'SellQ_p', 'error']
+    # chain columns summed over all strikes of the expiry into the results table
+    totals = ['BuyQ_c', 'SellQ_c', 'BuyQ_p', 'SellQ_p']
+
+    def __init__(self, nse=None, max_workers=8, rate=3, burst=None, alerts=None):
+        '''
+        __init__ of Scanner class
+            nse => NSE instance whose pooled session and cookies are shared by all workers
+            max_workers => maximum number of targets fetched at the same time
+            rate, burst => token bucket limiting requests per second sent to nse
+            alerts => AlertEngine swept over the results table of every scan
+        '''
+        self.nse = nse or NSE(pool_size=max_workers)
+        self.max_workers = max_workers
+        self.bucket = TokenBucket(rate, burst)
+        self.alerts = alerts
+
+    def scan_target(self, type='indices', symbol='NIFTY', expiry=None):
+        '''
+        fetches and analyses one target and returns it as a dict row of the results table
+        errors are returned in the error field instead of being raised
+        '''
+        row = dict.fromkeys(self.columns)
+        row.update(type=type, symbol=symbol, expiry=expiry)
+        try:
+            self.bucket.acquire()
+            content = self.nse.fetch_nse_content(type=type, symbol=symbol)
+            with self.nse.metrics.timer('decode'):
+                index = decode_chain(content, expiry)
+            metrics = index.metrics(expiry)
+            row.update(expiry=metrics['expiry'], timestamp=index.timestamp, underlyingValue=index.underlyingValue, maxpain=metrics['maxpain'],
+                PCR_OI=metrics['pcr_oi'], PCR_Vol=metrics['pcr_vol'], indicator=get_indicator(index.underlyingValue, metrics['maxpain']),
+                distance=float(indicator_values(index.underlyingValue, metrics['maxpain'])))
+            df, _ = index.frame(expiry)
+            row.update({column: int(df[column].sum()) for column in self.totals})
+        except Exception as err:
+            row['error'] = f'{err.__class__.__name__}: {err}'
+        return row
+
+    def scan(self, targets):
+        '''
+        fetches and analyses all targets concurrently and returns one results table as a pandas dataframe
+        distance is the indicator as a signed number and BuyQ/SellQ columns are totals over all strikes of the expiry
+        the table is swept by self.alerts when it is set
+            targets => iterable of (type, symbol) or (type, symbol, expiry) tuples
+        '''
+        targets = [tuple(target) + (None,) * (3 - len(target)) for target in targets]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            rows = list(executor.map(lambda target: self.scan_target(*target), targets))
+        table = pd.DataFrame(rows, columns=self.columns)
+        if self.alerts is not None:
+            try:
+                with self.nse.metrics.timer('alerts'):
+                    self.alerts.sweep(table)
+            except Exception as err:
+                self.nse.metrics.error('alerts')
+                print("scan: ", err)
+        return table
+
+    def get_targets(self, expiry=None):
+        '''
+        returns (type, symbol, expiry) targets of all indices and equities available in nse option chain
+        '''
+        indices = self.nse.get_indices_contracts_names() or []
+        stocks = self.nse.get_stocks_contracts_names() or []
+        return [('indices', symbol, expiry) for symbol in indices] + [('equities', symbol, expiry) for symbol in stocks]
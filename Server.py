@@ -0,0 +1,233 @@
+import gzip
+import json
+import time
+import hashlib
+import argparse
+import threading
+from collections import namedtuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from OptionChain import NSE
+from Metrics import Metrics
+from Cache import ResultCache
+from Resilience import Coalescer
+
+
+# a response body built once per records.timestamp, with its gzip encoding and etag
+Response = namedtuple('Response', ['etag', 'body', 'gzipped', 'content_type'])
+ROUTES = {'/api/chain': 'chain', '/api/metrics': 'metrics', '/chain': 'html'}
+
+
+def make_response(body, content_type):
+    '''
+    returns a Response of body (bytes) with its gzip encoding and a strong etag of its content
+    '''
+    return Response(f'"{hashlib.sha1(body).hexdigest()[:20]}"', body, gzip.compress(body, 6, mtime=0), content_type)
+
+
+class ChainService:
+    def __init__(self, nse=None, refresh=30, cache_size=256, symbols=None):
+        '''
+        __init__ of ChainService class, the shared fetch and compute pipeline behind ChainServer
+        every (type, symbol) is fetched from nse at most once per refresh seconds whatever the number of clients,
+        responses are built and compressed once per (route, type, symbol, expiry, records.timestamp)
+            nse => NSE instance used for fetching, analysing and rendering
+            refresh => seconds a fetched chain is served before nse is asked again
+            cache_size => number of built responses kept, and of symbols whose fetch failed
+            symbols => allowed (type, symbol) pairs, anything else is not fetched, every symbol when None
+        '''
+        self.nse = nse or NSE()
+        self.refresh = refresh
+        self.symbols = set(symbols) if symbols is not None else None
+        self.responses = ResultCache(cache_size)
+        self.builds = Coalescer()
+        self.fetches = Coalescer()
+        # (type, symbol) => (time.monotonic of the fetch, ExpiryIndex)
+        self.loaded = {}
+        # (type, symbol) => (time.monotonic of the fetch, exception) of symbols whose fetch failed or returned no data
+        self.failures = ResultCache(cache_size)
+
+    def index(self, type, symbol):
+        '''
+        returns the ExpiryIndex of the last fetch of type and symbol, fetching it again once it is refresh seconds old
+        when the fetch fails a previously fetched chain is served instead, raises when there is none
+        a failed fetch or one without data is remembered for refresh seconds too, so unknown symbols do not reach nse on every request
+        raises LookupError for symbols not allowed or without data
+        '''
+        key = (type, symbol)
+        if self.symbols is not None and key not in self.symbols:
+            raise LookupError(f'{type} {symbol} is not served')
+        fetched, index = self.loaded.get(key, (None, None))
+        if fetched is not None and time.monotonic() - fetched < self.refresh:
+            return index
+        # one fetch per key at a time, the other clients wait for it and share its result
+        return self.fetches.call(key, lambda: self.fetch(key))
+
+    def fetch(self, key):
+        '''
+        fetches the ExpiryIndex of key (type, symbol) unless another client just did, see index
+        '''
+        fetched, index = self.loaded.get(key, (None, None))
+        if fetched is not None and time.monotonic() - fetched < self.refresh:
+            return index
+        failed, error = self.failures.get(key, (None, None))
+        if failed is not None and time.monotonic() - failed < self.refresh:
+            raise error.with_traceback(None)
+        type, symbol = key
+        try:
+            _, fresh = self.nse.load(type=type, symbol=symbol)
+            if fresh is None:
+                raise LookupError(f'no option chain data for {type} {symbol}')
+        except Exception as err:
+            if index is None:
+                self.failures.put(key, (time.monotonic(), err))
+                raise
+            self.nse.metrics.count('stale', 1, 'server')
+            print("ChainService: ", err)
+            return index
+        self.loaded[key] = (time.monotonic(), fresh)
+        return fresh
+
+    def response(self, route, type, symbol, expiry=None):
+        '''
+        returns the Response of route (chain, metrics or html) for type, symbol and expiry, built once per records.timestamp
+        '''
+        index = self.index(type, symbol)
+        key = (route, type, symbol, str(expiry).lower() if expiry else None, index.timestamp)
+        cached = self.responses.get(key)
+        self.nse.metrics.count('cache_misses' if cached is None else 'cache_hits', 1, 'server')
+        if cached is not None:
+            return cached
+        # clients missing the cache together wait for one build
+        return self.builds.call(key, lambda: self.build(key, index))
+
+    def build(self, key, index):
+        '''
+        builds, caches and returns the Response of key (route, type, symbol, expiry, timestamp) from index
+        '''
+        cached = self.responses.get(key)
+        if cached is not None:
+            return cached
+        route, type, symbol, expiry, _ = key
+        if route == 'html':
+            _, _, html = self.nse.render(type=type, symbol=symbol, expiry=expiry, index=index)
+            response = make_response(html.encode(), 'text/html; charset=utf-8')
+        elif route == 'metrics':
+            metrics = index.all_metrics().reset_index()
+            body = {'type': type, 'symbol': symbol, 'timestamp': index.timestamp, 'underlyingValue': index.underlyingValue,
+                'expiries': json.loads(metrics.to_json(orient='records'))}
+            response = make_response(json.dumps(body).encode(), 'application/json')
+        else:
+            result = self.nse.analyse(type=type, symbol=symbol, expiry=expiry, index=index)
+            body = {name: getattr(result, name) for name in result._fields if name != 'df'}
+            body['chain'] = json.loads(result.df.to_json(orient='split', index=False))
+            response = make_response(json.dumps(body, default=float).encode(), 'application/json')
+        self.nse.metrics.count('builds', 1, 'server')
+        self.responses.put(key, response)
+        return response
+
+
+class ChainHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # headers and body go out in two writes, with nagle the body waits for the delayed ack of keep-alive clients
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        service = self.server.service
+        url = urlparse(self.path)
+        query = {name: values[0] for name, values in parse_qs(url.query).items()}
+        service.nse.metrics.count('requests', 1, 'server')
+        if url.path == '/health':
+            return self.reply(200, b'{"status": "ok"}', 'application/json')
+        if url.path == '/metrics':
+            return self.reply(200, service.nse.metrics.to_prometheus().encode(), 'text/plain; version=0.0.4')
+        if url.path not in ROUTES or 'symbol' not in query:
+            return self.reply(404, b'{"error": "use /api/chain, /api/metrics or /chain with ?symbol=&type=&expiry="}', 'application/json')
+        try:
+            with service.nse.metrics.timer('server'):
+                response = service.response(ROUTES[url.path], query.get('type', 'indices'), query['symbol'], query.get('expiry'))
+        except (LookupError, ValueError) as err:
+            return self.reply(404, json.dumps({'error': str(err)}).encode(), 'application/json')
+        except Exception as err:
+            return self.reply(503, json.dumps({'error': f'{err.__class__.__name__}: {err}'}).encode(), 'application/json')
+        gzipped = 'gzip' in self.headers.get('Accept-Encoding', '')
+        # the gzip and identity bodies differ byte for byte, so each gets its own strong etag
+        etag = f'{response.etag[:-1]}-gzip"' if gzipped else response.etag
+        headers = [('ETag', etag), ('Cache-Control', 'no-cache'), ('Vary', 'Accept-Encoding')]
+        if etag in [tag.strip() for tag in self.headers.get('If-None-Match', '').split(',')]:
+            service.nse.metrics.count('not_modified', 1, 'server')
+            return self.reply(304, b'', None, headers)
+        if gzipped:
+            return self.reply(200, response.gzipped, response.content_type, headers + [('Content-Encoding', 'gzip')])
+        self.reply(200, response.body, response.content_type, headers)
+
+    def reply(self, status, body, content_type, headers=()):
+        self.send_response(status)
+        for key, value in headers:
+            self.send_header(key, value)
+        if content_type:
+            self.send_header('Content-Type', content_type)
+        if status != 304:
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class ChainServer:
+    def __init__(self, service=None, host='127.0.0.1', port=8080):
+        '''
+        __init__ of ChainServer class, a read-only http api over one ChainService
+            GET /api/chain?symbol=NIFTY&type=indices&expiry=07-Jan-2021 => analysis and chain frame of an expiry as json
+            GET /api/metrics?symbol=NIFTY => maxpain, pcr_oi and pcr_vol of every expiry as json
+            GET /chain?symbol=NIFTY => the rendered option chain page
+            GET /metrics => prometheus metrics of the pipeline, GET /health => {"status": "ok"}
+        responses are gzip encoded for clients accepting it and answer If-None-Match with 304 while records.timestamp is unchanged
+        '''
+        self.service = service or ChainService()
+        self.httpd = ThreadingHTTPServer((host, port), ChainHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.service = self.service
+        self.url = f'http://{self.httpd.server_address[0]}:{self.httpd.server_address[1]}'
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='serves option chains, metrics and rendered pages of nse over http')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--refresh', type=float, default=30, help='seconds a fetched chain is served before nse is asked again')
+    parser.add_argument('--base-url', default='https://www.nseindia.com', help='nse website or a Transport.StubServer url')
+    parser.add_argument('--indices', nargs='+', help='indices clients may ask for, the nse index contract names by default')
+    parser.add_argument('--equities', nargs='+', help='equities clients may ask for, the nse stock contract names by default')
+    args = parser.parse_args()
+    nse = NSE(base_url=args.base_url, metrics=Metrics())
+    # clients can only trigger fetches of listed symbols, never of arbitrary ones
+    symbols = [('indices', symbol) for symbol in args.indices or nse.get_indices_contracts_names() or []]
+    symbols += [('equities', symbol) for symbol in args.equities or nse.get_stocks_contracts_names() or []]
+    if not symbols:
+        parser.error('no symbols to serve, nse contract names could not be fetched, pass --indices or --equities')
+    server = ChainServer(ChainService(nse, refresh=args.refresh, symbols=symbols), host=args.host, port=args.port)
+    print('serving on', server.url)
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.httpd.server_close()
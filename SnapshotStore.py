@@ -0,0 +1,211 @@
+import os
+import json
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from Chain import ExpiryIndex, COLUMNS, DTYPES
+
+
+TIMESTAMP_FORMAT = '%d-%b-%Y %H:%M:%S'
+INDEX_DTYPE = np.dtype([('timestamp', 'int64'), ('expiry', 'int16'), ('start', 'int64'), ('rows', 'int64')])
+
+
+def parse_timestamp(timestamp):
+    '''
+    returns records.timestamp of nse ('31-Dec-2020 15:30:00'), a datetime or a numpy datetime64 as numpy datetime64[s]
+    '''
+    if isinstance(timestamp, str):
+        timestamp = datetime.strptime(timestamp, TIMESTAMP_FORMAT)
+    return np.datetime64(timestamp, 's')
+
+
+class SnapshotStore:
+    def __init__(self, root='snapshots', batch_rows=50000):
+        '''
+        __init__ of SnapshotStore class, an append-only store of option chain snapshots
+        every symbol and day gets a folder root/SYMBOL/YYYY-MM-DD holding one raw binary file per chain column,
+        an index of (timestamp, expiry, first row, number of rows) per snapshot, the underlying value of every snapshot
+        and the list of expiry dates
+            batch_rows => buffered rows that trigger a write, flush writes the rest
+        '''
+        self.root = root
+        self.batch_rows = batch_rows
+        self.buffers = {}
+        self.buffered_rows = 0
+        self.lock = threading.Lock()
+
+    def folder(self, symbol, day):
+        return os.path.join(self.root, str(symbol), str(day))
+
+    def append(self, symbol, request):
+        '''
+        buffers every expiry of a fetched nse json object as one snapshot per expiry, snapshots already stored are skipped
+        '''
+        timestamp = parse_timestamp(request['records']['timestamp'])
+        day = str(timestamp.astype('datetime64[D]'))
+        index = ExpiryIndex(request)
+        with self.lock:
+            key = (str(symbol), day)
+            if timestamp.astype('int64') in self.timestamps(*key):
+                return False
+            buffer = self.buffers.setdefault(key, [])
+            if any(item[0] == timestamp for item in buffer):
+                return False
+            for expiry in index.expiry_dates():
+                if str(expiry).lower() in index.sides:
+                    arrays, _ = index.arrays(expiry)
+                    buffer.append((timestamp, expiry, arrays, index.underlyingValue))
+                    self.buffered_rows += len(arrays['strikePrice'])
+            if self.buffered_rows >= self.batch_rows:
+                self.write()
+        return True
+
+    def flush(self):
+        '''
+        writes all buffered snapshots to disk
+        '''
+        with self.lock:
+            self.write()
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def write(self):
+        for (symbol, day), buffer in self.buffers.items():
+            if not buffer:
+                continue
+            folder = self.folder(symbol, day)
+            os.makedirs(folder, exist_ok=True)
+            expiries = self.expiries(symbol, day)
+            stored = len(self.index(symbol, day))
+            start = first = self.rows(symbol, day)
+            entries = np.zeros(len(buffer), dtype=INDEX_DTYPE)
+            for i, (timestamp, expiry, arrays, _) in enumerate(buffer):
+                if expiry not in expiries:
+                    expiries.append(expiry)
+                rows = len(arrays['strikePrice'])
+                entries[i] = (timestamp.astype('int64'), expiries.index(expiry), start, rows)
+                start += rows
+            # columns first and the index last, so readers never see index entries without their rows,
+            # rows a torn write left past the end of the index are cut off before appending so offsets stay those of the index
+            for column in COLUMNS:
+                with open(os.path.join(folder, column + '.bin'), 'ab') as f:
+                    f.truncate(first * np.dtype(DTYPES[column]).itemsize)
+                    for _, _, arrays, _ in buffer:
+                        arrays[column].astype(DTYPES[column]).tofile(f)
+            with open(os.path.join(folder, 'underlying.bin'), 'ab') as f:
+                f.truncate(stored * 8)
+                np.array([item[3] for item in buffer], dtype='float64').tofile(f)
+            with open(os.path.join(folder, 'expiries.json'), 'w') as f:
+                json.dump(expiries, f)
+            with open(os.path.join(folder, 'index.bin'), 'ab') as f:
+                entries.tofile(f)
+        self.buffers = {}
+        self.buffered_rows = 0
+
+    def expiries(self, symbol, day):
+        path = os.path.join(self.folder(symbol, day), 'expiries.json')
+        if not os.path.exists(path):
+            return []
+        with open(path) as f:
+            return json.load(f)
+
+    def index(self, symbol, day):
+        '''
+        returns the snapshot index of a symbol and day as a numpy structured array
+        '''
+        path = os.path.join(self.folder(symbol, day), 'index.bin')
+        if not os.path.exists(path):
+            return np.zeros(0, dtype=INDEX_DTYPE)
+        return np.fromfile(path, dtype=INDEX_DTYPE)
+
+    def rows(self, symbol, day):
+        index = self.index(symbol, day)
+        return int(index['start'][-1] + index['rows'][-1]) if len(index) else 0
+
+    def timestamps(self, symbol, day):
+        return set(self.index(symbol, day)['timestamp'].tolist())
+
+    def days(self, symbol):
+        '''
+        returns the stored days of a symbol as a sorted list of YYYY-MM-DD strings
+        '''
+        folder = os.path.join(self.root, str(symbol))
+        return sorted(os.listdir(folder)) if os.path.isdir(folder) else []
+
+    def select(self, symbol, start=None, end=None, expiry=None):
+        '''
+        yields (day, expiry dates, index entries, positions of the entries in the index) of the stored snapshots of a symbol
+        with start <= timestamp <= end, optionally only of one expiry date, day by day in stored order
+        '''
+        start = parse_timestamp(start) if start is not None else None
+        end = parse_timestamp(end) if end is not None else None
+        for day in self.days(symbol):
+            day64 = np.datetime64(day, 'D')
+            if (start is not None and day64 < start.astype('datetime64[D]')) or (end is not None and day64 > end.astype('datetime64[D]')):
+                continue
+            index = self.index(symbol, day)
+            expiries = self.expiries(symbol, day)
+            mask = np.ones(len(index), dtype=bool)
+            if start is not None:
+                mask &= index['timestamp'] >= start.astype('int64')
+            if end is not None:
+                mask &= index['timestamp'] <= end.astype('int64')
+            if expiry is not None:
+                codes = [i for i, name in enumerate(expiries) if name.lower() == str(expiry).lower()]
+                mask &= np.isin(index['expiry'], codes)
+            positions = np.flatnonzero(mask)
+            if len(positions):
+                yield day, expiries, index[positions], positions
+
+    def read(self, symbol, start=None, end=None, expiry=None, columns=None):
+        '''
+        returns stored snapshots of a symbol with start <= timestamp <= end as a pandas dataframe
+        with timestamp, expiryDate, strikePrice and the requested chain columns
+            start, end => nse timestamps, datetimes or datetime64, open ended when not given
+            expiry => only this expiry date
+            columns => chain columns to read, all of COLUMNS by default
+        only the index is read eagerly, column files are memory-mapped and sliced per matching snapshot
+        '''
+        columns = [column for column in (columns or COLUMNS) if column != 'strikePrice']
+        frames = []
+        for day, expiries, selected, _ in self.select(symbol, start, end, expiry):
+            rows = np.concatenate([np.arange(entry['start'], entry['start'] + entry['rows']) for entry in selected])
+            folder = self.folder(symbol, day)
+            data = {
+                'timestamp': np.repeat(selected['timestamp'], selected['rows']).astype('datetime64[s]'),
+                'expiryDate': np.asarray(expiries, dtype=object)[np.repeat(selected['expiry'], selected['rows'])],
+            }
+            for column in ['strikePrice'] + columns:
+                data[column] = np.memmap(os.path.join(folder, column + '.bin'), dtype=DTYPES[column], mode='r')[rows]
+            frames.append(pd.DataFrame(data))
+        if not frames:
+            return pd.DataFrame(columns=['timestamp', 'expiryDate', 'strikePrice'] + columns)
+        return pd.concat(frames, ignore_index=True)
+
+    def snapshots(self, symbol, start=None, end=None, expiry=None):
+        '''
+        returns one row per stored snapshot of a symbol with timestamp, expiryDate, underlyingValue and rows as a pandas dataframe,
+        in the order read returns their rows
+        '''
+        frames = []
+        for day, expiries, selected, positions in self.select(symbol, start, end, expiry):
+            underlying = np.fromfile(os.path.join(self.folder(symbol, day), 'underlying.bin'), dtype='float64')
+            frames.append(pd.DataFrame({
+                'timestamp': selected['timestamp'].astype('datetime64[s]'),
+                'expiryDate': np.asarray(expiries, dtype=object)[selected['expiry']],
+                'underlyingValue': underlying[positions],
+                'rows': selected['rows'],
+            }))
+        if not frames:
+            return pd.DataFrame(columns=['timestamp', 'expiryDate', 'underlyingValue', 'rows'])
+        return pd.concat(frames, ignore_index=True)
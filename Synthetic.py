@@ -0,0 +1,55 @@
+from datetime import date, timedelta
+
+import numpy as np
+
+
+def make_payload(symbol='NIFTY', strikes=200, expiries=10, underlyingValue=14000.0, step=50, timestamp='31-Dec-2020 15:30:00', seed=0):
+    '''
+    returns an nse shaped option chain json object with synthetic data
+        strikes => strikes per expiry, centred around underlyingValue
+        expiries => number of weekly expiries starting 07-Jan-2021
+        seed => seed of the random oi, volume and price data
+    '''
+    rng = np.random.default_rng(seed)
+    names = [(date(2021, 1, 7) + timedelta(days=7 * i)).strftime('%d-%b-%Y') for i in range(expiries)]
+    centre = round(underlyingValue / step) * step
+    strike_prices = [float(centre + (i - strikes // 2) * step) for i in range(strikes)]
+
+    def side(kind, strike, expiry, days):
+        intrinsic = max(underlyingValue - strike, 0) if kind == 'CE' else max(strike - underlyingValue, 0)
+        oi = int(rng.integers(0, 200000))
+        return {
+            'strikePrice': strike,
+            'expiryDate': expiry,
+            'underlying': symbol,
+            'identifier': 'OPTIDX%s%s%s%.2f' % (symbol, expiry, kind, strike),
+            'openInterest': oi,
+            'changeinOpenInterest': int(rng.integers(-5000, 5000)),
+            'pchangeinOpenInterest': float(rng.normal(0, 20)),
+            'totalTradedVolume': int(rng.integers(0, 1000000)),
+            'impliedVolatility': round(float(rng.uniform(10, 40)), 2),
+            'lastPrice': round(intrinsic + float(rng.uniform(0.05, 2)) * days, 2),
+            'change': float(rng.normal(0, 10)),
+            'pChange': float(rng.normal(0, 15)),
+            'totalBuyQuantity': int(rng.integers(0, 500000)),
+            'totalSellQuantity': int(rng.integers(0, 500000)),
+            'bidQty': int(rng.integers(0, 5000)),
+            'bidprice': 0.0,
+            'askQty': int(rng.integers(0, 5000)),
+            'askPrice': 0.0,
+            'underlyingValue': underlyingValue,
+        }
+
+    data = []
+    for i, expiry in enumerate(names):
+        for strike in strike_prices:
+            data.append({'strikePrice': strike, 'expiryDate': expiry, 'CE': side('CE', strike, expiry, 7 * (i + 1)), 'PE': side('PE', strike, expiry, 7 * (i + 1))})
+    filtered = [row for row in data if row['expiryDate'] == names[0]]
+    return {
+        'records': {'expiryDates': names, 'data': data, 'timestamp': timestamp, 'underlyingValue': underlyingValue, 'strikePrices': strike_prices},
+        'filtered': {
+            'data': filtered,
+            'CE': {'totOI': sum(row['CE']['openInterest'] for row in filtered), 'totVol': sum(row['CE']['totalTradedVolume'] for row in filtered)},
+            'PE': {'totOI': sum(row['PE']['openInterest'] for row in filtered), 'totVol': sum(row['PE']['totalTradedVolume'] for row in filtered)},
+        },
+    }
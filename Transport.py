@@ -0,0 +1,322 @@
+import os
+import json
+import math
+import time
+import random
+import secrets
+import argparse
+import threading
+from datetime import datetime, timedelta, timezone
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from requests import Response
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.cookies import RequestsCookieJar, create_cookie
+from requests.structures import CaseInsensitiveDict
+
+from Synthetic import make_payload
+
+
+INDEX_FILE = 'index.jsonl'
+# headers describing the encoded body on the wire, recorded bodies are stored decoded
+DROPPED_HEADERS = ('content-encoding', 'content-length', 'transfer-encoding', 'connection', 'set-cookie')
+
+
+class RecordingAdapter(HTTPAdapter):
+    def __init__(self, folder, **kwargs):
+        '''
+        __init__ of RecordingAdapter class, a pooled HTTPAdapter that also saves every response it receives to folder
+        mount it on an NSE session with NSE(transport=RecordingAdapter(folder)), folder can be served back by ReplayAdapter
+            kwargs => passed to HTTPAdapter, like pool_connections and pool_maxsize
+        '''
+        super().__init__(**kwargs)
+        self.folder = folder
+        self.lock = threading.Lock()
+        os.makedirs(folder, exist_ok=True)
+        self.count = sum(1 for _ in open(os.path.join(folder, INDEX_FILE))) if os.path.exists(os.path.join(folder, INDEX_FILE)) else 0
+
+    def send(self, request, **kwargs):
+        start = time.perf_counter()
+        response = super().send(request, **kwargs)
+        content = response.content
+        elapsed = time.perf_counter() - start
+        now = time.time()
+        cookies = [{'name': cookie.name, 'value': cookie.value, 'path': cookie.path, 'domain': cookie.domain,
+            'ttl': cookie.expires - now if cookie.expires else None} for cookie in response.cookies]
+        headers = {key: value for key, value in response.headers.items() if key.lower() not in DROPPED_HEADERS}
+        with self.lock:
+            body = f'{self.count:06d}.body'
+            self.count += 1
+            with open(os.path.join(self.folder, body), 'wb') as f:
+                f.write(content)
+            entry = {'key': request.path_url, 'status': response.status_code, 'reason': response.reason, 'headers': headers,
+                'cookies': cookies, 'elapsed': elapsed, 'time': now, 'body': body}
+            with open(os.path.join(self.folder, INDEX_FILE), 'a') as f:
+                f.write(json.dumps(entry) + '\n')
+        return response
+
+
+class ReplayAdapter(BaseAdapter):
+    def __init__(self, folder, speed=None):
+        '''
+        __init__ of ReplayAdapter class, serves responses recorded by RecordingAdapter without any network access
+        every request path (with its query) gets its recorded responses in order, the last one is repeated once they run out,
+        paths never recorded get a 404
+            speed => None answers at once, 1 waits the recorded response time, 10 answers ten times faster than recorded
+        cookies are replayed with the lifetime they had left when they were recorded
+        '''
+        super().__init__()
+        self.folder = folder
+        self.speed = speed
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.position = {}
+        with open(os.path.join(folder, INDEX_FILE)) as f:
+            for line in f:
+                entry = json.loads(line)
+                self.entries.setdefault(entry['key'], []).append(entry)
+        self.bodies = {}
+
+    def body(self, name):
+        if name not in self.bodies:
+            with open(os.path.join(self.folder, name), 'rb') as f:
+                self.bodies[name] = f.read()
+        return self.bodies[name]
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        key = request.path_url
+        with self.lock:
+            entries = self.entries.get(key)
+            if entries:
+                position = self.position.get(key, 0)
+                self.position[key] = position + 1
+                entry = entries[min(position, len(entries) - 1)]
+                content = self.body(entry['body'])
+        if self.speed and entries:
+            time.sleep(entry['elapsed'] / self.speed)
+
+        response = Response()
+        response.request = request
+        response.url = request.url
+        response.connection = self
+        if not entries:
+            response.status_code = 404
+            response.reason = 'Not Recorded'
+            response._content = b''
+            return response
+        response.status_code = entry['status']
+        response.reason = entry['reason']
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response._content = content
+        response.encoding = None
+        jar = RequestsCookieJar()
+        now = time.time()
+        for cookie in entry['cookies']:
+            expires = int(now + cookie['ttl']) if cookie['ttl'] is not None else None
+            jar.set_cookie(create_cookie(cookie['name'], cookie['value'], path=cookie['path'], domain=cookie['domain'], expires=expires))
+        response.cookies = jar
+        return response
+
+    def close(self):
+        pass
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        stub = self.server.stub
+        stub.enter()
+        try:
+            self.respond(stub)
+        finally:
+            stub.leave()
+
+    def respond(self, stub):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        stub.count('requests')
+        if stub.latency:
+            time.sleep(random.uniform(*stub.latency))
+        if not stub.allow():
+            stub.count('throttled')
+            return self.reply(stub.throttle_status, b'{}')
+        if url.path == '/option-chain':
+            token, expires = stub.issue_cookie()
+            cookie = f'nsit={token}; Path=/'
+            if expires:
+                cookie += f'; Expires={formatdate(expires, usegmt=True)}'
+            return self.reply(200, stub.option_chain_page(), [('Set-Cookie', cookie)], 'text/html')
+        if not stub.valid_cookie(self.headers.get('Cookie', '')):
+            stub.count('unauthorized')
+            return self.reply(401, b'{}')
+        if url.path == '/api/marketStatus':
+            return self.reply(200, stub.market_status())
+        if url.path == '/api/master-quote':
+            return self.reply(200, json.dumps(stub.equities).encode())
+        if url.path in ('/api/option-chain-indices', '/api/option-chain-equities'):
+            kind = url.path.rsplit('-', 1)[1]
+            symbol = query.get('symbol', [''])[0]
+            if symbol in (stub.indices if kind == 'indices' else stub.equities):
+                stub.count('chains')
+                return self.reply(200, stub.chain(symbol))
+            return self.reply(200, b'{}')
+        stub.count('not_found')
+        self.reply(404, b'{}')
+
+    def reply(self, status, body, headers=(), content_type='application/json'):
+        self.send_response(status)
+        for key, value in headers:
+            self.send_header(key, value)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer:
+    def __init__(self, host='127.0.0.1', port=0, indices=('NIFTY', 'BANKNIFTY'), equities=('ITC', 'SBIN'), strikes=100, expiries=3,
+            latency=None, rate=None, cookie_ttl=None, period=180, market_open=True, throttle_status=429):
+        '''
+        __init__ of StubServer class, a local stand-in for nseindia.com that synthesizes option chains, use NSE(base_url=stub.url)
+            indices, equities => symbols listed on the option chain page and master-quote and served by the option chain api
+            strikes, expiries => size of the synthetic chains
+            latency => seconds added to every response, or a (min, max) range drawn uniformly
+            rate => responses per second served before answering throttle_status, unlimited when None
+            cookie_ttl => seconds the cookies set by /option-chain stay valid, api calls without a valid cookie get 401
+            period => seconds between updates of records.timestamp and the chain data
+            market_open => NIFTY 50 status reported by /api/marketStatus
+        '''
+        self.indices = list(indices)
+        self.equities = list(equities)
+        self.strikes = strikes
+        self.expiries = expiries
+        self.latency = (latency, latency) if isinstance(latency, (int, float)) else latency
+        self.rate = rate
+        self.cookie_ttl = cookie_ttl
+        self.period = period
+        self.market_open = market_open
+        self.throttle_status = throttle_status
+        self.lock = threading.Lock()
+        self.tokens = float(rate or 0)
+        self.updated = time.monotonic()
+        self.cookies = {}
+        self.chains = {}
+        self.stats = {}
+        # requests being answered right now, the most of them at once is stats['concurrent']
+        self.active = 0
+        self.httpd = ThreadingHTTPServer((host, port), StubHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.stub = self
+        self.url = f'http://{self.httpd.server_address[0]}:{self.httpd.server_address[1]}'
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def count(self, name):
+        with self.lock:
+            self.stats[name] = self.stats.get(name, 0) + 1
+
+    def enter(self):
+        with self.lock:
+            self.active += 1
+            self.stats['concurrent'] = max(self.stats.get('concurrent', 0), self.active)
+
+    def leave(self):
+        with self.lock:
+            self.active -= 1
+
+    def allow(self):
+        '''
+        takes a token of the rate limit, returns false when the client is over the limit
+        '''
+        if not self.rate:
+            return True
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(float(self.rate), self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+    def issue_cookie(self):
+        self.count('cookies')
+        token = secrets.token_hex(8)
+        # whole seconds like the Expires header, so client and server agree on when the cookie expires
+        expires = math.ceil(time.time() + self.cookie_ttl) if self.cookie_ttl else None
+        with self.lock:
+            self.cookies[token] = expires
+        return token, expires
+
+    def valid_cookie(self, header):
+        if not self.cookie_ttl:
+            return True
+        for part in header.split(';'):
+            name, _, value = part.strip().partition('=')
+            if name == 'nsit':
+                expires = self.cookies.get(value)
+                return expires is not None and time.time() < expires
+        return False
+
+    def option_chain_page(self):
+        options = '\n'.join(f'<option value="{symbol}">{symbol}</option>' for symbol in self.indices)
+        return f'<html><body><select id="equity_optionchain_select">\n{options}\n</select></body></html>'.encode()
+
+    def market_status(self):
+        status = 'Open' if self.market_open else 'Closed'
+        return json.dumps({'marketState': [{'market': 'Capital Market', 'index': 'NIFTY 50', 'marketStatus': status}]}).encode()
+
+    def chain(self, symbol):
+        '''
+        returns the json body of the chain of symbol, regenerated once every period seconds with a new records.timestamp
+        '''
+        tick = int(time.time() // self.period)
+        with self.lock:
+            cached = self.chains.get(symbol)
+        if cached and cached[0] == tick:
+            return cached[1]
+        ist = datetime.fromtimestamp(tick * self.period, timezone(timedelta(hours=5, minutes=30)))
+        seed = (sum(map(ord, symbol)) * 1000003 + tick) % 2 ** 32
+        underlyingValue = 100.0 * (1 + sum(map(ord, symbol)) % 200)
+        body = json.dumps(make_payload(symbol, strikes=self.strikes, expiries=self.expiries, underlyingValue=underlyingValue,
+            step=max(round(underlyingValue / 200), 1), timestamp=ist.strftime('%d-%b-%Y %H:%M:%S'), seed=seed)).encode()
+        with self.lock:
+            self.chains[symbol] = (tick, body)
+        return body
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='serves synthetic nse option chains on a local port')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--latency', type=float, default=None, help='seconds added to every response')
+    parser.add_argument('--rate', type=float, default=None, help='responses per second before throttling')
+    parser.add_argument('--cookie-ttl', type=float, default=None, help='seconds cookies stay valid')
+    parser.add_argument('--strikes', type=int, default=100)
+    parser.add_argument('--expiries', type=int, default=3)
+    args = parser.parse_args()
+    stub = StubServer(port=args.port, latency=args.latency, rate=args.rate, cookie_ttl=args.cookie_ttl, strikes=args.strikes, expiries=args.expiries)
+    print('serving on', stub.url)
+    try:
+        stub.httpd.serve_forever()
+    except KeyboardInterrupt:
+        stub.httpd.server_close()
@@ -0,0 +1,46 @@
+'''
+times AlertEngine.evaluate, every rule compiled into one vectorized expression, against evaluating each rule row by row in python
+run from the repository root: python benchmarks/bench_alerts.py [symbols]
+'''
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from Alerts import Rule, AlertEngine
+
+
+def make_table(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'type': 'indices', 'symbol': [f'SYM{i}' for i in range(n)], 'expiry': '07-Jan-2021', 'timestamp': '31-Dec-2020 15:30:00',
+        'PCR_OI': rng.uniform(0, 2, n).round(1), 'PCR_Vol': rng.uniform(0, 2, n).round(1), 'distance': rng.normal(0, 3, n).round(1),
+        'BuyQ_c': rng.integers(0, 1000, n), 'SellQ_c': rng.integers(0, 1000, n), 'BuyQ_p': rng.integers(0, 1000, n),
+        'SellQ_p': rng.integers(0, 1000, n),
+    })
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    table = make_table(n)
+    rules = []
+    for i in range(10):
+        rules += [Rule(f'pcr{i}', f'PCR_OI > {1 + i / 10}'), Rule(f'far{i}', f'abs(distance) > {i}'),
+            Rule(f'sellers{i}', 'SellQ_c > BuyQ_c and SellQ_p > BuyQ_p'), Rule(f'band{i}', '0.5 < PCR_Vol <= 1.5 or not distance < 0')]
+    engine = AlertEngine(rules)
+    vectorized = min(timeit.repeat(lambda: engine.evaluate(table), number=100, repeat=3)) / 100
+
+    codes = [compile(rule.when, rule.name, 'eval') for rule in rules]
+    functions = {'abs': abs, 'min': min, 'max': max}
+
+    def row_by_row():
+        return [[bool(eval(code, functions, row)) for row in table.to_dict('records')] for code in codes]
+    assert (np.array(row_by_row()) == engine.evaluate(table)).all()
+    python = min(timeit.repeat(row_by_row, number=3, repeat=3)) / 3
+    print(f'{len(rules)} rules over {n} symbols')
+    print(f'    vectorized sweep             {vectorized * 1000:>10.3f} ms')
+    print(f'    row by row python            {python * 1000:>10.3f} ms')
@@ -0,0 +1,66 @@
+'''
+measures compression ratio, write throughput and random read latency of Archive.py on polls derived from request.json
+run from the repository root: python benchmarks/bench_archive.py [polls]
+'''
+import os
+import sys
+import json
+import time
+import zlib
+import random
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from Archive import PayloadArchive, zstandard
+
+
+def polls(count, seed=0):
+    '''
+    returns (timestamp, raw body) of count consecutive polls of request.json, half of the traded strikes change every poll
+    '''
+    with open('request.json') as f:
+        request = json.load(f)
+    rng = random.Random(seed)
+    result = []
+    for i in range(count):
+        minute = 9 * 60 + 15 + i
+        request['records']['timestamp'] = f'29-Dec-2020 {minute // 60:02d}:{minute % 60:02d}:00'
+        for data in request['records']['data']:
+            for side in ('CE', 'PE'):
+                if side in data and data[side]['totalTradedVolume'] and rng.random() < 0.5:
+                    data[side]['openInterest'] += rng.randint(-500, 500) * 75
+                    data[side]['totalTradedVolume'] += rng.randint(0, 2000) * 75
+                    data[side]['lastPrice'] = round(data[side]['lastPrice'] * rng.uniform(0.97, 1.03), 2)
+        result.append((request['records']['timestamp'], json.dumps(request).encode()))
+    return result
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 375
+    payloads = polls(count)
+    raw = sum(len(content) for _, content in payloads)
+    start = time.perf_counter()
+    plain = sum(len(zlib.compress(content, 6)) for _, content in payloads)
+    print(f'{count} polls of one symbol, {raw / 1e6:.1f} MB of json')
+    print(f'    zlib per payload             ratio {raw / plain:>6.1f}  write {(time.perf_counter() - start) / count * 1000:>6.2f} ms/poll')
+    for codec in ['zlib'] + (['zstd'] if zstandard is not None else []):
+        for interval in (25, 100, 375):
+            with tempfile.TemporaryDirectory() as root:
+                archive = PayloadArchive(root, codec=codec, keyframe_interval=interval)
+                start = time.perf_counter()
+                for _, content in payloads:
+                    archive.append('NIFTY', content)
+                write = (time.perf_counter() - start) / count
+                stats = archive.stats('2020-12-29')
+                reader = PayloadArchive(root, codec=codec)
+                latencies = []
+                for timestamp, _ in random.Random(1).sample(payloads, min(count, 200)):
+                    start = time.perf_counter()
+                    reader.read('NIFTY', timestamp)
+                    latencies.append(time.perf_counter() - start)
+                p50, p99 = np.quantile(latencies, [0.5, 0.99]) * 1000
+                print(f'    {codec} key frame every {interval:<4} ratio {stats["ratio"]:>6.1f}  write {write * 1000:>6.2f} ms/poll'
+                    f'  read p50 {p50:.2f} ms  p99 {p99:.2f} ms')
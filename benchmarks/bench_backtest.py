@@ -0,0 +1,56 @@
+'''
+times the batched backtest of Backtest.py over months of stored snapshots against analysing them one snapshot at a time
+run from the repository root: python benchmarks/bench_backtest.py [days] [polls per day]
+'''
+import os
+import sys
+import time
+import tempfile
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Chain import get_pcr
+from MaxPain import add_max_pain
+from SnapshotStore import SnapshotStore
+from Backtest import backtest, signal_stats
+from Synthetic import make_payload
+
+
+SYMBOLS = ('NIFTY', 'BANKNIFTY')
+
+
+if __name__ == '__main__':
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    polls = int(sys.argv[2]) if len(sys.argv) > 2 else 25
+    with tempfile.TemporaryDirectory() as root:
+        start = time.perf_counter()
+        with SnapshotStore(root) as store:
+            for symbol in SYMBOLS:
+                payload = make_payload(symbol, strikes=100, expiries=4)
+                for day in range(days):
+                    stamp = (date(2021, 1, 4) + timedelta(days=day)).strftime('%d-%b-%Y')
+                    for poll in range(polls):
+                        minute = 9 * 60 + 15 + poll * 375 // polls
+                        payload['records']['timestamp'] = f'{stamp} {minute // 60:02d}:{minute % 60:02d}:00'
+                        payload['records']['underlyingValue'] = 14000.0 + (day * polls + poll) % 400
+                        store.append(symbol, payload)
+        snapshots = sum(len(store.snapshots(symbol)) for symbol in SYMBOLS)
+        print(f'{len(SYMBOLS)} symbols x {days} days x {polls} polls x 4 expiries x 100 strikes, {snapshots} snapshots stored in {time.perf_counter() - start:.1f} s')
+
+        start = time.perf_counter()
+        results = backtest(store, SYMBOLS, settlements={symbol: {name: 14200.0 for name in payload['records']['expiryDates']} for symbol in SYMBOLS})
+        signal_stats(results)
+        batch = time.perf_counter() - start
+        print(f'    backtest + signal_stats      {batch * 1000:>10.1f} ms  {snapshots / batch:>10.0f} snapshots/s')
+
+        rows = store.read('NIFTY', end=f'{date(2021, 1, 4).strftime("%d-%b-%Y")} 23:59:59')
+        start = time.perf_counter()
+        count = 0
+        for _, snapshot in rows.groupby(['timestamp', 'expiryDate'], sort=False):
+            df = snapshot.reset_index(drop=True)
+            add_max_pain(df)
+            get_pcr(df)
+            count += 1
+        single = (time.perf_counter() - start) / count
+        print(f'    one snapshot at a time       {single * snapshots * 1000:>10.1f} ms  {1 / single:>10.0f} snapshots/s (estimated)')
@@ -0,0 +1,40 @@
+'''
+compares decoding a raw option chain response with the json module against the fast decoding path of Decode.py
+run from the repository root: python benchmarks/bench_decode.py
+'''
+import os
+import sys
+import json
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Chain import ExpiryIndex
+from Decode import loads, decode_chain, orjson
+from Synthetic import make_payload
+
+
+def best(func, number=5, repeat=5):
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number * 1000
+
+
+def run(name, content):
+    nearest = json.loads(content)['filtered']['data'][0]['expiryDate']
+    rows = [
+        ('json.loads', lambda: json.loads(content)),
+        ('json.loads + ExpiryIndex', lambda: ExpiryIndex(json.loads(content))),
+        ('loads', lambda: loads(content)),
+        ('decode_chain', lambda: decode_chain(content)),
+        ('decode_chain nearest expiry', lambda: decode_chain(content, nearest)),
+    ]
+    print(f'{name}: {len(content) / 1024:.0f} KB')
+    for label, func in rows:
+        print(f'    {label:<30}{best(func):>10.2f} ms')
+
+
+if __name__ == '__main__':
+    print('orjson', 'available' if orjson is not None else 'not installed, using json')
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with open(os.path.join(root, 'request.json'), 'rb') as f:
+        run('request.json', f.read())
+    run('synthetic NIFTY 200 strikes x 15 expiries', json.dumps(make_payload(strikes=200, expiries=15)).encode())
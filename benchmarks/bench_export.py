@@ -0,0 +1,60 @@
+'''
+exports growing sweeps of the stub nse to csv and reports rows, time and peak traced memory, which stays flat as symbols grow
+because frames are streamed to the file in chunks, against building one dataframe of the whole sweep before writing it
+run from the repository root: python benchmarks/bench_export.py [max symbols]
+'''
+import os
+import sys
+import time
+import socket
+import tempfile
+import subprocess
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from Export import Exporter
+from OptionChain import NSE
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# the stub runs in its own process so its chains are not traced with the export
+STUB = '''
+from Transport import StubServer
+StubServer(port={port}, equities={equities!r}, strikes=100, expiries=3).httpd.serve_forever()
+'''
+
+
+if __name__ == '__main__':
+    most = int(sys.argv[1]) if len(sys.argv) > 1 else 80
+    equities = [f'STOCK{i}' for i in range(most)]
+    print(f'{"symbols":>8} {"rows":>8} {"seconds":>8} {"streamed MB":>12} {"in memory MB":>13}')
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    stub = subprocess.Popen([sys.executable, '-c', STUB.format(port=port, equities=equities)], cwd=ROOT)
+    for _ in range(100):
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            break
+        except OSError:
+            time.sleep(0.1)
+    with NSE(base_url=f'http://127.0.0.1:{port}') as nse, tempfile.TemporaryDirectory() as folder:
+        exporter = Exporter(nse, rate=1000, chunk_rows=2000)
+        count = 10
+        while count <= most:
+            targets = [('equities', symbol) for symbol in equities[:count]]
+            path = os.path.join(folder, 'chains.csv')
+            tracemalloc.start()
+            start = time.perf_counter()
+            rows = exporter.export(targets, path)[path]
+            elapsed = time.perf_counter() - start
+            streamed = tracemalloc.get_traced_memory()[1]
+            tracemalloc.reset_peak()
+            pd.concat(list(exporter.frames(targets)), ignore_index=True).to_csv(path, index=False)
+            whole = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f'{count:>8} {rows:>8} {elapsed:>8.2f} {streamed / 2 ** 20:>12.1f} {whole / 2 ** 20:>13.1f}')
+            count *= 2
+    stub.terminate()
@@ -0,0 +1,66 @@
+'''
+times the batched implied volatility and greeks solve of Greeks.py against a per row scalar loop
+run from the repository root: python benchmarks/bench_greeks.py [underlyings]
+'''
+import os
+import sys
+import math
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from Chain import ExpiryIndex
+from Greeks import greeks_surface, time_to_expiry, RATE
+from Synthetic import make_payload
+
+
+def scalar_iv(price, spot, strike, t, call, rate=RATE):
+    '''
+    per option newton solve with math functions, the row by row approach the batch replaces
+    '''
+    if price <= 0:
+        return math.nan
+    vol = 0.3
+    for _ in range(100):
+        sqrt_t = math.sqrt(t)
+        d1 = (math.log(spot / strike) + (rate + vol * vol / 2) * t) / (vol * sqrt_t)
+        d2 = d1 - vol * sqrt_t
+        cdf1, cdf2 = 0.5 * math.erfc(-d1 / math.sqrt(2)), 0.5 * math.erfc(-d2 / math.sqrt(2))
+        value = spot * cdf1 - strike * math.exp(-rate * t) * cdf2
+        if not call:
+            value += strike * math.exp(-rate * t) - spot
+        vega = spot * math.exp(-d1 * d1 / 2) / math.sqrt(2 * math.pi) * sqrt_t
+        if abs(value - price) < 1e-8 * max(price, 1) or vega < 1e-12:
+            break
+        vol = min(max(vol - (value - price) / vega, 1e-4), 5.0)
+    return vol
+
+
+if __name__ == '__main__':
+    underlyings = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    start = time.perf_counter()
+    indexes = {f'SYM{i}': ExpiryIndex(make_payload(f'SYM{i}', strikes=100, expiries=3, underlyingValue=1000.0 + 10 * i, step=10, seed=i))
+        for i in range(underlyings)}
+    print(f'{underlyings} underlyings x 100 strikes x 3 expiries, built in {time.perf_counter() - start:.1f} s')
+
+    start = time.perf_counter()
+    surface = greeks_surface(indexes)
+    batch = time.perf_counter() - start
+    options = 2 * len(surface)
+    print(f'    greeks_surface            {batch * 1000:>10.1f} ms  {options / batch / 1e6:.2f} M options/s')
+
+    index = next(iter(indexes.values()))
+    start = time.perf_counter()
+    count = 0
+    for expiry in index.expiry_dates():
+        arrays, _ = index.arrays(expiry)
+        t = time_to_expiry(expiry, index.timestamp)
+        for side, call in (('_c', True), ('_p', False)):
+            for price, strike in zip(arrays['LTP' + side].tolist(), arrays['strikePrice'].tolist()):
+                scalar_iv(price, index.underlyingValue, strike, t, call)
+                count += 1
+    scalar = (time.perf_counter() - start) / count
+    print(f'    scalar loop (estimated)   {scalar * options * 1000:>10.1f} ms  {1 / scalar / 1e6:.2f} M options/s')
+    print(f'    solved {np.isfinite(surface.filter(like="IVs").values).mean() * 100:.1f}% of options')
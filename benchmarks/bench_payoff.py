@@ -0,0 +1,45 @@
+'''
+times the broadcast strategy evaluator of Payoff.py against pricing every combination leg by leg in python
+run from the repository root: python benchmarks/bench_payoff.py [width]
+'''
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from Chain import ExpiryIndex
+from Payoff import STRATEGIES, evaluate, rank
+from Synthetic import make_payload
+
+
+if __name__ == '__main__':
+    width = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    index = ExpiryIndex(make_payload(strikes=200, expiries=1))
+    df, _ = index.frame()
+    evaluate(df, index.underlyingValue, width=width)
+    start = time.perf_counter()
+    results = evaluate(df, index.underlyingValue, width=width)
+    rank(results)
+    batch = time.perf_counter() - start
+    print(f'{len(results)} combinations of {len(STRATEGIES)} strategies over {2 * width + 1} strikes')
+    print(f'    evaluate + rank              {batch * 1000:>10.1f} ms')
+
+    strikes = df.set_index('strikePrice')
+    prices = np.unique(np.concatenate(([0.0], df['strikePrice'].values, [2 * df['strikePrice'].max()])))
+    sample = results.sample(200, random_state=0)
+    start = time.perf_counter()
+    for _, row in sample.iterrows():
+        pnl = []
+        for price in prices:
+            total = 0.0
+            for side, quantity, slot in STRATEGIES[row['strategy']]:
+                strike = row[f'K{slot + 1}']
+                ltp = strikes.at[strike, 'LTP_c' if side == 'c' else 'LTP_p']
+                total += quantity * ((max(price - strike, 0) if side == 'c' else max(strike - price, 0)) - ltp)
+            pnl.append(total)
+        min(pnl), max(pnl)
+    loop = (time.perf_counter() - start) / len(sample) * len(results)
+    print(f'    leg by leg loop (estimated)  {loop * 1000:>10.1f} ms')
@@ -0,0 +1,50 @@
+'''
+compares rendering an option chain with the pandas Styler chain against Render.py
+run from the repository root: python benchmarks/bench_render.py
+'''
+import os
+import sys
+import json
+import timeit
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from OptionChain import NSE
+from Synthetic import make_payload
+
+
+def best(func, number=5, repeat=5):
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number * 1000
+
+
+def run(name, request, no_tables=1):
+    nse = NSE()
+    nse.fetch_nse_data = lambda type='indices', symbol='NIFTY': request
+    nse.get_oc_data()
+    expiry = nse.index.nearest
+    df = nse.df
+
+    def render(method):
+        def func():
+            for _ in range(no_tables):
+                nse.df = df
+                method('NIFTY', expiry)
+        return func
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        styler = best(render(nse.render_styler), number=1)
+    fast = best(render(nse.render_output))
+    print(f'{name} x {no_tables}')
+    print(f'    {"Styler":<12}{styler:>10.2f} ms')
+    print(f'    {"Render.py":<12}{fast:>10.2f} ms    {styler / fast:.0f}x')
+
+
+if __name__ == '__main__':
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with open(os.path.join(root, 'request.json')) as f:
+        request = json.load(f)
+    run('request.json', request)
+    run('synthetic NIFTY 200 strikes', make_payload(strikes=200, expiries=1))
+    run('synthetic NIFTY 200 strikes', make_payload(strikes=200, expiries=1), no_tables=100)
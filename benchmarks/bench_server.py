@@ -0,0 +1,48 @@
+'''
+times the requests of the api server of Server.py against the stub nse, the first request fetches and builds, later ones are
+served from the response cache, and compares the sizes of the plain and gzip encoded chain
+run from the repository root: python benchmarks/bench_server.py [requests]
+'''
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+from OptionChain import NSE
+from Metrics import Metrics
+from Server import ChainService, ChainServer
+from Transport import StubServer
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    with StubServer(strikes=200) as stub, NSE(base_url=stub.url, metrics=Metrics()) as nse, \
+            ChainServer(ChainService(nse, refresh=600), port=0) as server:
+        url = f'{server.url}/api/chain?symbol=NIFTY'
+        session = requests.Session()
+        start = time.perf_counter()
+        first = session.get(url)
+        cold = time.perf_counter() - start
+        response = server.service.response('chain', 'indices', 'NIFTY')
+        print(f'chain json {len(response.body)} bytes, gzip {len(response.gzipped)} bytes ({len(response.body) / len(response.gzipped):.1f}x)')
+        print(f'    first request (fetch + build)  {cold * 1000:>10.1f} ms')
+        for name, headers in (('cached 200', {}), ('revalidated 304', {'If-None-Match': first.headers['ETag']})):
+            start = time.perf_counter()
+            for _ in range(count):
+                session.get(url, headers=headers)
+            print(f'    {name:<30} {(time.perf_counter() - start) / count * 1000:>10.2f} ms')
+
+        def get(_):
+            with requests.Session() as client:
+                for _ in range(count // 8):
+                    client.get(url)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(get, range(8)))
+        elapsed = time.perf_counter() - start
+        print(f'    8 clients                      {count // 8 * 8 / elapsed:>10.0f} requests/s')
+        print(f'nse option chain requests: {stub.stats["chains"]}')
@@ -0,0 +1,45 @@
+'''
+measures import time, time to the first metrics and peak RSS of a fresh process for the lean metrics path of Lite.py
+(stdlib only and with numpy) against the dataframe path of OptionChain.py, all computing the metrics of request.json
+run from the repository root: python benchmarks/bench_startup.py [runs]
+'''
+import os
+import sys
+import json
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# every child prints (import seconds, total seconds, peak rss in KB) as json
+CHILD = '''
+import time
+start = time.perf_counter()
+{imports}
+imported = time.perf_counter()
+with open('request.json', 'rb') as f:
+    request = loads(f.read())
+{compute}
+import json, resource
+print(json.dumps([imported - start, time.perf_counter() - start, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss]))
+'''
+PATHS = {
+    'Lite, stdlib only': ('from Lite import chain_metrics\nfrom Decode import loads', 'chain_metrics(request, use_numpy=False)'),
+    'Lite, numpy': ('from Lite import chain_metrics\nfrom Decode import loads', 'chain_metrics(request, use_numpy=True)'),
+    'NSE.get_metrics path': ('from OptionChain import NSE\nfrom Lite import chain_metrics\nfrom Decode import loads',
+        'chain_metrics(request, use_numpy=False)'),
+    'ExpiryIndex dataframes': ('from OptionChain import NSE\nfrom Chain import ExpiryIndex\nfrom Decode import loads',
+        'ExpiryIndex(request).all_metrics()'),
+}
+
+
+if __name__ == '__main__':
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f'{"path":<24} {"import ms":>10} {"total ms":>10} {"peak RSS MB":>12}')
+    for name, (imports, compute) in PATHS.items():
+        results = []
+        for _ in range(runs):
+            output = subprocess.run([sys.executable, '-c', CHILD.format(imports=imports, compute=compute)], cwd=ROOT,
+                capture_output=True, text=True, check=True).stdout
+            results.append(json.loads(output))
+        imported, total, rss = (sorted(values)[len(values) // 2] for values in zip(*results))
+        print(f'{name:<24} {imported * 1000:>10.1f} {total * 1000:>10.1f} {rss / 1024:>12.1f}')
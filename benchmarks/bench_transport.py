@@ -0,0 +1,32 @@
+'''
+measures how many option chains per second the client gets through against the local stand-in server of Transport.py
+run from the repository root: python benchmarks/bench_transport.py [latency seconds]
+'''
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from OptionChain import NSE
+from Scanner import Scanner
+from Transport import StubServer
+
+
+if __name__ == '__main__':
+    latency = float(sys.argv[1]) if len(sys.argv) > 1 else 0.05
+    symbols = [f'SYM{i}' for i in range(64)]
+    with StubServer(indices=symbols, strikes=200, expiries=5, latency=latency, cookie_ttl=3600) as stub:
+        for symbol in symbols:
+            stub.chain(symbol)
+        print(f'{len(symbols)} symbols, 200 strikes x 5 expiries, {latency * 1000:.0f} ms latency')
+        for workers in (1, 4, 8, 16, 32):
+            scanner = Scanner(NSE(base_url=stub.url, pool_size=workers), max_workers=workers, rate=10000)
+            scanner.scan([('indices', symbols[0])])
+            start = time.perf_counter()
+            table = scanner.scan([('indices', symbol) for symbol in symbols])
+            elapsed = time.perf_counter() - start
+            stats = scanner.nse.connection_stats()
+            print(f'    {workers:>3} workers {len(symbols) / elapsed:>8.1f} chains/s  errors {table["error"].notna().sum()}  '
+                f'connections {stats["new_connections"]}')
+            scanner.nse.close()
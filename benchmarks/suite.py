@@ -0,0 +1,159 @@
+'''
+offline benchmark suite of the fetch-less option chain pipeline, every stage is timed separately on request.json and on
+synthetic nse payloads from a few hundred to 12k strikes
+run from the repository root:
+    python benchmarks/suite.py                  times every stage and compares it with benchmarks/baseline.json
+    python benchmarks/suite.py --save           stores the results as the new baseline
+    python benchmarks/suite.py --check          exits with status 1 when a stage is slower than threshold x baseline
+'''
+import os
+import sys
+import json
+import time
+import timeit
+import argparse
+import platform
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+import pandas as pd
+
+from OptionChain import NSE
+from Chain import ExpiryIndex, COLUMNS, align_sides, get_pcr
+from Indicator import get_indicator
+from Decode import loads
+from MaxPain import add_max_pain
+from Render import render_chain
+from Synthetic import make_payload
+
+
+BASELINE = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+# name => make_payload arguments, strikes x expiries rows per payload
+SYNTHETIC = {
+    'synthetic 100x3': dict(strikes=100, expiries=3),
+    'synthetic 200x10': dict(strikes=200, expiries=10),
+    'synthetic 1000x12': dict(strikes=1000, expiries=12),
+}
+STAGES = ['decode', 'index', 'frame', 'maxpain', 'pcr', 'render', 'get_oc_data']
+
+
+def best(func, min_time=0.2, repeat=5):
+    '''
+    returns the best time of func in ms, every repeat calls func often enough to run for about min_time / repeat seconds
+    '''
+    start = time.perf_counter()
+    func()
+    once = time.perf_counter() - start
+    number = max(1, int(min_time / repeat / max(once, 1e-9)))
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number * 1000
+
+
+def fixtures(quick=False):
+    '''
+    returns dict of fixture name => raw response bytes
+    '''
+    with open(os.path.join(ROOT, 'request.json'), 'rb') as f:
+        items = {'request.json': f.read()}
+    for name, kwargs in SYNTHETIC.items():
+        if quick and kwargs['strikes'] * kwargs['expiries'] > 2000:
+            continue
+        items[name] = json.dumps(make_payload(**kwargs)).encode()
+    return items
+
+
+def stages(content):
+    '''
+    returns dict of stage => function running that stage alone on content, the input of every stage is prepared up front
+    frame, maxpain and pcr cover every expiry of the payload, render covers the table of the nearest expiry
+    '''
+    request = loads(content)
+    index = ExpiryIndex(request)
+    frames = [pd.DataFrame(align_sides(*sides), columns=COLUMNS) for sides in index.sides.values()]
+    for df in frames:
+        add_max_pain(df)
+    df, expiry = index.frame()
+    metrics = index.metrics()
+    indicator = get_indicator(index.underlyingValue, metrics['maxpain'])
+
+    nse = NSE()
+    nse.fetch_nse_data = lambda type='indices', symbol='NIFTY': request
+
+    return {
+        'decode': lambda: loads(content),
+        'index': lambda: ExpiryIndex(request),
+        'frame': lambda: [pd.DataFrame(align_sides(*sides), columns=COLUMNS) for sides in index.sides.values()],
+        'maxpain': lambda: [add_max_pain(frame) for frame in frames],
+        'pcr': lambda: [get_pcr(frame) for frame in frames],
+        'render': lambda: render_chain(df, 'NIFTY', expiry, index.underlyingValue, metrics['maxpain'], metrics['pcr_oi'],
+            metrics['pcr_vol'], index.timestamp, indicator),
+        'get_oc_data': lambda: nse.get_oc_data(),
+    }
+
+
+def run(quick=False):
+    '''
+    times every stage on every fixture and returns dict of fixture => {'strikes': rows, 'bytes': size, 'ms': {stage => ms}}
+    '''
+    results = {}
+    for name, content in fixtures(quick).items():
+        funcs = stages(content)
+        rows = sum(len(np.union1d(sides[0], sides[2])) for sides in ExpiryIndex(loads(content)).sides.values())
+        results[name] = {'strikes': rows, 'bytes': len(content), 'ms': {stage: round(best(funcs[stage]), 4) for stage in STAGES}}
+    return results
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ''
+    return {'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__,
+        'machine': platform.machine(), 'commit': commit}
+
+
+def compare(results, baseline, threshold):
+    '''
+    prints every stage next to its baseline and returns the list of (fixture, stage, ratio) slower than threshold x baseline
+    '''
+    regressions = []
+    for name, result in results.items():
+        print(f'{name}: {result["strikes"]} strikes, {result["bytes"] / 1024:.0f} KB')
+        for stage, ms in result['ms'].items():
+            before = baseline.get(name, {}).get('ms', {}).get(stage)
+            line = f'    {stage:<14}{ms:>10.3f} ms'
+            if before:
+                ratio = ms / before
+                line += f'    baseline {before:>10.3f} ms  {ratio:>5.2f}x'
+                if ratio > threshold:
+                    line += '  REGRESSION'
+                    regressions.append((name, stage, ratio))
+            print(line)
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='times the stages of the option chain pipeline without network access')
+    parser.add_argument('--baseline', default=BASELINE, help='baseline json to compare with or to save to')
+    parser.add_argument('--save', action='store_true', help='store the results as the baseline')
+    parser.add_argument('--check', action='store_true', help='exit with status 1 on a regression')
+    parser.add_argument('--threshold', type=float, default=1.5, help='slowdown against the baseline reported as a regression')
+    parser.add_argument('--quick', action='store_true', help='skip fixtures above 2000 strikes')
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    results = run(args.quick)
+    if baseline:
+        print('baseline', ' '.join(f'{key}={value}' for key, value in baseline.get('environment', {}).items()))
+    regressions = compare(results, baseline.get('results', {}), args.threshold)
+    if args.save:
+        with open(args.baseline, 'w') as f:
+            json.dump({'environment': environment(), 'results': results}, f, indent=2)
+        print('saved', args.baseline)
+    if args.check and regressions:
+        sys.exit(1)
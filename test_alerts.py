@@ -0,0 +1,126 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from OptionChain import NSE
+from Alerts import Rule, AlertEngine, FileSink, WebhookSink, load_rules
+from Scanner import Scanner
+from Transport import StubServer
+
+
+def make_table(n=6, seed=0, timestamp='31-Dec-2020 15:30:00'):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'type': 'indices', 'symbol': [f'SYM{i}' for i in range(n)], 'expiry': '07-Jan-2021', 'timestamp': timestamp,
+        'PCR_OI': rng.uniform(0, 2, n).round(1), 'PCR_Vol': rng.uniform(0, 2, n).round(1), 'distance': rng.normal(0, 3, n).round(1),
+        'BuyQ_c': rng.integers(0, 1000, n), 'SellQ_c': rng.integers(0, 1000, n), 'BuyQ_p': rng.integers(0, 1000, n),
+        'SellQ_p': rng.integers(0, 1000, n),
+    })
+
+
+class Sink:
+    def __init__(self):
+        self.alerts = []
+
+    def send(self, alerts):
+        self.alerts += alerts
+
+
+def test_rules_are_vectorized():
+    table = make_table(200)
+    rules = {
+        'Pcr': ('PCR_OI > 1.5', table['PCR_OI'] > 1.5),
+        'far': ('abs(distance) > 2 and not PCR_Vol < 1', (table['distance'].abs() > 2) & ~(table['PCR_Vol'] < 1)),
+        'sellers': ('SellQ_c > BuyQ_c or SellQ_p > BuyQ_p', (table['SellQ_c'] > table['BuyQ_c']) | (table['SellQ_p'] > table['BuyQ_p'])),
+        'band': ('0.5 < PCR_OI <= 1.2', (table['PCR_OI'] > 0.5) & (table['PCR_OI'] <= 1.2)),
+        'symbol': ("symbol == 'SYM3' and max(BuyQ_c, BuyQ_p) / 2 >= 0", table['symbol'] == 'SYM3'),
+    }
+    engine = AlertEngine([Rule(name, when) for name, (when, _) in rules.items()])
+    masks = engine.evaluate(table)
+    for i, (_, expected) in enumerate(rules.values()):
+        np.testing.assert_array_equal(masks[i], expected.values)
+
+    for when in ["__import__('os')", 'table.columns', 'PCR_OI.real > 1', '[x for x in PCR_OI]', 'abs(PCR_OI, key=1)', 'PCR_OI >']:
+        with pytest.raises(ValueError):
+            Rule('bad', when)
+    with pytest.raises(ValueError):
+        AlertEngine([Rule('a', 'PCR_OI > 1'), Rule('a', 'PCR_OI > 2')])
+    with pytest.raises(ValueError, match='missing'):
+        AlertEngine([Rule('oi', 'OI_c > 1')]).evaluate(table)
+
+
+def test_errored_rows_never_match():
+    table = make_table(3)
+    table['PCR_OI'] = pd.Series([None, 1.8, None], dtype=object)
+    assert AlertEngine([Rule('pcr', 'PCR_OI > 1.5')]).evaluate(table).tolist() == [[False, True, False]]
+
+
+def test_dedup_and_cooldown(tmp_path):
+    sink = Sink()
+    engine = AlertEngine([Rule('pcr', 'PCR_OI >= 0', message='{symbol} PCR_OI {PCR_OI:.1f}'), Rule('fast', 'PCR_OI >= 0', cooldown=0)],
+        sinks=[sink, FileSink(str(tmp_path / 'alerts.jsonl'))], cooldown=60)
+    table = make_table(3)
+    assert len(engine.sweep(table, now=0)) == 6
+    assert sink.alerts[0].message == f'SYM0 PCR_OI {table["PCR_OI"][0]:.1f}'
+    # the same data twice only alerts once, whatever the cooldown
+    assert engine.sweep(table, now=100) == []
+    newer = make_table(3, timestamp='31-Dec-2020 15:31:00')
+    assert [alert.rule for alert in engine.sweep(newer, now=50)] == ['fast'] * 3
+    assert len(engine.sweep(make_table(3, timestamp='31-Dec-2020 15:32:00'), now=170)) == 6
+    assert engine.stats() == {'rules': 2, 'fired': 15, 'suppressed': 9}
+    lines = (tmp_path / 'alerts.jsonl').read_text().splitlines()
+    assert len(lines) == 15 and json.loads(lines[0])['symbol'] == 'SYM0'
+
+
+def test_rules_file_and_webhook(tmp_path):
+    received = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            received.append(json.loads(self.rfile.read(int(self.headers['Content-Length']))))
+            self.send_response(500 if len(received) > 1 else 200)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    path = tmp_path / 'rules.json'
+    path.write_text(json.dumps([{'name': 'sellers', 'when': 'SellQ_c > BuyQ_c', 'cooldown': 0}]))
+    sink = Sink()
+    engine = AlertEngine(load_rules(str(path)), sinks=[WebhookSink(f'http://127.0.0.1:{httpd.server_address[1]}/hook'), sink])
+    table = make_table(20)
+    alerts = engine.sweep(table, now=0)
+    assert [alert['symbol'] for alert in received[0]['alerts']] == [alert.symbol for alert in alerts]
+    assert len(alerts) == (table['SellQ_c'] > table['BuyQ_c']).sum()
+    # a failing sink does not stop the others
+    engine.sweep(make_table(20, timestamp='31-Dec-2020 15:31:00'), now=1)
+    assert len(received) == 2 and len(sink.alerts) == 2 * len(alerts)
+    httpd.shutdown()
+
+
+def test_scanner_sweeps_every_scan():
+    sink = Sink()
+    with StubServer(indices=['NIFTY', 'BANKNIFTY'], strikes=20, expiries=2) as stub:
+        scanner = Scanner(NSE(base_url=stub.url), rate=100, alerts=AlertEngine([Rule('pcr', 'PCR_OI > 0')], sinks=[sink]))
+        table = scanner.scan([('indices', 'NIFTY'), ('indices', 'BANKNIFTY'), ('indices', 'MISSING')])
+    assert table['error'][2] is not None and table['BuyQ_c'][:2].gt(0).all()
+    assert sorted(alert.symbol for alert in sink.alerts) == ['BANKNIFTY', 'NIFTY']
+
+
+def test_sent_alerts_are_pruned_after_the_largest_cooldown():
+    engine = AlertEngine([Rule('pcr', 'PCR_OI >= 0', cooldown=30), Rule('vol', 'PCR_Vol >= 0')], cooldown=60)
+    table, quiet = make_table(3), make_table(3).assign(PCR_OI=-1.0, PCR_Vol=-1.0)
+    assert len(engine.sweep(table, now=0)) == 6
+    engine.sweep(quiet, now=59)
+    assert len(engine.sent) == 6
+    # rows that still match keep their entry, so an unchanged records.timestamp stays suppressed
+    assert engine.sweep(table, now=100) == [] and len(engine.sent) == 6
+    engine.sweep(quiet, now=160)
+    assert engine.sent == {}
@@ -0,0 +1,63 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+from OptionChain import NSE
+from Transport import StubServer
+
+
+with open('request.json') as f:
+    REQUEST = json.load(f)
+
+
+@pytest.fixture(scope='module')
+def stub():
+    with StubServer(indices=[f'SYM{i}' for i in range(12)], strikes=60, expiries=3, latency=0.01, period=10 ** 6) as stub:
+        yield stub
+
+
+def test_analyse_matches_get_oc_data(monkeypatch):
+    monkeypatch.setattr(NSE, 'fetch_nse_data', lambda self, type='indices', symbol='NIFTY': REQUEST)
+    nse = NSE()
+    result = nse.analyse(type='equities', symbol='ITC', expiry='28-jan-2021', greeks=True)
+    assert nse.df is None and nse.request is None
+    with pytest.raises(AttributeError):
+        result.maxpain = 0
+    nse.get_oc_data(type='equities', symbol='ITC', expiry='28-jan-2021', greeks=True)
+    assert result.expiry == '28-Jan-2021'
+    assert (result.maxpain, result.pcr_oi, result.pcr_vol) == (nse.maxpain, nse.pcr_oi, nse.pcr_vol)
+    assert result.timestamp == nse.timestamp and result.underlyingValue == nse.underlyingValue
+    pd.testing.assert_frame_equal(result.df, nse.df)
+    assert result.df is not nse.df
+
+    monkeypatch.setattr(NSE, 'fetch_nse_data', lambda self, type='indices', symbol='NIFTY': {})
+    with pytest.raises(ValueError):
+        nse.analyse(type='equities', symbol='ITC')
+
+
+def test_concurrent_callers_share_one_instance(stub):
+    symbols = [f'SYM{i}' for i in range(12)]
+    nse = NSE(base_url=stub.url, pool_size=8)
+    expected = {}
+    for symbol in symbols:
+        for expiry in (None, '14-Jan-2021'):
+            expected[symbol, expiry] = nse.analyse(symbol=symbol, expiry=expiry)
+
+    targets = [(symbol, expiry) for symbol in symbols for expiry in (None, '14-Jan-2021')] * 4
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda target: (target, nse.analyse(symbol=target[0], expiry=target[1])), targets))
+        pages = list(executor.map(lambda target: (target, nse.render(symbol=target[0], expiry=target[1])), targets))
+
+    for (symbol, expiry), result in results:
+        reference = expected[symbol, expiry]
+        assert result.symbol == symbol and result.expiry == reference.expiry
+        assert result.maxpain == reference.maxpain and result.pcr_oi == reference.pcr_oi
+        pd.testing.assert_frame_equal(result.df, reference.df)
+    for (symbol, expiry), (result, window, html) in pages:
+        assert result.symbol == symbol
+        assert f'>{symbol}<br />Expiry - {result.expiry}<' in html
+        assert len(window) <= 30
+    assert nse.cache.stats()['size'] == len(symbols) * 2
+    assert nse.request is None and nse.df is None
@@ -0,0 +1,130 @@
+import json
+import copy
+import random
+import zlib
+
+import pandas as pd
+import pytest
+
+from OptionChain import NSE
+from Metrics import Metrics
+from Archive import PayloadArchive
+from Poller import ReplayNSE
+from Transport import StubServer
+
+
+with open('request.json', 'rb') as f:
+    CONTENT = f.read()
+REQUEST = json.loads(CONTENT)
+
+
+def polls(count, seed=0):
+    '''
+    yields (timestamp, raw body) of count consecutive polls of request.json, half of the traded strikes change every poll
+    '''
+    rng = random.Random(seed)
+    request = copy.deepcopy(REQUEST)
+    for i in range(count):
+        request['records']['timestamp'] = f'29-Dec-2020 {9 + (15 + i) // 60:02d}:{(15 + i) % 60:02d}:00'
+        for data in request['records']['data']:
+            for side in ('CE', 'PE'):
+                if side in data and data[side]['totalTradedVolume'] and rng.random() < 0.5:
+                    data[side]['openInterest'] += rng.randint(-500, 500) * 75
+                    data[side]['totalTradedVolume'] += rng.randint(0, 2000) * 75
+                    data[side]['lastPrice'] = round(data[side]['lastPrice'] * rng.uniform(0.97, 1.03), 2)
+        yield request['records']['timestamp'], json.dumps(request).encode()
+
+
+def test_round_trip_and_random_access(tmp_path):
+    archive = PayloadArchive(str(tmp_path), codec='zlib', keyframe_interval=10)
+    payloads = dict(polls(25))
+    for timestamp, content in payloads.items():
+        assert archive.append('ITC', content)
+    assert not archive.append('ITC', payloads['29-Dec-2020 09:15:00'])
+    assert not archive.append('ITC', b'{}')
+    assert archive.days() == ['2020-12-29']
+    index = archive.index('2020-12-29')
+    assert len(index) == 25 and sorted(set(index['key'].tolist())) == [0, 10, 20]
+
+    # a fresh archive has no cached key frames, every payload is found through the index alone
+    reader = PayloadArchive(str(tmp_path))
+    for timestamp in random.Random(1).sample(list(payloads), len(payloads)):
+        assert reader.read('ITC', timestamp) == payloads[timestamp]
+    assert len(reader.timestamps('ITC', '2020-12-29')) == 25
+    assert [request['records']['timestamp'] for request in reader.replay('ITC', '2020-12-29')] == list(payloads)
+    with pytest.raises(KeyError):
+        reader.read('ITC', '29-Dec-2020 15:30:00')
+    with pytest.raises(KeyError):
+        reader.read('SBIN', '29-Dec-2020 09:15:00')
+
+    stats = archive.stats('2020-12-29')
+    plain = sum(len(zlib.compress(content, 6)) for content in payloads.values())
+    assert stats['size'] == sum(map(len, payloads.values()))
+    # compressing against the key frame beats compressing every payload on its own by far
+    assert stats['archived'] * 2 < plain
+
+
+def test_codec_of_a_day_is_kept(tmp_path):
+    zstandard = pytest.importorskip('zstandard')
+    archive = PayloadArchive(str(tmp_path), codec='zstd')
+    payloads = dict(polls(5))
+    for content in payloads.values():
+        archive.append('ITC', content)
+    assert all(PayloadArchive(str(tmp_path), codec='zlib').read('ITC', timestamp) == content for timestamp, content in payloads.items())
+    with pytest.raises(ValueError):
+        PayloadArchive(str(tmp_path), codec='zlib').append('ITC', json.dumps(dict(REQUEST, records=dict(REQUEST['records'],
+            timestamp='29-Dec-2020 15:00:00'))).encode())
+
+
+def test_archived_payloads_replay_into_get_oc_data(tmp_path):
+    with StubServer(equities=['ITC'], strikes=30, expiries=2) as stub:
+        archive = PayloadArchive(str(tmp_path))
+        nse = NSE(base_url=stub.url, archive=archive)
+        nse.get_oc_data(type='equities', symbol='ITC')
+    day = archive.days()[0]
+    timestamp = archive.timestamps('ITC', day)[0]
+    replay = ReplayNSE({'ITC': [archive.load('ITC', timestamp)]})
+    replay.get_oc_data(type='equities', symbol='ITC')
+    assert (replay.maxpain, replay.pcr_oi, replay.timestamp) == (nse.maxpain, nse.pcr_oi, nse.timestamp)
+    pd.testing.assert_frame_equal(replay.df, nse.df)
+
+
+def test_archive_failure_does_not_fail_the_fetch(tmp_path):
+    archive = PayloadArchive(str(tmp_path), codec='zlib')
+
+    def append(*args):
+        raise OSError('disk full')
+    archive.append = append
+    metrics = Metrics()
+    with StubServer(equities=['ITC'], strikes=30, expiries=2) as stub, NSE(base_url=stub.url, archive=archive, metrics=metrics) as nse:
+        assert nse.fetch_nse_data(type='equities', symbol='ITC')['records']['data']
+    assert metrics.counters['errors', 'archive'] == 1
+
+
+def test_key_frames_are_evicted_least_recently_used(tmp_path):
+    archive = PayloadArchive(str(tmp_path), codec='zlib', cache_size=2)
+    _, content = next(polls(1))
+    for symbol in ('A', 'B', 'C'):
+        archive.append(symbol, content)
+    timestamp = json.loads(content)['records']['timestamp']
+    for symbol in ('A', 'B', 'A', 'C'):
+        assert archive.read(symbol, timestamp) == content
+    day = archive.days()[0]
+    # A was read again after B, so B is the one evicted for C
+    assert (day, 0) in archive.cache and (day, 2) in archive.cache and (day, 1) not in archive.cache
+
+
+def test_only_the_latest_key_frame_of_a_symbol_is_kept(tmp_path):
+    archive = PayloadArchive(str(tmp_path), codec='zlib')
+    payloads = []
+    for day in ('29-Dec-2020', '30-Dec-2020', '31-Dec-2020'):
+        for timestamp, content in polls(3):
+            request = json.loads(content)
+            request['records']['timestamp'] = timestamp.replace('29-Dec-2020', day)
+            payloads.append((request['records']['timestamp'], json.dumps(request).encode()))
+            assert archive.append('ITC', payloads[-1][1])
+    assert list(archive.keyframes) == ['ITC'] and archive.keyframes['ITC'][0] == '2020-12-31'
+    # every day starts with its own key frame
+    assert [archive.index(day)['key'].tolist() for day in archive.days()] == [[0, 0, 0]] * 3
+    reader = PayloadArchive(str(tmp_path))
+    assert all(reader.read('ITC', timestamp) == content for timestamp, content in payloads)
@@ -0,0 +1,62 @@
+import pandas as pd
+import pytest
+
+from Chain import ExpiryIndex
+from Indicator import get_indicator
+from SnapshotStore import SnapshotStore
+from Backtest import backtest, signal_stats, snapshot_metrics, settlement_prices
+from Synthetic import make_payload
+
+
+POLLS = [(day, time) for day in ('05-Jan-2021', '06-Jan-2021', '07-Jan-2021') for time in ('09:30:00', '12:00:00', '15:30:00')]
+
+
+def payloads(symbol='NIFTY'):
+    for i, (day, time) in enumerate(POLLS):
+        yield make_payload(symbol, strikes=20, expiries=2, underlyingValue=14000.0 + 25 * i, timestamp=f'{day} {time}', seed=i)
+
+
+@pytest.fixture
+def store(tmp_path):
+    with SnapshotStore(str(tmp_path), batch_rows=100) as store:
+        for symbol in ('NIFTY', 'BANKNIFTY'):
+            for payload in payloads(symbol):
+                store.append(symbol, payload)
+    return store
+
+
+def test_metrics_match_the_live_pipeline(store):
+    snapshots = store.snapshots('NIFTY')
+    assert len(snapshots) == 2 * len(POLLS)
+    result = snapshot_metrics(store.read('NIFTY', columns=['OI_c', 'OI_p', 'TotalVol_c', 'TotalVol_p']), snapshots)
+    for payload in payloads():
+        index = ExpiryIndex(payload)
+        for expiry in index.expiry_dates():
+            metrics = index.metrics(expiry)
+            row = result[(result['timestamp'] == pd.Timestamp(pd.to_datetime(index.timestamp, format='%d-%b-%Y %H:%M:%S')))
+                & (result['expiryDate'] == expiry)].iloc[0]
+            assert row['underlyingValue'] == index.underlyingValue
+            assert (row['maxpain'], row['pcr_oi'], row['pcr_vol']) == (metrics['maxpain'], metrics['pcr_oi'], metrics['pcr_vol'])
+            indicator = get_indicator(index.underlyingValue, metrics['maxpain'])
+            assert row['indicator'] == pytest.approx(float(indicator.split()[1]) * (1 if indicator[0] == '>' else -1))
+
+
+def test_backtest_joins_settlements(store):
+    assert settlement_prices(store.snapshots('NIFTY')).to_dict() == {'07-Jan-2021': 14000.0 + 25 * (len(POLLS) - 1)}
+    results = backtest(store, ['NIFTY', 'BANKNIFTY', 'MISSING'])
+    assert set(results['symbol']) == {'NIFTY', 'BANKNIFTY'}
+    # only the expiry polled on its expiry day has a settlement
+    assert set(results['expiryDate']) == {'07-Jan-2021'}
+    assert sorted(results['days'].unique()) == [0, 1, 2]
+    first = results.iloc[0]
+    assert first['move'] == pytest.approx((first['settlement'] - first['underlyingValue']) / first['underlyingValue'] * 100)
+
+    given = backtest(store, ['NIFTY'], start='06-Jan-2021 00:00:00', settlements={'NIFTY': {'14-JAN-2021': 14500.0}})
+    assert len(given) == 6 and set(given['settlement']) == {14500.0}
+
+    stats = signal_stats(results)
+    assert list(stats.index) == [0, 1, 2]
+    assert list(stats.columns) == ['count', 'maxpain_error', 'maxpain_hits', 'pcr_hits', 'correlation']
+    assert stats['count'].sum() == len(results)
+    assert stats[['maxpain_hits', 'pcr_hits']].stack().between(0, 1).all()
+    assert signal_stats(results, by='symbol')['count'].to_dict() == {'BANKNIFTY': 9, 'NIFTY': 9}
@@ -0,0 +1,21 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks'))
+
+import suite
+
+
+def test_suite_stages_run_on_request_json():
+    content = suite.fixtures(quick=True)['request.json']
+    funcs = suite.stages(content)
+    assert list(funcs) == suite.STAGES
+    for func in funcs.values():
+        func()
+
+
+def test_compare_flags_regressions(capsys):
+    results = {'request.json': {'strikes': 115, 'bytes': 1, 'ms': {'decode': 2.0, 'render': 1.0}}}
+    baseline = {'request.json': {'ms': {'decode': 1.0, 'render': 1.0}}}
+    assert suite.compare(results, baseline, threshold=1.5) == [('request.json', 'decode', 2.0)]
+    assert 'REGRESSION' in capsys.readouterr().out
@@ -0,0 +1,107 @@
+import copy
+
+import pytest
+
+from OptionChain import NSE
+from Chain import ExpiryIndex
+from BuildUp import BuildUp, buildup_columns
+from Synthetic import make_payload
+
+
+BASE = make_payload(strikes=10, expiries=2)
+EXPIRY = BASE['records']['expiryDates'][0]
+
+
+def payload(minute, oi=0, ltp=0.0, volume=0, day='31-Dec-2020'):
+    '''
+    returns BASE at 10:00 + minute with oi, ltp and volume of every call and put shifted by minute times the given step
+    '''
+    data = copy.deepcopy(BASE)
+    data['records']['timestamp'] = f'{day} {10 + minute // 60:02d}:{minute % 60:02d}:00'
+    for row in data['records']['data']:
+        for side in ('CE', 'PE'):
+            row[side]['openInterest'] += oi * minute
+            row[side]['totalTradedVolume'] += volume * minute
+            row[side]['lastPrice'] += ltp * minute
+    return data
+
+
+def poll(minute, **kwargs):
+    return ExpiryIndex(payload(minute, **kwargs))
+
+
+def frame(buildup, index):
+    df = index.frame(EXPIRY)[0].copy()
+    return buildup.add_columns(df, 'NIFTY', EXPIRY, index.timestamp)
+
+
+def test_windows_and_labels():
+    buildup = BuildUp()
+    assert buildup.columns == buildup_columns() and len(buildup.columns) == 18
+    first = poll(0, oi=100, ltp=1.0, volume=1000)
+    assert buildup.update('NIFTY', first)
+    df = frame(buildup, first)
+    assert df['dOI_c'].isna().all() and (df['BuildUp_c'] == '').all()
+
+    for minute in range(1, 41):
+        assert buildup.update('NIFTY', poll(minute, oi=100, ltp=1.0, volume=1000))
+    last = poll(40, oi=100, ltp=1.0, volume=1000)
+    assert not buildup.update('NIFTY', last)
+    df = frame(buildup, last)
+    assert (df['dOI_c'] == 100).all() and (df['dVol_p'] == 1000).all()
+    assert (df['dOI5_c'] == 500).all() and (df['dOI15_p'] == 1500).all() and (df['dVol30_c'] == 30000).all()
+    assert (df['BuildUp_c'] == 'long build-up').all() and (df['BuildUp_p'] == 'long build-up').all()
+    # the ring only keeps the polls of the longest window
+    assert buildup.history('NIFTY', EXPIRY) == 31
+
+    labels = {(1.0, 100): 'long build-up', (-1.0, 100): 'short build-up', (1.0, -100): 'short covering', (-1.0, -100): 'long unwinding'}
+    for (ltp, oi), label in labels.items():
+        buildup = BuildUp(classify_window=0)
+        buildup.update('NIFTY', poll(1, oi=oi, ltp=ltp))
+        index = poll(2, oi=oi, ltp=ltp)
+        buildup.update('NIFTY', index)
+        df = frame(buildup, index)
+        # strikes without a trade are not labelled
+        traded = df['LTP_c'] > 0
+        assert (df.loc[traded, 'BuildUp_c'] == label).all()
+
+
+def test_short_history_new_strikes_and_new_day():
+    buildup = BuildUp()
+    buildup.update('NIFTY', poll(0, oi=100))
+    later = poll(2, oi=100)
+    buildup.update('NIFTY', later)
+    df = frame(buildup, later)
+    # windows longer than the history cover all of it
+    assert (df['dOI30_c'] == 200).all()
+    assert frame(buildup, poll(3))['dOI_c'].isna().all()
+
+    data = copy.deepcopy(BASE)
+    data['records']['timestamp'] = '31-Dec-2020 10:05:00'
+    extra = copy.deepcopy(data['records']['data'][0])
+    extra['strikePrice'] = extra['CE']['strikePrice'] = extra['PE']['strikePrice'] = 1.0
+    data['records']['data'].append(extra)
+    index = ExpiryIndex(data)
+    buildup.update('NIFTY', index)
+    df = frame(buildup, index)
+    new = df['strikePrice'] == 1.0
+    assert (df.loc[new, 'dOI_c'] == extra['CE']['openInterest']).all()
+
+    tomorrow = poll(1, oi=100, day='01-Jan-2021')
+    buildup.update('NIFTY', tomorrow)
+    assert buildup.history('NIFTY', EXPIRY) == 1
+    assert frame(buildup, tomorrow)['dOI_c'].isna().all()
+
+
+def test_nse_adds_columns(monkeypatch):
+    payloads = iter([payload(minute, oi=100, ltp=-1.0) for minute in range(3)])
+    monkeypatch.setattr(NSE, 'fetch_nse_data', lambda self, type='indices', symbol='NIFTY': next(payloads))
+    with pytest.raises(ValueError):
+        NSE().analyse(index=poll(0), buildup=True)
+    nse = NSE(buildup=BuildUp(classify_window=0))
+    for _ in range(3):
+        nse.get_oc_data(symbol='NIFTY', buildup=True)
+    assert set(buildup_columns()) <= set(nse.df.columns)
+    assert (nse.df['dOI_c'] == 100).all()
+    assert (nse.df.loc[nse.df['LTP_p'] > 2, 'BuildUp_p'] == 'short build-up').all()
+    assert list(nse.analyse(index=poll(2)).df.columns) == list(poll(2).frame()[0].columns)
@@ -0,0 +1,45 @@
+import os
+import json
+import copy
+
+from OptionChain import NSE
+from Cache import ResultCache
+
+
+with open('request.json') as f:
+    REQUEST = json.load(f)
+
+
+def test_lru_eviction():
+    cache = ResultCache(maxsize=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert 'b' not in cache
+    assert cache.get('b') is None
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'hit_ratio': 0.5, 'evictions': 1, 'size': 2, 'maxsize': 2}
+
+
+def test_get_output_cached_per_timestamp(monkeypatch, tmp_path):
+    payload = {'request': REQUEST}
+    monkeypatch.setattr(NSE, 'fetch_nse_data', lambda self, type='indices', symbol='NIFTY': payload['request'])
+    filename = str(tmp_path / 'index.html')
+    nse = NSE()
+
+    indicator = nse.get_output(type='equities', symbol='ITC', filename=filename, skip_unchanged=True)
+    html = open(filename).read()
+    assert nse.get_output(type='equities', symbol='ITC', filename=filename, skip_unchanged=True) == indicator
+    assert nse.cache.stats()['hits'] == 1
+    assert nse.writes_skipped == 1
+    assert open(filename).read() == html
+
+    os.remove(filename)
+    nse.get_output(type='equities', symbol='ITC', filename=filename, skip_unchanged=True)
+    assert open(filename).read() == html
+
+    payload['request'] = copy.deepcopy(REQUEST)
+    payload['request']['records']['timestamp'] = '31-Dec-2020 15:31:00'
+    nse.get_output(type='equities', symbol='ITC', filename=filename, skip_unchanged=True)
+    assert nse.cache.stats()['misses'] == 2
+    assert len(nse.cache) == 2
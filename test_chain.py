@@ -0,0 +1,97 @@
+import json
+
+import pandas as pd
+import pytest
+
+from OptionChain import NSE
+from Chain import ExpiryIndex, build_oc_df, build_oc_struct, COLUMNS
+from Decode import decode_chain
+
+
+with open('request.json') as f:
+    REQUEST = json.load(f)
+
+
+def legacy_build_oc_df(ce_data, pe_data):
+    '''
+    the original drop/rename/merge/astype chain of get_oc_data, kept as the reference implementation
+    '''
+    ce_df = pd.DataFrame(ce_data)
+    ce_df = ce_df.drop(['expiryDate', 'underlying', 'identifier', 'bidQty', 'bidprice', 'askQty', 'askPrice', 'changeinOpenInterest', 'change', 'underlyingValue'], axis = 1)
+    ce_df = ce_df[['totalBuyQuantity', 'totalSellQuantity', 'totalTradedVolume', 'pchangeinOpenInterest', 'openInterest', 'pChange', 'lastPrice', 'impliedVolatility', 'strikePrice']]
+    ce_df = ce_df.rename(columns={'totalBuyQuantity':'BuyQ', 'totalSellQuantity':'SellQ', 'totalTradedVolume':'TotalVol', 'pchangeinOpenInterest':'pOI', 'openInterest':'OI', 'lastPrice':'LTP', 'pChange':'pLTP', 'impliedVolatility':'IV'})
+
+    pe_df = pd.DataFrame(pe_data)
+    pe_df= pe_df.drop(['expiryDate', 'underlying', 'identifier', 'bidQty', 'bidprice', 'askQty', 'askPrice', 'underlyingValue', 'changeinOpenInterest', 'change'], axis = 1)
+    pe_df = pe_df[['strikePrice', 'impliedVolatility', 'lastPrice', 'pChange', 'openInterest', 'pchangeinOpenInterest', 'totalTradedVolume', 'totalBuyQuantity', 'totalSellQuantity']]
+    pe_df = pe_df.rename(columns={'totalBuyQuantity':'BuyQ', 'totalSellQuantity':'SellQ', 'totalTradedVolume':'TotalVol', 'pchangeinOpenInterest':'pOI', 'openInterest':'OI', 'lastPrice':'LTP', 'pChange':'pLTP', 'impliedVolatility':'IV'})
+
+    df = pd.merge(ce_df, pe_df, on='strikePrice', suffixes=('_c', '_p'), how='outer', sort=True).fillna(0)
+    df = df.astype({'BuyQ_c':'uint64', 'SellQ_c':'uint64', 'TotalVol_c':'uint64', 'OI_c':'uint64', 'BuyQ_p':'uint64', 'SellQ_p':'uint64', 'TotalVol_p':'uint64', 'OI_p':'uint64'})
+    df = df.astype({'pOI_c':'float', 'pLTP_c':'float', 'IV_c':'float', 'pOI_p':'float', 'pLTP_p':'float', 'IV_p':'float'}).round({'pOI_c':1, 'pLTP_c':1, 'IV_c':1, 'pOI_p':1, 'pLTP_p':1, 'IV_p':1})
+    df = df.astype({'LTP_c':'float', 'LTP_p':'float', 'strikePrice':'float'})
+    return df
+
+
+
+def split(data):
+    return [data['CE'] for data in data if 'CE' in data], [data['PE'] for data in data if 'PE' in data]
+
+
+def test_expiry_dates():
+    index = ExpiryIndex(REQUEST)
+    assert index.expiry_dates() == REQUEST['records']['expiryDates']
+    assert index.nearest == REQUEST['filtered']['data'][0]['expiryDate']
+
+
+@pytest.mark.parametrize('expiry', REQUEST['records']['expiryDates'])
+def test_frame_matches_legacy(expiry):
+    expected = legacy_build_oc_df(*split([data for data in REQUEST['records']['data'] if data['expiryDate'] == expiry]))
+    df, name = ExpiryIndex(REQUEST).frame(expiry.upper())
+    assert name == expiry
+    pd.testing.assert_frame_equal(df[COLUMNS], expected)
+
+
+def test_one_sided_strikes_match_legacy():
+    ce_data, pe_data = split(REQUEST['filtered']['data'])
+    ce_data, pe_data = ce_data[:-3], pe_data[5:]
+    pd.testing.assert_frame_equal(build_oc_df(ce_data, pe_data), legacy_build_oc_df(ce_data, pe_data))
+
+
+def test_struct_matches_frame():
+    ce_data, pe_data = split(REQUEST['filtered']['data'])
+    struct = build_oc_struct(ce_data, pe_data)
+    pd.testing.assert_frame_equal(pd.DataFrame(struct), build_oc_df(ce_data, pe_data))
+
+
+def test_all_metrics():
+    index = ExpiryIndex(REQUEST)
+    metrics = index.all_metrics()
+    assert list(metrics.index) == REQUEST['records']['expiryDates']
+    assert metrics.loc[index.nearest].to_dict() == {k: v for k, v in index.metrics().items() if k != 'expiry'}
+
+
+def test_get_oc_data_reuses_payload(monkeypatch):
+    calls = []
+    def fetch_nse_data(self, type='indices', symbol='NIFTY'):
+        calls.append(symbol)
+        return REQUEST
+    monkeypatch.setattr(NSE, 'fetch_nse_data', fetch_nse_data)
+    nse = NSE()
+    assert nse.get_expiry_dates(type='equities', symbol='ITC') == REQUEST['records']['expiryDates']
+    for expiry in REQUEST['records']['expiryDates']:
+        nse.get_oc_data(type='equities', symbol='ITC', expiry=expiry, refresh=False)
+        assert nse.maxpain == nse.index.metrics(expiry)['maxpain']
+    assert calls == ['ITC']
+    # another symbol is fetched even with refresh=False
+    nse.get_oc_data(type='equities', symbol='SBIN', refresh=False)
+    assert calls == ['ITC', 'SBIN'] and nse.loaded == ('equities', 'SBIN')
+
+
+def test_decode_chain_single_expiry():
+    with open('request.json', 'rb') as f:
+        index = decode_chain(f.read(), '28-jan-2021')
+    assert list(index.sides) == ['28-jan-2021']
+    assert index.expiry_dates() == REQUEST['records']['expiryDates']
+    df, name = index.frame('28-Jan-2021')
+    pd.testing.assert_frame_equal(df, ExpiryIndex(REQUEST).frame(name)[0])
@@ -0,0 +1,66 @@
+import sys
+import json
+import subprocess
+
+from bs4 import BeautifulSoup
+
+from OptionChain import NSE
+from Contracts import ContractCache, extract_indices
+from Transport import StubServer
+
+
+PAGE = '''<html><body><div class="custom_select">
+<select class="form-control" id="equity_optionchain_select" name="equity_optionchain_select">
+<option value="NIFTY">NIFTY</option>
+<option value="BANKNIFTY" selected>BANKNIFTY</option>
+<option value="FINNIFTY">FINNIFTY</option>
+</select></div>
+<select id="select_symbol"><option>ITC</option></select></body></html>'''
+
+
+def test_extract_indices_matches_soup():
+    soup = BeautifulSoup(PAGE, "html.parser")
+    expected = soup.find("select", id="equity_optionchain_select").text.strip().split("\n")
+    assert extract_indices(PAGE) == expected == ['NIFTY', 'BANKNIFTY', 'FINNIFTY']
+    assert extract_indices("<option>M&amp;M</option>".join(['<select id="equity_optionchain_select">', '</select>'])) == ['M&M']
+
+
+def test_cache_ttl_and_persistence(tmp_path, monkeypatch):
+    path = str(tmp_path / 'cache' / 'contracts.json')
+    cache = ContractCache(path, ttl=60)
+    assert cache.get('indices') is None
+    cache.put('indices', ['NIFTY'])
+    assert ContractCache(path).get('indices') == ['NIFTY']
+    now = __import__('time').time()
+    monkeypatch.setattr('time.time', lambda: now + 61)
+    assert cache.get('indices') is None
+    cache.invalidate()
+    assert json.load(open(path)) == {}
+
+
+def test_nse_reuses_cached_names(tmp_path):
+    path = str(tmp_path / 'contracts.json')
+    with StubServer() as stub:
+        nse = NSE(base_url=stub.url, contracts=ContractCache(path))
+        assert nse.get_indices_contracts_names() == ['NIFTY', 'BANKNIFTY']
+        assert nse.get_stocks_contracts_names() == ['ITC', 'SBIN']
+        requests = stub.stats['requests']
+        assert nse.get_indices_contracts_names() == ['NIFTY', 'BANKNIFTY']
+        assert NSE(base_url=stub.url, contracts=ContractCache(path)).get_stocks_contracts_names() == ['ITC', 'SBIN']
+        assert stub.stats['requests'] == requests
+        stub.indices.append('FINNIFTY')
+        assert nse.get_indices_contracts_names(refresh=True) == ['NIFTY', 'BANKNIFTY', 'FINNIFTY']
+
+
+def test_warm_cache_does_not_import_bs4(tmp_path):
+    path = str(tmp_path / 'contracts.json')
+    ContractCache(path).put('indices', ['NIFTY'])
+    code = f'''
+import sys
+from OptionChain import NSE
+from Contracts import ContractCache
+assert NSE(base_url='http://127.0.0.1:9', contracts=ContractCache({path!r})).get_indices_contracts_names() == ['NIFTY']
+print('bs4' in sys.modules)
+'''
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == 'False'
@@ -0,0 +1,100 @@
+import os
+
+import pandas as pd
+import pytest
+
+from Export import Exporter, AtomicWriter, CsvWriter, export_format, KEY_COLUMNS
+from OptionChain import NSE
+from Transport import StubServer
+
+
+TARGETS = [('indices', 'NIFTY'), ('indices', 'BANKNIFTY'), ('equities', 'ITC', '14-Jan-2021'), ('equities', 'UNKNOWN')]
+
+
+def test_csv_export_of_a_sweep(tmp_path):
+    path = str(tmp_path / 'chains.csv')
+    with StubServer(strikes=40, expiries=3) as stub, NSE(base_url=stub.url) as nse:
+        exporter = Exporter(nse, rate=100, chunk_rows=100)
+        assert exporter.export(TARGETS, path) == {path: 40 * 3 * 2 + 40}
+        expected = nse.analyse(symbol='BANKNIFTY', expiry='21-Jan-2021').df
+    df = pd.read_csv(path)
+    assert list(df.columns[:len(KEY_COLUMNS)]) == KEY_COLUMNS
+    assert list(df.columns[len(KEY_COLUMNS):]) == list(expected.columns)
+    assert df.groupby('symbol', sort=False).size().to_dict() == {'NIFTY': 120, 'BANKNIFTY': 120, 'ITC': 40}
+    assert set(df.loc[df['symbol'] == 'ITC', 'expiry']) == {'14-Jan-2021'}
+    rows = df[(df['symbol'] == 'BANKNIFTY') & (df['expiry'] == '21-Jan-2021')].reset_index(drop=True)
+    assert (rows['OI_c'].values == expected['OI_c'].values).all()
+    assert rows['MaxPain'].values == pytest.approx(expected['MaxPain'].values)
+    assert list(exporter.errors) == [('equities', 'UNKNOWN', None)]
+    assert os.listdir(tmp_path) == ['chains.csv']
+
+
+def test_folder_export_writes_one_file_per_symbol(tmp_path):
+    with StubServer(strikes=20, expiries=2) as stub, NSE(base_url=stub.url) as nse:
+        written = Exporter(nse, rate=100).export(TARGETS[:3], 'chains.csv.gz', folder=str(tmp_path / 'out'))
+    assert sorted(os.path.basename(path) for path in written) == ['BANKNIFTY.csv.gz', 'ITC.csv.gz', 'NIFTY.csv.gz']
+    df = pd.read_csv(tmp_path / 'out' / 'NIFTY.csv.gz')
+    assert len(df) == written[str(tmp_path / 'out' / 'NIFTY.csv.gz')] == 40 and set(df['symbol']) == {'NIFTY'}
+
+
+def test_failed_export_keeps_the_previous_file(tmp_path, monkeypatch):
+    path = str(tmp_path / 'chains.csv')
+    with open(path, 'w') as f:
+        f.write('previous')
+    chunks = []
+
+    def write(self, df):
+        chunks.append(len(df))
+        if len(chunks) == 2:
+            raise OSError('disk full')
+        df.to_csv(self.file, header=self.header, index=False)
+        self.header = False
+    monkeypatch.setattr(CsvWriter, 'write', write)
+    with StubServer(strikes=20, expiries=2) as stub, NSE(base_url=stub.url) as nse:
+        with pytest.raises(OSError):
+            Exporter(nse, rate=100, chunk_rows=30).export(TARGETS[:2], path)
+    # chunks close once they reach chunk_rows, a whole expiry at a time
+    assert chunks == [40, 40]
+    assert open(path).read() == 'previous'
+    assert os.listdir(tmp_path) == ['chains.csv']
+
+
+def test_export_formats():
+    assert [export_format(name) for name in ('a.csv', 'a.CSV.gz', 'a.parquet', 'a.xlsx')] == ['csv', 'csv', 'parquet', 'xlsx']
+    with pytest.raises(ValueError):
+        export_format('a.json')
+    with pytest.raises(TypeError):
+        AtomicWriter('a.csv')
+
+
+@pytest.mark.parametrize('filename, module', [('chains.parquet', 'pyarrow'), ('chains.xlsx', 'openpyxl')])
+def test_parquet_and_excel_exports(tmp_path, filename, module):
+    pytest.importorskip(module)
+    path = str(tmp_path / filename)
+    with StubServer(strikes=20, expiries=2) as stub, NSE(base_url=stub.url) as nse:
+        Exporter(nse, rate=100, chunk_rows=30).export(TARGETS[:2], path)
+    if filename.endswith('.parquet'):
+        assert len(pd.read_parquet(path)) == 80
+    else:
+        sheets = pd.read_excel(path, sheet_name=None)
+        assert list(sheets) == ['NIFTY', 'BANKNIFTY'] and len(sheets['NIFTY']) == 40
+
+
+def test_export_without_rows_keeps_the_previous_file(tmp_path):
+    path = str(tmp_path / 'chains.csv')
+    with open(path, 'w') as f:
+        f.write('previous')
+    with StubServer() as stub, NSE(base_url=stub.url) as nse:
+        exporter = Exporter(nse, rate=100)
+        assert exporter.export([('equities', 'UNKNOWN')], path) == {}
+    assert open(path).read() == 'previous'
+    assert os.listdir(tmp_path) == ['chains.csv']
+    assert list(exporter.errors) == [('equities', 'UNKNOWN', None), path]
+
+
+def test_folder_export_groups_symbols_and_follows_format(tmp_path, monkeypatch):
+    monkeypatch.setattr(Exporter, 'write_file', lambda self, writer_class, path, frames: sum(len(df) for df in frames))
+    targets = [('indices', 'NIFTY', '07-Jan-2021'), ('indices', 'BANKNIFTY'), ('indices', 'NIFTY', '14-Jan-2021')]
+    with StubServer(strikes=20, expiries=2) as stub, NSE(base_url=stub.url) as nse:
+        written = Exporter(nse, rate=100).export(targets, 'x.csv', folder=str(tmp_path), format='parquet')
+    assert written == {str(tmp_path / 'NIFTY.parquet'): 40, str(tmp_path / 'BANKNIFTY.parquet'): 40}
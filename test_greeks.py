@@ -0,0 +1,94 @@
+import json
+import math
+
+import numpy as np
+import pytest
+
+import Greeks
+from OptionChain import NSE
+from Chain import ExpiryIndex
+from Greeks import norm_cdf, bs_price, bs_greeks, implied_volatility, time_to_expiry, greeks_surface, GREEKS
+from Synthetic import make_payload
+
+
+with open('request.json') as f:
+    REQUEST = json.load(f)
+
+
+def test_norm_cdf_fallback(monkeypatch):
+    monkeypatch.setattr(Greeks, 'ndtr', None)
+    x = np.linspace(-40, 40, 4001)
+    expected = np.array([0.5 * math.erfc(-value / math.sqrt(2)) for value in x])
+    np.testing.assert_allclose(norm_cdf(x), expected, rtol=1e-10, atol=1e-15)
+
+
+def test_put_call_parity_and_greeks():
+    spot, strikes, t, vol = 14000.0, np.array([12000.0, 14000.0, 16000.0]), 0.1, 0.2
+    calls = bs_price(spot, strikes, t, vol, call=True)
+    puts = bs_price(spot, strikes, t, vol, call=False)
+    np.testing.assert_allclose(calls - puts, spot - strikes * np.exp(-Greeks.RATE * t))
+
+    greeks = bs_greeks(spot, strikes, t, vol, call=True)
+    h = 1e-2
+    np.testing.assert_allclose(greeks['Delta'], (bs_price(spot + h, strikes, t, vol) - bs_price(spot - h, strikes, t, vol)) / (2 * h), rtol=1e-6)
+    np.testing.assert_allclose(greeks['Vega'], (bs_price(spot, strikes, t, vol + 1e-5) - bs_price(spot, strikes, t, vol - 1e-5)) / 2e-5 / 100, rtol=1e-5)
+    dt = 1e-6
+    np.testing.assert_allclose(greeks['Theta'], (bs_price(spot, strikes, t - dt, vol) - bs_price(spot, strikes, t, vol)) / dt / 365, rtol=1e-4)
+
+
+def test_implied_volatility_round_trip():
+    rng = np.random.default_rng(1)
+    n = 20000
+    spot = 14000.0
+    strikes = spot * rng.uniform(0.7, 1.3, n)
+    t = rng.uniform(1 / 365, 1, n)
+    vol = rng.uniform(0.05, 1.5, n)
+    call = rng.random(n) < 0.5
+    prices = bs_price(spot, strikes, t, vol, call=call)
+    # options with less than a paisa of time value carry no volatility information
+    solved = implied_volatility(prices, spot, strikes, t, call=call)
+    intrinsic = np.where(call, spot - strikes * np.exp(-Greeks.RATE * t), strikes * np.exp(-Greeks.RATE * t) - spot)
+    keep = prices - np.maximum(intrinsic, 0) > 0.01
+    np.testing.assert_allclose(solved[keep], vol[keep], rtol=1e-3)
+
+
+def test_implied_volatility_outside_bounds():
+    solved = implied_volatility([0.0, 5000.0, 20000.0], 14000.0, [14000.0, 9000.0, 14000.0], 0.1, call=True)
+    assert np.isnan(solved).all()
+
+
+def test_time_to_expiry():
+    assert time_to_expiry('31-Dec-2020', '29-Dec-2020 15:30:00') == pytest.approx(2 / 365)
+    assert time_to_expiry('31-Dec-2020', '31-Dec-2020 15:30:00') == Greeks.MIN_TIME
+
+
+def test_get_oc_data_greeks(monkeypatch):
+    monkeypatch.setattr(NSE, 'fetch_nse_data', lambda self, type='indices', symbol='NIFTY': REQUEST)
+    nse = NSE()
+    nse.get_oc_data(type='equities', symbol='ITC', expiry='28-Jan-2021', greeks=True)
+    df = nse.df
+    for name in GREEKS:
+        assert name + '_c' in df and name + '_p' in df
+    traded = (df['LTP_c'] > 0) & df['IVs_c'].notna()
+    assert traded.any()
+    assert ((df.loc[traded, 'Delta_c'] > 0) & (df.loc[traded, 'Delta_c'] < 1)).all()
+    # nse quotes its own iv rounded, the solved one should be in the same range for liquid strikes
+    near = traded & (df['IV_c'] > 0) & ((df['strikePrice'] - nse.underlyingValue).abs() < 20)
+    np.testing.assert_allclose(df.loc[near, 'IVs_c'], df.loc[near, 'IV_c'], rtol=0.25)
+
+    nse.get_oc_data(type='equities', symbol='ITC', expiry='28-Jan-2021')
+    assert 'IVs_c' not in nse.df
+
+
+def test_greeks_surface_matches_per_chain():
+    indexes = {symbol: ExpiryIndex(make_payload(symbol, strikes=50, expiries=3, seed=i)) for i, symbol in enumerate(['NIFTY', 'BANKNIFTY'])}
+    surface = greeks_surface(indexes)
+    assert len(surface) == 2 * 3 * 50
+    for symbol, index in indexes.items():
+        for expiry in index.expiry_dates():
+            df, _ = index.frame(expiry)
+            expected = Greeks.add_greeks(df.copy(), index.underlyingValue, expiry, index.timestamp)
+            part = surface[(surface['symbol'] == symbol) & (surface['expiryDate'] == expiry)]
+            for name in GREEKS:
+                for suffix in ('_c', '_p'):
+                    np.testing.assert_allclose(part[name + suffix].values, expected[name + suffix].values)
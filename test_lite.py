@@ -0,0 +1,78 @@
+import sys
+import json
+import subprocess
+
+import pytest
+
+from Chain import ExpiryIndex
+from Lite import LiteNSE, chain_metrics, max_pain_python
+from MaxPain import max_pain
+from OptionChain import NSE
+from Synthetic import make_payload
+from Transport import StubServer
+
+
+with open('request.json') as f:
+    REQUEST = json.load(f)
+
+
+@pytest.mark.parametrize('use_numpy', [True, False])
+@pytest.mark.parametrize('request_', [REQUEST, make_payload(strikes=150, expiries=6, seed=3)], ids=['request.json', 'synthetic'])
+def test_chain_metrics_match_expiry_index(request_, use_numpy):
+    expected = ExpiryIndex(request_).all_metrics()
+    results = chain_metrics(request_, use_numpy=use_numpy)
+    assert [result['expiry'] for result in results] == list(expected.index)
+    for result in results:
+        row = expected.loc[result['expiry']]
+        assert (result['maxpain'], result['pcr_oi'], result['pcr_vol']) == (row['maxpain'], row['pcr_oi'], row['pcr_vol'])
+        assert type(result['maxpain']) is float
+    nearest = chain_metrics(request_, expected.index[1], use_numpy=use_numpy)
+    assert len(nearest) == 1 and nearest[0]['expiry'] == expected.index[1]
+
+
+def test_max_pain_python_keeps_the_first_minimum():
+    strikes, oi_c, oi_p = [100.0, 110.0, 120.0, 130.0], [0, 5, 0, 0], [0, 0, 5, 0]
+    pain_c, pain_p = max_pain(strikes, oi_c, oi_p)
+    total = list(pain_c + pain_p)
+    assert max_pain_python(strikes, oi_c, oi_p) == strikes[total.index(min(total))] == 110.0
+
+
+def test_lite_nse_against_stub():
+    with StubServer(cookie_ttl=3600) as stub, NSE(base_url=stub.url) as nse:
+        lite = LiteNSE(base_url=stub.url)
+        result = lite.get_metrics(symbol='NIFTY')
+        nse.get_oc_data(symbol='NIFTY')
+        assert (result['maxpain'], result['pcr_oi'], result['pcr_vol']) == (nse.maxpain, nse.pcr_oi, nse.pcr_vol)
+        assert result['underlyingValue'] == nse.underlyingValue and result['timestamp'] == nse.timestamp
+        assert len(lite.get_all_metrics(symbol='BANKNIFTY')) == 3
+        assert lite.get_metrics(type='equities', symbol='UNKNOWN') is None
+        assert nse.get_metrics(symbol='NIFTY')['maxpain'] == nse.maxpain
+
+
+def test_metrics_path_does_not_import_pandas():
+    code = '''
+import sys
+from Lite import chain_metrics
+from OptionChain import NSE
+from Synthetic import make_payload
+nse = NSE()
+assert chain_metrics(make_payload(expiries=2), use_numpy=False)
+print(sorted(name for name in ('pandas', 'bs4', 'Chain', 'Render') if name in sys.modules))
+'''
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == '[]'
+
+
+def test_lite_imports_neither_numpy_nor_chain():
+    code = 'import sys, Lite; print(sorted(name for name in ("numpy", "Chain", "MaxPain") if name in sys.modules))'
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == '[]'
+
+
+def test_cli_prints_json_lines():
+    with StubServer() as stub:
+        result = subprocess.run([sys.executable, 'Lite.py', 'NIFTY', 'BANKNIFTY', '--base-url', stub.url, '--no-numpy'],
+            capture_output=True, text=True, check=True)
+    lines = [json.loads(line) for line in result.stdout.splitlines()]
+    assert [line['symbol'] for line in lines] == ['NIFTY', 'BANKNIFTY']
+    assert {'maxpain', 'pcr_oi', 'pcr_vol', 'underlyingValue', 'timestamp', 'indicator', 'expiry'} <= set(lines[0])
@@ -0,0 +1,88 @@
+import json
+
+import numpy as np
+import pytest
+
+from OptionChain import NSE
+from Chain import ExpiryIndex
+from Lite import chain_metrics
+from MaxPain import max_pain, max_pain_by_expiry
+from Synthetic import make_payload
+
+
+with open('request.json') as f:
+    REQUEST = json.load(f)
+
+
+def loop_max_pain(df):
+    '''
+    the original per strike loop of get_oc_data, kept as the reference implementation
+    '''
+    def MaxPain_c(expiryPrice):
+        sum = 0
+        for index in df.index:
+            if (expiryPrice - df['strikePrice'][index]) >= 0:
+                sum = sum + (expiryPrice - df['strikePrice'][index]) * df['OI_c'][index]
+        return sum
+
+    def MaxPain_p(expiryPrice):
+        sum = 0
+        for index in df.index:
+            if (df['strikePrice'][index] - expiryPrice) >= 0:
+                sum = sum + (df['strikePrice'][index] - expiryPrice) * df['OI_p'][index]
+        return sum
+
+    pain_c = df['strikePrice'].apply(MaxPain_c)
+    pain_p = df['strikePrice'].apply(MaxPain_p)
+    total = pain_c + pain_p
+    return pain_c, pain_p, df.loc[total.idxmin()]['strikePrice']
+
+
+@pytest.fixture
+def nse(monkeypatch):
+    monkeypatch.setattr(NSE, 'fetch_nse_data', lambda self, type='indices', symbol='NIFTY': REQUEST)
+    return NSE()
+
+
+@pytest.mark.parametrize('expiry', [None] + REQUEST['records']['expiryDates'])
+def test_matches_loop(nse, expiry):
+    nse.get_oc_data(type='equities', symbol='ITC', expiry=expiry)
+    pain_c, pain_p, maxpain = loop_max_pain(nse.df)
+    np.testing.assert_allclose(nse.df['MaxPain_c'], pain_c, rtol=1e-9)
+    np.testing.assert_allclose(nse.df['MaxPain_p'], pain_p, rtol=1e-9)
+    np.testing.assert_allclose(nse.df['MaxPain'], pain_c + pain_p, rtol=1e-9)
+    assert nse.maxpain == maxpain
+
+
+def test_by_expiry_matches_single(nse):
+    result = nse.get_all_maxpain(type='equities', symbol='ITC')
+    assert list(result.index) == REQUEST['records']['expiryDates']
+    for expiry, maxpain in result.items():
+        nse.get_oc_data(type='equities', symbol='ITC', expiry=expiry)
+        assert nse.maxpain == maxpain
+
+
+def test_unsorted_strikes_and_prices():
+    strikes = np.array([110.0, 90.0, 100.0])
+    pain_c, pain_p = max_pain(strikes, [1, 2, 3], [4, 5, 6], prices=[95.0, 100.0])
+    np.testing.assert_allclose(pain_c, [2 * 5, 2 * 10])
+    np.testing.assert_allclose(pain_p, [6 * 5 + 4 * 15, 4 * 10])
+
+
+def test_by_expiry_empty():
+    assert max_pain_by_expiry([]).empty
+
+
+def test_by_expiry_skips_rows_without_legs():
+    request = make_payload(strikes=10, expiries=3)
+    last = request['records']['expiryDates'][-1]
+    rows = sorted((data for data in request['records']['data'] if data['expiryDate'] == last), key=lambda data: data['strikePrice'])
+    # an expiry nobody holds yet, every strike has 0 open interest and the lowest strike has no leg at all
+    for data in rows:
+        for side in ('CE', 'PE'):
+            data[side]['openInterest'] = 0
+    del rows[0]['CE'], rows[0]['PE']
+    result = max_pain_by_expiry(request['records']['data'])
+    assert result[last] == rows[1]['strikePrice']
+    assert result.to_dict() == ExpiryIndex(request).all_metrics()['maxpain'].to_dict()
+    assert result.to_dict() == {metrics['expiry']: metrics['maxpain'] for metrics in chain_metrics(request, use_numpy=False)}
@@ -0,0 +1,82 @@
+import json
+import timeit
+
+import pytest
+
+from OptionChain import NSE
+from Metrics import Metrics, NullMetrics, NULL_TIMER
+
+
+with open('request.json') as f:
+    REQUEST = json.load(f)
+
+
+def test_quantiles_and_counters():
+    metrics = Metrics(window=100)
+    for i in range(1, 101):
+        metrics.observe('network', i / 1000)
+    metrics.count('bytes', 300, 'network')
+    metrics.count('bytes', 200, 'network')
+    with pytest.raises(ValueError):
+        with metrics.timer('decode'):
+            raise ValueError
+    summary = metrics.summary()
+    assert summary['stages']['network']['count'] == 100
+    assert summary['stages']['network']['p50'] == pytest.approx(0.0505)
+    assert summary['stages']['network']['p99'] == pytest.approx(0.09901)
+    assert summary['stages']['decode']['count'] == 1
+    assert summary['counters'] == {'bytes': {'network': 500}, 'errors': {'decode': 1}}
+
+    text = metrics.to_prometheus()
+    assert '# TYPE nse_stage_seconds summary' in text
+    assert 'nse_stage_seconds{stage="network",quantile="0.95"} ' in text
+    assert 'nse_stage_seconds_count{stage="network"} 100' in text
+    assert 'nse_bytes_total{stage="network"} 500.0\n' in text
+    assert 'nse_errors_total{stage="decode"} 1.0\n' in text
+    # counters and gauges keep every digit, rate() over large byte counters needs them
+    metrics.count('bytes', 31310345, 'write')
+    metrics.gauge('coalescing_ratio', 0.123456789, 'network')
+    text = metrics.to_prometheus()
+    assert 'nse_bytes_total{stage="write"} 31310345.0\n' in text
+    assert 'nse_coalescing_ratio{stage="network"} 0.123456789\n' in text
+
+
+def test_nse_stages(monkeypatch, tmp_path):
+    monkeypatch.setattr(NSE, 'fetch_nse_content', lambda self, type='indices', symbol='NIFTY': json.dumps(REQUEST).encode())
+    metrics = Metrics()
+    nse = NSE(metrics=metrics)
+    filename = str(tmp_path / 'index.html')
+    nse.get_output(type='equities', symbol='ITC', filename=filename, skip_unchanged=True)
+    nse.get_output(type='equities', symbol='ITC', filename=filename, skip_unchanged=True)
+    monkeypatch.setattr(NSE, 'fetch_nse_content', lambda self, type='indices', symbol='NIFTY': b'{')
+    nse.get_oc_data(type='equities', symbol='ITC')
+
+    summary = metrics.summary()
+    assert {'decode', 'index', 'frame', 'metrics', 'render', 'write'} <= set(summary['stages'])
+    assert summary['stages']['decode']['count'] == 3
+    assert summary['counters']['cache_hits'] == {'get_output': 1}
+    assert summary['counters']['cache_misses'] == {'get_output': 1}
+    assert summary['counters']['writes_skipped'] == {'write': 1}
+    assert summary['counters']['errors'] == {'decode': 1, 'get_nse_data': 1}
+    assert summary['counters']['rows']['frame'] > 0
+
+    metrics.write_prometheus(str(tmp_path / 'nse.prom'))
+    assert (tmp_path / 'nse.prom').read_text() == metrics.to_prometheus()
+    metrics.log_json(str(tmp_path / 'nse.jsonl'), symbol='ITC')
+    metrics.log_json(str(tmp_path / 'nse.jsonl'), symbol='ITC')
+    lines = (tmp_path / 'nse.jsonl').read_text().splitlines()
+    assert len(lines) == 2 and json.loads(lines[0])['stages']['render']['count'] == 1
+
+
+def test_disabled_metrics_record_nothing():
+    metrics = NullMetrics()
+    assert metrics.timer('network') is NULL_TIMER
+    with metrics.timer('network'):
+        metrics.count('bytes', 10, 'network')
+    assert metrics.summary() == {'stages': {}, 'counters': {}, 'gauges': {}}
+
+    def stage():
+        with metrics.timer('network'):
+            pass
+    # a disabled stage costs well under a microsecond, far below any nse call
+    assert min(timeit.repeat(stage, number=10000, repeat=3)) / 10000 < 5e-6
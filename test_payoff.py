@@ -0,0 +1,98 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from OptionChain import NSE
+from Chain import ExpiryIndex
+from Payoff import STRATEGIES, evaluate, rank, payoff_curves
+from Synthetic import make_payload
+
+
+with open('request.json') as f:
+    REQUEST = json.load(f)
+
+
+def loop_pnl(legs, strikes, chain, price):
+    '''
+    the P&L of one combination at one expiry price leg by leg, the reference for the broadcast evaluator
+    '''
+    total = 0.0
+    for side, quantity, slot in legs:
+        strike = strikes[slot]
+        ltp = chain.loc[strike, 'LTP_c' if side == 'c' else 'LTP_p']
+        intrinsic = max(price - strike, 0) if side == 'c' else max(strike - price, 0)
+        total += quantity * (intrinsic - ltp)
+    return total
+
+
+@pytest.fixture(scope='module')
+def chain():
+    index = ExpiryIndex(make_payload(strikes=40, expiries=1, underlyingValue=14000.0, step=50))
+    df, _ = index.frame()
+    return df, index.underlyingValue
+
+
+def test_matches_leg_by_leg_loop(chain):
+    df, spot = chain
+    results = evaluate(df, spot, width=6)
+    assert set(results['strategy']) == set(STRATEGIES)
+    assert results.groupby('strategy').size()['iron_condor'] == 715
+    indexed = df.set_index('strikePrice')
+    prices = np.linspace(0, 30000, 30001)
+    for _, row in results.sample(60, random_state=0).iterrows():
+        legs = STRATEGIES[row['strategy']]
+        strikes = [row[f'K{i + 1}'] for i in range(4)]
+        pnl = np.array([loop_pnl(legs, strikes, indexed, price) for price in prices[::50]])
+        assert row['premium'] == pytest.approx(-sum(q * indexed.loc[strikes[s], 'LTP_c' if side == 'c' else 'LTP_p'] for side, q, s in legs))
+        if np.isfinite(row['max_loss']):
+            assert row['max_loss'] == pytest.approx(pnl.min(), abs=1e-6)
+        if np.isfinite(row['max_profit']):
+            assert row['max_profit'] == pytest.approx(pnl.max(), abs=1e-6)
+        for breakeven in (row['lower_breakeven'], row['upper_breakeven']):
+            if np.isfinite(breakeven):
+                assert loop_pnl(legs, strikes, indexed, breakeven) == pytest.approx(0, abs=1e-6)
+        curve = payoff_curves(pd.DataFrame([row]), df, prices[::50])[0]
+        np.testing.assert_allclose(curve, pnl, atol=1e-9)
+
+
+def test_known_payoffs(chain):
+    df, spot = chain
+    results = evaluate(df, spot, width=6)
+    indexed = df.set_index('strikePrice')
+    spread = results[(results['strategy'] == 'bull_call_spread') & (results['K1'] == 14000) & (results['K2'] == 14100)].iloc[0]
+    debit = indexed.loc[14000, 'LTP_c'] - indexed.loc[14100, 'LTP_c']
+    assert spread['premium'] == pytest.approx(-debit)
+    assert spread['max_loss'] == pytest.approx(min(-debit, 100 - debit))
+    assert spread['max_profit'] == pytest.approx(max(100 - debit, -debit))
+    if 0 < debit < 100:
+        assert spread['lower_breakeven'] == pytest.approx(14000 + debit)
+
+    straddle = results[(results['strategy'] == 'short_straddle') & (results['K1'] == 14000)].iloc[0]
+    credit = indexed.loc[14000, 'LTP_c'] + indexed.loc[14000, 'LTP_p']
+    assert straddle['max_loss'] == -np.inf and straddle['max_profit'] == pytest.approx(credit)
+    assert (straddle['lower_breakeven'], straddle['upper_breakeven']) == pytest.approx((14000 - credit, 14000 + credit))
+    assert straddle['margin'] == pytest.approx(max(1400 - credit, 0), abs=1e-6)
+
+
+def test_rankings(chain):
+    df, spot = chain
+    results = evaluate(df, spot, width=6)
+    top = rank(results, top=5)
+    assert len(top) == 5 and np.isfinite(top['max_loss']).all()
+    assert top['reward_risk'].is_monotonic_decreasing
+    assert rank(results, by='max_loss')['max_loss'].is_monotonic_decreasing
+    assert len(rank(results, by='breakeven', bounded=False)) == 10
+    with pytest.raises(ValueError):
+        rank(results, by='delta')
+    custom = evaluate(df, spot, strategies={'ratio_spread': [('c', 1, 0), ('c', -2, 1)]}, width=3)
+    assert len(custom) == 21 and (custom['max_loss'] == -np.inf).all()
+
+
+def test_nse_get_strategies(monkeypatch):
+    monkeypatch.setattr(NSE, 'fetch_nse_data', lambda self, type='indices', symbol='NIFTY': REQUEST)
+    top = NSE().get_strategies(type='equities', symbol='ITC', by='max_loss', top=3)
+    assert len(top) == 3 and list(top.columns[:2]) == ['strategy', 'K1']
+    monkeypatch.setattr(NSE, 'fetch_nse_data', lambda self, type='indices', symbol='NIFTY': {})
+    assert NSE().get_strategies(type='equities', symbol='ITC') is None
@@ -0,0 +1,79 @@
+import os
+import json
+import copy
+from datetime import datetime
+
+from Poller import Poller, ReplayNSE, seconds_until_open, IST
+
+
+with open('request.json') as f:
+    REQUEST = json.load(f)
+
+
+def payload(timestamp, underlyingValue=REQUEST['records']['underlyingValue']):
+    request = copy.deepcopy(REQUEST)
+    request['records']['timestamp'] = timestamp
+    request['records']['underlyingValue'] = underlyingValue
+    return request
+
+
+def test_dry_run_refreshes_only_changed(tmp_path):
+    payloads = {'ITC': [payload('31-Dec-2020 15:00:00'), payload('31-Dec-2020 15:00:00'), payload('31-Dec-2020 15:03:00', 212.0)]}
+    poller = Poller(ReplayNSE(payloads), targets=[('equities', 'ITC')], folder=str(tmp_path), min_interval=15, period=180, dry_run=True)
+    start = poller.now
+    poller.run()
+    assert poller.polls == 3
+    assert poller.refreshes == 2
+    assert poller.nse.cache.stats()['misses'] == 2
+    # first refresh, then a poll at the expected update that finds nothing new, then the update after one back-off
+    assert poller.now - start == 185 + 15
+    html = open(os.path.join(str(tmp_path), 'ITC_nearest.html')).read()
+    assert 'UnderlyingValue - 212.0' in html
+
+
+def test_replay_folder(tmp_path):
+    for i, timestamp in enumerate(['31-Dec-2020 15:00:00', '31-Dec-2020 15:03:00']):
+        with open(os.path.join(str(tmp_path), f'ITC_{i}.json'), 'w') as f:
+            json.dump(payload(timestamp), f)
+    nse = ReplayNSE(str(tmp_path))
+    assert nse.fetch_nse_data(symbol='ITC')['records']['timestamp'] == '31-Dec-2020 15:00:00'
+    assert nse.is_market_open()
+    assert nse.fetch_nse_data(symbol='ITC')['records']['timestamp'] == '31-Dec-2020 15:03:00'
+    assert not nse.is_market_open()
+
+
+def test_stop():
+    poller = Poller(ReplayNSE({'ITC': [payload('31-Dec-2020 15:00:00')] * 10}), targets=[('equities', 'ITC')], dry_run=True)
+    poller.stop()
+    poller.run()
+    assert poller.polls == 0
+
+
+def test_seconds_until_open():
+    def at(*args):
+        return datetime(*args, tzinfo=IST).timestamp()
+    assert seconds_until_open(at(2021, 1, 1, 10, 0)) == 0
+    assert seconds_until_open(at(2021, 1, 1, 9, 0)) == 15 * 60
+    # friday evening waits for monday morning
+    assert seconds_until_open(at(2021, 1, 1, 16, 0)) == (2 * 24 + 17) * 3600 + 15 * 60
+
+
+def test_failed_fetch_writes_nothing(tmp_path):
+    # BANKNIFTY has no payloads, so every fetch of it raises right after NIFTY was fetched
+    payloads = {'NIFTY': [payload('31-Dec-2020 15:00:00')]}
+    poller = Poller(ReplayNSE(payloads), targets=[('indices', 'NIFTY'), ('indices', 'BANKNIFTY')], folder=str(tmp_path),
+        min_interval=15, dry_run=True)
+    poller.poll(('indices', 'NIFTY', None))
+    poller.poll(('indices', 'BANKNIFTY', None))
+    assert os.listdir(str(tmp_path)) == ['NIFTY_nearest.html']
+    assert (poller.refreshes, poller.failures) == (1, 1)
+    state = poller.state['indices', 'BANKNIFTY', None]
+    assert state['timestamp'] is None and state['backoff'] == 30
+
+
+def test_get_output_skips_failed_fetch(tmp_path):
+    nse = ReplayNSE({'NIFTY': [payload('31-Dec-2020 15:00:00')]})
+    assert nse.get_output(symbol='NIFTY', filename=str(tmp_path / 'NIFTY.html'))
+    assert nse.get_output(symbol='BANKNIFTY', filename=str(tmp_path / 'BANKNIFTY.html')) is None
+    assert os.listdir(str(tmp_path)) == ['NIFTY.html']
+    assert nse.request is None and nse.index is None
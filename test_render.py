@@ -0,0 +1,127 @@
+import re
+import json
+import warnings
+
+import pandas as pd
+import pytest
+
+from OptionChain import NSE
+from Render import render_page, table_id
+
+
+with open('request.json') as f:
+    REQUEST = json.load(f)
+
+
+def resolve(declarations):
+    '''
+    applies css declarations in order the way a browser cascade does for one element
+    '''
+    style = {}
+    for declaration in declarations.split(';'):
+        prop, _, value = declaration.partition(':')
+        prop, value = prop.strip().lower(), value.strip()
+        if not value:
+            continue
+        if prop == 'background':
+            style['background-image'] = value
+            style['background-color'] = 'transparent'
+        else:
+            style[prop] = value
+    return style
+
+
+def styler_cells(html):
+    rules = {}
+    for selectors, declarations in re.findall(r'([^{}]*)\{([^{}]*)\}', html.split('</style>')[1]):
+        for cell in re.findall(r'row(\d+)_col(\d+)', selectors):
+            rules[cell] = rules.get(cell, '') + declarations + ';'
+    cells = {}
+    for row, col, text in re.findall(r'<td id="\w*?row(\d+)_col(\d+)"[^>]*>([^<]*)</td>', html):
+        cells[int(row), int(col)] = (text, resolve(rules.get((row, col), '')))
+    return cells
+
+
+def render_cells(html):
+    rules = dict(re.findall(r'\.(s\d+) \{([^{}]*)\}', html))
+    cells = {}
+    for row, tr in enumerate(re.findall(r'<tr>(.*?)</tr>', html.split('<tbody>')[1])):
+        for col, (name, text) in enumerate(re.findall(r'<td class="(s\d+)">([^<]*)</td>', tr)):
+            cells[row, col] = (text, resolve(rules[name]))
+    return cells
+
+
+@pytest.fixture
+def nse(monkeypatch):
+    monkeypatch.setattr(NSE, 'fetch_nse_data', lambda self, type='indices', symbol='NIFTY': REQUEST)
+    return NSE()
+
+
+@pytest.mark.parametrize('expiry', REQUEST['records']['expiryDates'])
+@pytest.mark.parametrize('underlyingValue', [REQUEST['records']['underlyingValue'], 200.0, 232.4])
+def test_matches_styler(nse, expiry, underlyingValue):
+    nse.get_oc_data(type='equities', symbol='ITC', expiry=expiry)
+    nse.underlyingValue = underlyingValue
+    df = nse.df
+    html, indicator = nse.render_output('ITC', expiry)
+    window = nse.df
+    nse.df = df
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        expected_html, expected_indicator = nse.render_styler('ITC', expiry)
+    assert indicator == expected_indicator
+    pd.testing.assert_frame_equal(window, nse.df)
+    expected = styler_cells(expected_html)
+    cells = render_cells(html)
+    assert len(expected) == window.size
+    # Styler.bar changed its css across pandas versions, the MaxPain bar is checked against the pinned 1.1 output below
+    bar = list(window.columns).index('MaxPain')
+    for row in range(len(window)):
+        for style in (cells[row, bar][1], expected[row, bar][1]):
+            for prop in ('background-image', 'height', 'width'):
+                style.pop(prop, None)
+    assert cells == expected
+
+
+def test_maxpain_bar(nse):
+    nse.get_oc_data(type='equities', symbol='ITC')
+    html, _ = nse.render_output('ITC', nse.index.nearest)
+    pain = nse.df['MaxPain'].values
+    normed = 100 * (pain - pain.min()) / (pain.max() - pain.min() + 1e-12)
+    bar = list(nse.df.columns).index('MaxPain')
+    for row, (text, style) in render_cells(html).items():
+        if row[1] == bar:
+            expected = 'linear-gradient(90deg,rgba(58, 59, 53, 0.5) %.1f%%, transparent %.1f%%)' % (normed[row[0]], normed[row[0]]) if normed[row[0]] > 0 else None
+            assert style.get('background-image') == expected
+            assert style['height'] == '80%'
+            assert style['width'] == '80px'
+
+
+def test_render_page_many_tables(nse):
+    tables = []
+    for expiry in REQUEST['records']['expiryDates']:
+        nse.get_oc_data(type='equities', symbol='ITC', expiry=expiry)
+        tables.append(nse.render_table('ITC', expiry)[0])
+    page = render_page(tables)
+    for expiry in REQUEST['records']['expiryDates']:
+        assert f'id="{table_id("ITC", expiry)}"' in page
+
+
+def test_get_outputs(nse, tmp_path):
+    targets = [('equities', 'ITC', expiry) for expiry in REQUEST['records']['expiryDates']]
+    indicators = nse.get_outputs(targets, folder=str(tmp_path))
+    assert sorted(path.name for path in tmp_path.iterdir()) == sorted(f'ITC_{expiry}.html' for expiry in REQUEST['records']['expiryDates'])
+    filename = str(tmp_path / 'all.html')
+    assert nse.get_outputs(targets, filename=filename) == indicators
+    assert open(filename).read().count('<table') == len(targets)
+
+
+def test_get_outputs_skips_an_unknown_expiry(nse, tmp_path):
+    targets = [('equities', 'ITC'), ('equities', 'ITC', '01-Jan-1990'), ('equities', 'ITC', REQUEST['records']['expiryDates'][1])]
+    indicators = nse.get_outputs(targets, folder=str(tmp_path))
+    expiries = [REQUEST['records']['expiryDates'][0], REQUEST['records']['expiryDates'][1]]
+    assert list(indicators) == [('equities', 'ITC', expiry) for expiry in expiries]
+    assert sorted(path.name for path in tmp_path.iterdir()) == sorted(f'ITC_{expiry}.html' for expiry in expiries)
+    filename = str(tmp_path / 'all.html')
+    assert nse.get_outputs(targets, filename=filename) == indicators
+    assert open(filename).read().count('<table') == 2
@@ -0,0 +1,111 @@
+import time
+import socket
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+from OptionChain import NSE
+from Metrics import Metrics
+from Resilience import Coalescer, CircuitBreaker, CircuitOpenError
+from Transport import StubServer
+
+
+def test_coalescer_shares_results_and_errors():
+    coalescer = Coalescer()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.2)
+        return len(calls)
+
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        assert list(executor.map(lambda _: coalescer.call('NIFTY', slow), range(6))) == [1] * 6
+    assert coalescer.stats() == {'calls': 6, 'shared': 5, 'ratio': 5 / 6}
+    assert coalescer.call('NIFTY', slow) == 2
+
+    def fail():
+        raise ValueError('down')
+    with pytest.raises(ValueError):
+        coalescer.call('NIFTY', fail)
+    assert not coalescer.inflight
+
+
+def test_circuit_breaker_states():
+    breaker = CircuitBreaker(threshold=2, timeout=0.1)
+    breaker.failure()
+    breaker.before()
+    breaker.failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before()
+    time.sleep(0.1)
+    breaker.before()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before()
+    breaker.failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    time.sleep(0.1)
+    breaker.before()
+    breaker.success()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.failures == 0
+
+
+def test_concurrent_fetches_are_coalesced():
+    with StubServer(strikes=20, expiries=1, latency=0.2) as stub:
+        metrics = Metrics()
+        nse = NSE(base_url=stub.url, metrics=metrics)
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            bodies = list(executor.map(lambda _: nse.fetch_nse_content(symbol='NIFTY'), range(8)))
+        assert len(set(bodies)) == 1
+        assert stub.stats['chains'] == 1
+        assert nse.fetch_stats()['coalescing']['shared'] == 7
+        assert metrics.summary()['gauges']['coalescing_ratio']['network'] == pytest.approx(7 / 8)
+
+
+def test_rejected_cookies_are_renewed_and_retried():
+    with StubServer(strikes=20, expiries=1, cookie_ttl=3600) as stub:
+        metrics = Metrics()
+        nse = NSE(base_url=stub.url, metrics=metrics, backoff=0.01)
+        nse.fetch_nse_content(symbol='NIFTY')
+        # nse forgets the session while the cookies still look valid on our side
+        stub.cookies.clear()
+        assert nse.fetch_nse_content(symbol='NIFTY')
+        assert stub.stats['unauthorized'] == 1
+        assert stub.stats['cookies'] == 2
+        assert metrics.summary()['counters']['retries'] == {'option-chain-indices': 1}
+
+
+def test_breaker_fails_fast_while_nse_is_down():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    metrics = Metrics()
+    nse = NSE(base_url=f'http://127.0.0.1:{port}', metrics=metrics, retries=3, backoff=0.01, breaker_threshold=5, breaker_timeout=60)
+    with pytest.raises(requests.ConnectionError):
+        nse.fetch_nse_content(symbol='NIFTY')
+    with pytest.raises(requests.ConnectionError):
+        nse.fetch_nse_content(symbol='NIFTY')
+    assert nse.fetch_stats()['breakers'] == {'option-chain-indices': 'open'}
+    start = time.perf_counter()
+    with pytest.raises(CircuitOpenError):
+        nse.fetch_nse_content(symbol='NIFTY')
+    assert time.perf_counter() - start < 0.01
+    summary = metrics.summary()
+    assert summary['gauges']['circuit_state'] == {'option-chain-indices': 2}
+    assert summary['counters']['retries'] == {'option-chain-indices': 3}
+    assert summary['counters']['breaker_rejections'] == {'option-chain-indices': 1}
+    # other endpoints keep their own breaker
+    with pytest.raises(requests.ConnectionError):
+        nse.fetch_nse_content(type='equities', symbol='ITC')
+
+
+def test_http_errors_other_than_throttling_are_not_retried():
+    with StubServer(strikes=20, expiries=1) as stub:
+        nse = NSE(base_url=stub.url, backoff=0.01)
+        with pytest.raises(requests.HTTPError, match='404'):
+            nse.request_content(f'{stub.url}/api/unknown', 'unknown')
+        assert stub.stats['not_found'] == 1
+        assert nse.fetch_stats()['breakers'] == {'unknown': 'closed'}
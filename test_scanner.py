@@ -0,0 +1,50 @@
+import time
+
+import pytest
+
+from Indicator import get_indicator
+from OptionChain import NSE
+from Scanner import Scanner, TokenBucket
+from Transport import StubServer
+
+
+@pytest.fixture(scope='module')
+def server():
+    with StubServer(strikes=20, expiries=2, latency=0.05) as stub:
+        yield stub.url
+
+
+def test_scan(server):
+    scanner = Scanner(NSE(base_url=server), max_workers=4, rate=100)
+    targets = [('equities', 'ITC'), ('equities', 'ITC', '14-Jan-2021'), ('equities', 'MISSING')]
+    table = scanner.scan(targets)
+    assert list(table['symbol']) == ['ITC', 'ITC', 'MISSING']
+    assert list(table['expiry']) == ['07-Jan-2021', '14-Jan-2021', None]
+    assert table['error'][:2].isna().all()
+    # nse answers an unknown symbol with an empty object
+    assert table['error'][2] == "KeyError: 'records'"
+
+    nse = NSE(base_url=server)
+    nse.get_oc_data(type='equities', symbol='ITC')
+    assert table['maxpain'][0] == nse.maxpain
+    assert table['PCR_OI'][0] == nse.pcr_oi
+    assert table['PCR_Vol'][0] == nse.pcr_vol
+    assert table['underlyingValue'][0] == nse.underlyingValue
+    assert table['indicator'][0] == get_indicator(nse.underlyingValue, nse.maxpain)
+
+
+def test_scan_runs_concurrently():
+    equities = [f'STOCK{i}' for i in range(8)]
+    with StubServer(equities=equities, strikes=20, expiries=2, latency=0.05) as stub:
+        table = Scanner(NSE(base_url=stub.url), max_workers=8, rate=1000).scan([('equities', symbol) for symbol in equities])
+    assert table['error'].isna().all() and stub.stats['chains'] == 8
+    # the chains were answered while others were still in flight
+    assert stub.stats['concurrent'] > 1
+
+
+def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=50, capacity=1)
+    start = time.monotonic()
+    for _ in range(6):
+        bucket.acquire()
+    assert time.monotonic() - start >= 5 / 50 * 0.9
@@ -0,0 +1,116 @@
+import gzip
+import sys
+import time
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+from OptionChain import NSE
+from Metrics import Metrics
+from Server import ChainService, ChainServer
+from Transport import StubServer
+
+
+def test_clients_share_one_fetch_and_revalidate():
+    with StubServer() as stub, NSE(base_url=stub.url, metrics=Metrics()) as nse, ChainServer(ChainService(nse, refresh=60), port=0) as server:
+        url = f'{server.url}/api/chain?symbol=NIFTY'
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            responses = list(executor.map(lambda _: requests.get(url), range(16)))
+        assert stub.stats['chains'] == 1
+        assert {response.status_code for response in responses} == {200}
+        assert len({response.headers['ETag'] for response in responses}) == 1
+        response = responses[0]
+        assert response.headers['Content-Encoding'] == 'gzip'
+        body = response.json()
+        expected = nse.analyse(symbol='NIFTY', index=server.service.index('indices', 'NIFTY'))
+        assert body['maxpain'] == expected.maxpain and body['expiry'] == expected.expiry
+        assert body['chain']['columns'] == list(expected.df.columns)
+        assert len(body['chain']['data']) == len(expected.df)
+
+        etag = response.headers['ETag']
+        again = requests.get(url, headers={'If-None-Match': etag})
+        assert again.status_code == 304 and again.content == b''
+        assert again.headers['ETag'] == etag
+        assert nse.metrics.counters[('not_modified', 'server')] == 1
+        assert nse.metrics.counters[('builds', 'server')] == 1
+
+        plain = requests.get(url, headers={'Accept-Encoding': 'identity'})
+        assert 'Content-Encoding' not in plain.headers
+        assert gzip.decompress(server.service.response('chain', 'indices', 'NIFTY').gzipped) == plain.content
+        # the identity body has its own etag, a cached gzip body does not revalidate it
+        assert etag == plain.headers['ETag'][:-1] + '-gzip"'
+        assert requests.get(url, headers={'Accept-Encoding': 'identity', 'If-None-Match': etag}).status_code == 200
+        assert requests.get(url, headers={'Accept-Encoding': 'identity', 'If-None-Match': plain.headers['ETag']}).status_code == 304
+
+
+def test_routes_and_errors():
+    with StubServer() as stub, NSE(base_url=stub.url, metrics=Metrics()) as nse, ChainServer(ChainService(nse, refresh=60), port=0) as server:
+        metrics = requests.get(f'{server.url}/api/metrics?symbol=BANKNIFTY').json()
+        assert metrics['symbol'] == 'BANKNIFTY' and len(metrics['expiries']) == 3
+        html = requests.get(f'{server.url}/chain?symbol=BANKNIFTY')
+        assert html.headers['Content-Type'].startswith('text/html') and 'BANKNIFTY' in html.text
+        assert stub.stats['chains'] == 1
+        assert requests.get(f'{server.url}/health').json() == {'status': 'ok'}
+        assert 'nse_requests_total{stage="server"}' in requests.get(f'{server.url}/metrics').text
+        assert requests.get(f'{server.url}/api/chain').status_code == 404
+        assert requests.get(f'{server.url}/api/chain?symbol=NIFTY&expiry=01-Jan-1990').status_code == 404
+        missing = requests.get(f'{server.url}/api/chain?type=equities&symbol=UNKNOWN')
+        assert missing.status_code == 404 and 'error' in missing.json()
+        # symbols without data are remembered for refresh seconds instead of being asked of nse on every request
+        requests_before = stub.stats['requests']
+        assert {requests.get(f'{server.url}/chain?type=equities&symbol=UNKNOWN').status_code for _ in range(5)} == {404}
+        assert stub.stats['requests'] == requests_before
+
+
+def test_refresh_new_timestamp_and_stale_fallback():
+    with StubServer(period=0.5) as stub, NSE(base_url=stub.url, metrics=Metrics()) as nse:
+        service = ChainService(nse, refresh=0.5, symbols=[('indices', 'NIFTY')])
+        first = service.response('chain', 'indices', 'NIFTY')
+        assert service.response('chain', 'indices', 'NIFTY') is first
+        time.sleep(1.1)
+        second = service.response('chain', 'indices', 'NIFTY')
+        assert second.etag != first.etag
+        assert stub.stats['chains'] == 2
+
+        def down(**kwargs):
+            raise requests.ConnectionError('nse is down')
+        nse.load = down
+        time.sleep(0.6)
+        assert service.response('chain', 'indices', 'NIFTY') is second
+        assert nse.metrics.counters[('stale', 'server')] == 1
+        with pytest.raises(LookupError, match='not served'):
+            service.response('chain', 'indices', 'BANKNIFTY')
+
+
+def test_failed_fetches_are_remembered_for_refresh_seconds():
+    with StubServer() as stub, NSE(base_url=stub.url) as nse:
+        service = ChainService(nse, refresh=0.5, cache_size=2)
+        for _ in range(3):
+            with pytest.raises(LookupError, match='no option chain data'):
+                service.index('equities', 'UNKNOWN')
+        assert stub.stats['requests'] == 2
+        time.sleep(0.6)
+        with pytest.raises(LookupError):
+            service.index('equities', 'UNKNOWN')
+        assert stub.stats['requests'] == 3
+        for symbol in ('A', 'B', 'C'):
+            with pytest.raises(LookupError):
+                service.index('equities', symbol)
+        assert len(service.failures) == 2 and not service.fetches.inflight
+
+
+def test_command_line_serves_only_the_contract_names():
+    with StubServer() as stub:
+        process = subprocess.Popen([sys.executable, '-u', 'Server.py', '--port', '0', '--base-url', stub.url, '--equities', 'ITC'],
+            stdout=subprocess.PIPE, text=True)
+        try:
+            url = process.stdout.readline().split()[-1]
+            assert requests.get(f'{url}/api/metrics?symbol=BANKNIFTY').status_code == 200
+            assert requests.get(f'{url}/api/metrics?type=equities&symbol=ITC').status_code == 200
+            assert requests.get(f'{url}/api/metrics?type=equities&symbol=SBIN').status_code == 404
+        finally:
+            process.terminate()
+            process.wait()
+    assert stub.stats['chains'] == 2
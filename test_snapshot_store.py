@@ -0,0 +1,79 @@
+import json
+import copy
+
+import numpy as np
+import pandas as pd
+
+from OptionChain import NSE
+from Chain import ExpiryIndex, COLUMNS
+from SnapshotStore import SnapshotStore
+
+
+with open('request.json') as f:
+    REQUEST = json.load(f)
+
+
+def payload(timestamp, oi=0):
+    request = copy.deepcopy(REQUEST)
+    request['records']['timestamp'] = timestamp
+    for data in request['records']['data']:
+        if 'CE' in data:
+            data['CE']['openInterest'] += oi
+    return request
+
+
+def test_append_and_range_scan(tmp_path):
+    store = SnapshotStore(str(tmp_path), batch_rows=200)
+    for i, time in enumerate(['09:30:00', '10:00:00', '12:00:00', '14:00:00', '15:30:00']):
+        assert store.append('ITC', payload('31-Dec-2020 ' + time, oi=i))
+    assert not store.append('ITC', payload('31-Dec-2020 15:30:00'))
+    store.flush()
+    assert not store.append('ITC', payload('31-Dec-2020 09:30:00'))
+    assert store.days('ITC') == ['2020-12-31']
+
+    df = store.read('ITC', '31-Dec-2020 10:00:00', '31-Dec-2020 14:00:00', expiry='28-JAN-2021', columns=['OI_c', 'OI_p'])
+    assert list(df.columns) == ['timestamp', 'expiryDate', 'strikePrice', 'OI_c', 'OI_p']
+    assert sorted(df['timestamp'].astype(str).unique()) == ['2020-12-31 10:00:00', '2020-12-31 12:00:00', '2020-12-31 14:00:00']
+    assert set(df['expiryDate']) == {'28-Jan-2021'}
+
+    expected = pd.DataFrame(ExpiryIndex(REQUEST).arrays('28-Jan-2021')[0])
+    noon = df[df['timestamp'] == np.datetime64('2020-12-31T12:00:00')].reset_index(drop=True)
+    np.testing.assert_array_equal(noon['strikePrice'], expected['strikePrice'])
+    np.testing.assert_array_equal(noon['OI_c'], expected['OI_c'] + 2)
+    np.testing.assert_array_equal(noon['OI_p'], expected['OI_p'])
+
+    everything = store.read('ITC')
+    assert list(everything.columns) == ['timestamp', 'expiryDate', 'strikePrice'] + [column for column in COLUMNS if column != 'strikePrice']
+    assert len(everything) == 5 * sum(len(ExpiryIndex(REQUEST).arrays(expiry)[0]['strikePrice']) for expiry in REQUEST['records']['expiryDates'])
+    assert store.read('ITC', '01-Jan-2021 09:00:00').empty
+
+
+def test_nse_appends_fetched_chains(tmp_path, monkeypatch):
+    monkeypatch.setattr(NSE, 'fetch_nse_data', lambda self, type='indices', symbol='NIFTY': REQUEST)
+    with SnapshotStore(str(tmp_path)) as store:
+        nse = NSE(store=store)
+        nse.get_oc_data(type='equities', symbol='ITC')
+        nse.get_oc_data(type='equities', symbol='ITC')
+    assert len(store.index('ITC', '2020-12-29')) == len(REQUEST['records']['expiryDates'])
+
+
+def test_rows_of_a_torn_write_are_dropped(tmp_path):
+    store = SnapshotStore(str(tmp_path / 'store'))
+    store.append('ITC', payload('31-Dec-2020 09:30:00'))
+    store.flush()
+    folder = store.folder('ITC', '2020-12-31')
+    index = open(folder + '/index.bin', 'rb').read()
+    # the process died after writing the columns of the next snapshots but before their index entries
+    store.append('ITC', payload('31-Dec-2020 10:00:00', oi=1))
+    store.flush()
+    with open(folder + '/index.bin', 'wb') as f:
+        f.write(index)
+    store.append('ITC', payload('31-Dec-2020 12:00:00', oi=2))
+    store.flush()
+
+    assert store.read('ITC', '31-Dec-2020 10:00:00', '31-Dec-2020 10:00:00').empty
+    with SnapshotStore(str(tmp_path / 'reference')) as reference:
+        reference.append('ITC', payload('31-Dec-2020 09:30:00'))
+        reference.append('ITC', payload('31-Dec-2020 12:00:00', oi=2))
+    pd.testing.assert_frame_equal(store.read('ITC'), reference.read('ITC'))
+    pd.testing.assert_frame_equal(store.snapshots('ITC'), reference.snapshots('ITC'))
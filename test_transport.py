@@ -0,0 +1,112 @@
+import time
+
+import pytest
+
+from OptionChain import NSE
+from Transport import RecordingAdapter, ReplayAdapter, StubServer
+
+
+@pytest.fixture
+def stub():
+    with StubServer(strikes=40, expiries=2, cookie_ttl=3600) as stub:
+        yield stub
+
+
+def test_stub_server_endpoints(stub):
+    with NSE(base_url=stub.url) as nse:
+        assert nse.is_market_open()
+        assert nse.get_indices_contracts_names() == ['NIFTY', 'BANKNIFTY']
+        assert nse.get_stocks_contracts_names() == ['ITC', 'SBIN']
+        nse.get_oc_data(type='indices', symbol='NIFTY')
+        assert len(nse.df) == 40
+        assert nse.cookies_expiry > time.time() + 3000
+        nse.get_nse_data(type='equities', symbol='UNKNOWN')
+        assert nse.request == {}
+    assert stub.stats['chains'] == 1
+    assert 'unauthorized' not in stub.stats
+
+
+def test_stub_server_cookie_expiry_and_rate_limit():
+    with StubServer(strikes=10, expiries=1, cookie_ttl=1) as stub:
+        nse = NSE(base_url=stub.url, cookie_margin=0)
+        nse.fetch_nse_data(symbol='NIFTY')
+        time.sleep(2.1)
+        response = nse.session.get(f'{stub.url}/api/option-chain-indices?symbol=NIFTY', cookies=nse.cookies)
+        assert response.status_code == 401
+        # the client notices the expired cookies and renews them before fetching
+        nse.fetch_nse_data(symbol='NIFTY')
+        assert stub.stats['cookies'] == 2
+        assert stub.stats['unauthorized'] == 1
+
+    with StubServer(strikes=10, expiries=1, rate=5) as stub:
+        nse = NSE(base_url=stub.url)
+        statuses = []
+        for _ in range(10):
+            try:
+                nse.fetch_nse_content(symbol='NIFTY')
+                statuses.append(200)
+            except Exception as err:
+                statuses.append(429 if '429' in str(err) else err)
+        assert statuses.count(429) >= 3
+        assert stub.stats['throttled'] >= 3
+
+
+def test_session_reuses_pooled_connections(stub):
+    with NSE(base_url=stub.url) as nse:
+        for symbol in ('NIFTY', 'BANKNIFTY', 'NIFTY', 'BANKNIFTY'):
+            nse.fetch_nse_content(symbol=symbol)
+        # the cookie request opens the only connection, the four chains go over it
+        assert nse.connection_stats() == {'requests': 5, 'new_connections': 1, 'reused_connections': 4}
+    assert stub.stats['cookies'] == 1
+
+
+def test_cookies_are_renewed_before_they_expire():
+    with StubServer(strikes=10, expiries=1, cookie_ttl=4) as stub, NSE(base_url=stub.url, cookie_margin=60) as nse:
+        nse.fetch_nse_content(symbol='NIFTY')
+        # a margin longer than the cookie lifetime is cut to half of it instead of renewing on every call
+        assert nse.renew_margin <= 2.5
+        nse.fetch_nse_content(symbol='NIFTY')
+        assert stub.stats['cookies'] == 1
+        time.sleep(2.6)
+        nse.fetch_nse_content(symbol='NIFTY')
+        assert stub.stats['cookies'] == 2
+        assert 'unauthorized' not in stub.stats
+
+
+def test_record_and_replay(stub, tmp_path):
+    folder = str(tmp_path / 'recording')
+    with NSE(base_url=stub.url, transport=RecordingAdapter(folder)) as nse:
+        assert nse.is_market_open()
+        names = nse.get_indices_contracts_names()
+        nse.get_oc_data(type='indices', symbol='NIFTY')
+        recorded = nse.df
+        maxpain = nse.maxpain
+    stub.stop()
+
+    with NSE(base_url=stub.url, transport=ReplayAdapter(folder)) as nse:
+        assert nse.is_market_open()
+        assert nse.get_indices_contracts_names() == names
+        nse.get_oc_data(type='indices', symbol='NIFTY')
+        assert nse.df.equals(recorded)
+        assert nse.maxpain == maxpain
+        assert nse.cookies_expiry > time.time() + 3000
+        with pytest.raises(Exception, match='404'):
+            nse.fetch_nse_content(type='indices', symbol='BANKNIFTY')
+        assert nse.connection_stats()['requests'] == 0
+
+
+def test_replay_speed(stub, tmp_path):
+    stub.latency = (0.05, 0.05)
+    folder = str(tmp_path / 'recording')
+    with NSE(base_url=stub.url, transport=RecordingAdapter(folder)) as nse:
+        nse.fetch_nse_content(symbol='NIFTY')
+    timings = {}
+    for speed in (None, 1, 10):
+        nse = NSE(base_url=stub.url, transport=ReplayAdapter(folder, speed=speed))
+        start = time.perf_counter()
+        nse.fetch_nse_content(symbol='NIFTY')
+        timings[speed] = time.perf_counter() - start
+    # the cookie page and the chain were each answered after 50 ms while recording
+    assert timings[1] >= 0.1
+    assert timings[10] < timings[1] / 3
+    assert timings[None] < timings[10]